@@ -1,7 +1,6 @@
 import click
 
 from app import config
-from app.cmd.http import create_first_time_config
 from app.domain.model import init_database
 
 
@@ -50,9 +49,69 @@ def drop_db(ctx):
 @click.pass_context
 def init_user(ctx, email, password):
     click.echo('setup for first time user')
+    from app.cmd.http import create_first_time_config
     create_first_time_config(email, password)
 
 
+@cli.command()
+@click.pass_context
+def purge_tokens(ctx):
+    """Delete blacklisted tokens past their expiry, the http server also does it periodically"""
+    mode = ctx.obj['mode']
+    config.cli_config = config.Config(mode)
+    from app.cmd.center_store import user_service
+    deleted = user_service.purge_expired_tokens()
+    click.echo(f'Purged {deleted} expired blacklisted tokens')
+
+
+@cli.command()
+@click.option('-b', '--batch-size', default=100, help='activities claimed at a time')
+@click.pass_context
+def run_activities(ctx, batch_size: int):
+    """Run all due activities of committed actions, the http server also runs them in background"""
+    mode = ctx.obj['mode']
+    config.cli_config = config.Config(mode)
+    from app.cmd.center_store import container
+    from app.domain.service.process_maker.activity_outbox_service import ActivityOutboxService
+    activity_outbox_service = container.get_singleton(ActivityOutboxService)
+    total = 0
+    while True:
+        claimed = activity_outbox_service.run_once(batch_size, config.cli_config.ACTIVITY_LEASE)
+        total += claimed
+        if claimed < batch_size:
+            break
+    click.echo(f'Ran {total} activities, status: {activity_outbox_service.status()}')
+
+
+@cli.command()
+@click.option('-t', '--target',
+              default='app.cmd.http:app',
+              help='module or module:attribute to load, e.g. app.cmd.center_store'
+              )
+@click.option('-a', '--adapter',
+              default='',
+              help='profile create_app of this http adapter (fastapi, flask or sanic) instead of target'
+              )
+@click.option('-n', '--top', default=25, help='number of modules to show')
+@click.option('--sort', type=click.Choice(['cumulative', 'self']), default='cumulative')
+@click.pass_context
+def profile_startup(ctx, target: str, adapter: str, top: int, sort: str):
+    """Report import time per module of loading target in a fresh interpreter"""
+    from app.pkgs.import_profile import profile_imports, top_imports, total_us
+    if adapter:
+        statement = f'from app.cmd.http import create_app; create_app({adapter!r})'
+    else:
+        module, _, attribute = target.partition(':')
+        statement = f'import importlib; m = importlib.import_module({module!r})'
+        if attribute:
+            statement += f'; getattr(m, {attribute!r})'
+    costs = profile_imports(statement)
+    click.echo(f'{statement}: {len(costs)} modules imported in {total_us(costs) / 1000:.1f} ms')
+    click.echo(f'{"self [ms]":>10} {"cumulative [ms]":>16}  module')
+    for cost in top_imports(costs, top, by=sort):
+        click.echo(f'{cost.self_us / 1000:>10.1f} {cost.cumulative_us / 1000:>16.1f}  {cost.module}')
+
+
 @cli.command()
 @click.option('-a', '--alembic-config-file',
               default="alembic.ini",
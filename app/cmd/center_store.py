@@ -1,23 +1,25 @@
+import threading
 from logging import Logger
 
 from app.config import cli_config
 from app.domain.model import ConnectionPool
+from app.domain.service.email import EmailService
 from app.domain.service.group_service import GroupService
 from app.domain.service.process_maker.action_service import ActionService
+from app.domain.service.process_maker.activity_outbox_service import ActivityOutboxService
 from app.domain.service.process_maker.activity_service import ActivityService
 from app.domain.service.process_maker.process_service import ProcessService
 from app.domain.service.process_maker.target_service import TargetService
 from app.domain.service.process_maker.request_service import RequestService
+from app.domain.service.process_maker.workflow_cache import WorkflowGraphCache
 from app.domain.service.user import UserService
 from app.domain.service.user_role import UserRoleService
-from app.infrastructure.http.fastapi_adapter.middle_ware import FastAPIMiddleware
-from app.infrastructure.http.flask_adapter.middleware import Middleware
-from app.infrastructure.http.sanic_adapter import middleware as sanic_utils
 from app.infrastructure.persistence.access_policy import AccessPolicyRepository
 from app.infrastructure.persistence.blacklist_token import BlacklistTokenRepository
 from app.infrastructure.persistence.group import GroupRepository
 from app.infrastructure.persistence.process_maker.action import ActionRepository
 from app.infrastructure.persistence.process_maker.activity import ActivityRepository
+from app.infrastructure.persistence.process_maker.activity_outbox import ActivityOutboxRepository
 from app.infrastructure.persistence.process_maker.process import ProcessRepository
 from app.infrastructure.persistence.process_maker.request import RequestRepository
 from app.infrastructure.persistence.process_maker.request_stakeholder import \
@@ -29,21 +31,67 @@ from app.infrastructure.persistence.process_maker.request_action import RequestA
 from app.infrastructure.persistence.process_maker.request_data import RequestDataRepository
 from app.infrastructure.persistence.process_maker.request_note import RequestNoteRepository
 from app.infrastructure.persistence.role import RoleRepository
+from app.infrastructure.persistence.search_backend import SearchBackend
 from app.infrastructure.persistence.user import UserRepository
+from app.infrastructure.smtp import Mail
 from app.pkgs.injector import Container
 from app.pkgs.logger import set_gunicorn_custom_logger
+from app.pkgs.metrics import RequestMetrics
+from app.pkgs.password_hasher import PasswordHasher
+from app.pkgs.retry import RetryPolicy
+from app.pkgs.template_renderer import TemplateRenderer
+from app.pkgs.token_blacklist import TokenBlacklist
+from app.pkgs.token_cache import TokenCache
+from app.pkgs.token_factory import TokenFactory
+from app.pkgs.type_check import set_enabled as set_type_check_enabled
+
+set_type_check_enabled(cli_config.TYPE_CHECK)
 
 container = Container()
 container.add_instance(cli_config)
 
 connection_pool = container.add_instance(
-    ConnectionPool(cli_config.DATABASE_URL, echo=cli_config.SQL_ECHO)
+    ConnectionPool(cli_config.DATABASE_URL, echo=cli_config.SQL_ECHO,
+                   async_workers=cli_config.DB_ASYNC_WORKERS,
+                   pool_size=cli_config.DB_POOL_SIZE, max_overflow=cli_config.DB_MAX_OVERFLOW,
+                   pool_recycle=cli_config.DB_POOL_RECYCLE, pool_timeout=cli_config.DB_POOL_TIMEOUT,
+                   pool_pre_ping=cli_config.DB_POOL_PRE_PING, http_unit_of_work=cli_config.DB_UNIT_OF_WORK)
+)
+password_hasher = container.add_instance(
+    PasswordHasher(cli_config.PASSWORD_HASH_ITERATIONS, cli_config.PASSWORD_HASH_WORKERS)
 )
+search_backend = container.add_instance(SearchBackend(connection_pool, cli_config.SEARCH_BACKEND))
 access_logger, error_logger = set_gunicorn_custom_logger(path=cli_config.LOG_FOLDER)
 # access_logger, error_logger = Logger('access'), Logger('error')
 access_logger: Logger = access_logger
 error_logger: Logger = error_logger
 container.add_instance(error_logger)
+token_cache = container.add_instance(
+    TokenCache(cli_config.TOKEN_CACHE_SIZE, cli_config.TOKEN_CACHE_TTL)
+)
+blacklist_index = container.add_instance(
+    TokenBlacklist(cli_config.BLACKLIST_CAPACITY, sync_interval=cli_config.BLACKLIST_SYNC_INTERVAL)
+)
+workflow_cache = container.add_instance(
+    WorkflowGraphCache(cli_config.WORKFLOW_CACHE_SIZE, cli_config.WORKFLOW_CACHE_TTL, connection_pool)
+)
+request_metrics = None
+if cli_config.METRICS_ENABLED:
+    request_metrics = container.add_instance(RequestMetrics(cli_config.SLOW_REQUEST_SECONDS))
+template_renderer = container.add_instance(
+    TemplateRenderer(cache_folder=cli_config.TEMPLATE_CACHE_FOLDER or None, auto_reload=cli_config.TEMPLATE_AUTO_RELOAD)
+)
+activity_retry_policy = container.add_instance(
+    RetryPolicy(cli_config.ACTIVITY_MAX_ATTEMPTS, cli_config.ACTIVITY_RETRY_BACKOFF)
+)
+if cli_config.MAIL_ENABLED:
+    # only sign up and the activity worker send emails, the smtp transport is created on first use
+    container.add_lazy(Mail, lambda: Mail(cli_config.MAIL_USERNAME, cli_config.MAIL_PASSWORD, cli_config.MAIL_PORT,
+                                          cli_config.MAIL_SERVER, use_ssl=cli_config.MAIL_USE_SSL,
+                                          use_tls=cli_config.MAIL_USE_TLS))
+    container.add_lazy(TokenFactory, lambda: TokenFactory(cli_config.SECRET_KEY, cli_config.SECURITY_PASSWORD_SALT))
+    container.add_lazy(EmailService, lambda: EmailService(container.get_singleton(Mail), cli_config.MAIL_DEFAULT_SENDER,
+                                                          container.get_singleton(TokenFactory), template_renderer))
 
 # all container should be placed here
 container.add_singleton(UserRepository)
@@ -53,8 +101,6 @@ container.add_singleton(BlacklistTokenRepository)
 container.add_singleton(UserRoleService)
 container.add_singleton(GroupRepository)
 container.add_singleton(UserService)
-container.add_singleton(Middleware)
-container.add_singleton(FastAPIMiddleware)
 container.add_singleton(ProcessRepository)
 container.add_singleton(ActivityRepository)
 container.add_singleton(ActionRepository)
@@ -71,12 +117,47 @@ container.add_singleton(ActionService)
 container.add_singleton(ActivityService)
 container.add_singleton(TargetService)
 container.add_singleton(GroupService)
+container.add_singleton(ActivityOutboxRepository)
 container.add_singleton(RequestService)
+container.add_lazy(ActivityOutboxService)  # used by the activity worker only
 container.build()
 
 user_role_service = container.get_singleton(UserRoleService)
 user_service = container.get_singleton(UserService)
 
-middleware = Middleware(user_service, error_logger)
-sanic_adapter_middleware = sanic_utils.Middleware(user_service, error_logger)
-fastapi_middleware = container.get_singleton(FastAPIMiddleware)
+
+# The http middlewares import their framework, they are created when an adapter first asks for them,
+# so cli commands and workers of one framework never import the others.
+
+
+def _create_flask_middleware():
+    from app.infrastructure.http.flask_adapter.middleware import Middleware
+    return container.create(Middleware)
+
+
+def _create_sanic_middleware():
+    from app.infrastructure.http.sanic_adapter import middleware as sanic_utils
+    return sanic_utils.Middleware(user_service, error_logger)
+
+
+def _create_fastapi_middleware():
+    from app.infrastructure.http.fastapi_adapter.middle_ware import FastAPIMiddleware
+    return container.create(FastAPIMiddleware)
+
+
+_lazy_attributes = {
+    'middleware': _create_flask_middleware,
+    'sanic_adapter_middleware': _create_sanic_middleware,
+    'fastapi_middleware': _create_fastapi_middleware,
+}
+_lazy_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    factory = _lazy_attributes.get(name)
+    if factory is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = factory()
+    return globals()[name]
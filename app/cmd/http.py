@@ -1,8 +1,12 @@
-from flask import Flask
-from sanic import Sanic
-from fastapi import FastAPI
+import asyncio
 
-from app.cmd.center_store import user_role_service, user_service
+from app.cmd.center_store import user_role_service, user_service, connection_pool, password_hasher, \
+    error_logger, container, template_renderer
+from app.domain.service.process_maker.activity_outbox_service import ActivityOutboxService
+from app.config import cli_config
+
+# only the framework of the selected adapter is imported, inside its create function
+HTTP_ADAPTERS = ('fastapi', 'flask', 'sanic')
 
 
 def create_first_time_config(admin_email, admin_password):
@@ -24,7 +28,36 @@ def create_first_time_config(admin_email, admin_password):
         print('append_role_to_user got error:', e)
 
 
+async def purge_blacklist_tokens_periodically(interval: float):
+    """Background job deleting blacklisted tokens past their 'exp', it keeps the table and the
+    in-process blacklist index bounded"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await connection_pool.run_sync(user_service.purge_expired_tokens)
+            if deleted:
+                error_logger.info(f'purged {deleted} expired blacklisted tokens')
+        except Exception as e:
+            error_logger.error(f'purge blacklisted tokens got error: {e}')
+
+
+async def run_activities_continuously(batch_size: int, poll_interval: float, lease: float):
+    """Background job running the activities of committed actions, it sleeps only when there is
+    nothing left to run"""
+    activity_outbox_service = container.get_singleton(ActivityOutboxService)
+    while True:
+        try:
+            claimed = await connection_pool.run_sync(activity_outbox_service.run_once, batch_size, lease)
+        except Exception as e:
+            error_logger.error(f'run activities got error: {e}', exc_info=e)
+            claimed = 0
+        if claimed < batch_size:
+            await asyncio.sleep(poll_interval)
+
+
 def create_flask_app(config_object):
+    from flask import Flask
+
     flask_app: Flask = Flask(__name__)
     flask_app.config.from_object(config_object)
 
@@ -40,6 +73,8 @@ def create_flask_app(config_object):
 
 
 def create_sanic_app(config_object):
+    from sanic import Sanic
+
     sanic_app: Sanic = Sanic(__name__)
     sanic_app.config.from_object(config_object)
     # Compress(sanic_app)
@@ -60,6 +95,8 @@ def create_sanic_app(config_object):
 
 
 def create_fastapi_app():
+    from fastapi import FastAPI
+
     fast_app = FastAPI(docs_url='/spec/api')
 
     from app.infrastructure.http.fastapi_adapter.admin import admin_api
@@ -79,7 +116,51 @@ def create_fastapi_app():
     fast_app.include_router(group_api, prefix='/api')
     fast_app.include_router(target_api, prefix='/api')
     fast_app.include_router(request_api, prefix='/api')
+    if cli_config.METRICS_ENABLED:
+        from app.infrastructure.http.fastapi_adapter.metrics import metrics_api
+        fast_app.include_router(metrics_api)
+    background_tasks = set()
+
+    def precompile_templates():
+        # compiled (or loaded from TEMPLATE_CACHE_FOLDER) before the first email, not during it
+        error_logger.info(f'compiled {template_renderer.precompile()} templates')
+
+    async def start_background_jobs():
+        await connection_pool.run_sync(user_service.blacklist_token_repo.sync_index)
+        background_tasks.add(asyncio.ensure_future(
+            purge_blacklist_tokens_periodically(cli_config.BLACKLIST_PURGE_INTERVAL)))
+        for _ in range(cli_config.ACTIVITY_WORKERS):
+            background_tasks.add(asyncio.ensure_future(run_activities_continuously(
+                cli_config.ACTIVITY_BATCH_SIZE, cli_config.ACTIVITY_POLL_INTERVAL, cli_config.ACTIVITY_LEASE)))
+
+    async def stop_background_jobs():
+        for task in background_tasks:
+            task.cancel()
+        background_tasks.clear()
+
+    fast_app.add_event_handler('startup', precompile_templates)
+    fast_app.add_event_handler('startup', start_background_jobs)
+    fast_app.add_event_handler('shutdown', stop_background_jobs)
+    fast_app.add_event_handler('shutdown', connection_pool.shutdown)
+    fast_app.add_event_handler('shutdown', password_hasher.shutdown)
     return fast_app
 
 
-app = create_fastapi_app()
+def create_app(adapter: str = None):
+    """App of the adapter selected by config HTTP_ADAPTER"""
+    adapter = (adapter or cli_config.HTTP_ADAPTER).lower()
+    if adapter == 'fastapi':
+        return create_fastapi_app()
+    if adapter == 'flask':
+        return create_flask_app(cli_config)
+    if adapter == 'sanic':
+        return create_sanic_app(cli_config)
+    raise ValueError(f'unknown http adapter {adapter!r}, expected one of {HTTP_ADAPTERS}')
+
+
+def __getattr__(name: str):
+    # `app` is created on first access (`from app.cmd.http import app`, `uvicorn app.cmd.http:app`)
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -31,8 +31,40 @@ class Config(object):
     PUBLIC_KEY = open(public_key_file).read()
     REQUEST_MAX_SIZE = 1000000  # 1mb
     REQUEST_TIMEOUT = 15  # 15s
+    TOKEN_CACHE_SIZE = 10000  # 0 to disable the verified token cache
+    TOKEN_CACHE_TTL = 60  # seconds
+    BLACKLIST_CAPACITY = 100000  # expected live blacklisted tokens, sizes the bloom filter
+    BLACKLIST_SYNC_INTERVAL = 5  # seconds, bounds how long a logout in another worker stays unseen
+    BLACKLIST_PURGE_INTERVAL = 3600  # seconds between two deletes of expired blacklisted tokens
+    WORKFLOW_CACHE_SIZE = 1000  # compiled process workflows kept per worker
+    WORKFLOW_CACHE_TTL = 300  # seconds, bounds how long another worker's change stays unseen
+    DB_POOL_SIZE = 5  # pool settings apply to server databases (mysql), not sqlite
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_RECYCLE = 3600  # seconds, keep it below mysql wait_timeout
+    DB_POOL_TIMEOUT = 30  # seconds
+    DB_POOL_PRE_PING = True
+    DB_ASYNC_WORKERS = 10  # threads running blocking db work of async handlers, 0 to run on the event loop
+    DB_UNIT_OF_WORK = True  # an http call commits once at the end instead of once per repository call
+    PASSWORD_HASH_ITERATIONS = 100000  # pbkdf2 rounds of new hashes, older hashes are upgraded on login
+    PASSWORD_HASH_WORKERS = 2  # threads computing password hashes, bounds the cpu taken by login bursts
+    SEARCH_BACKEND = 'trigram'  # 'trigram' (trigram index), 'contains' (no index), 'prefix' or 'fulltext' (mysql)
+    HTTP_ADAPTER = 'fastapi'  # 'fastapi', 'flask' or 'sanic', only the selected framework is imported
+    STREAM_BATCH_SIZE = 500  # rows read and serialized at a time by list endpoints called with ?stream=json|ndjson
+    TYPE_CHECK = True  # check the arguments of @type_check functions on every call
+    METRICS_ENABLED = True  # per route latency and sql statement metrics, served at /metrics
+    METRICS_PUBLIC = False  # serve /metrics without a token (scraped from an internal network), else admins only
+    SLOW_REQUEST_SECONDS = 1.0  # http calls slower than it are logged with their slowest sql, 0 to disable
+    ACTIVITY_WORKERS = 2  # background jobs running the activities of committed actions, 0 to disable
+    ACTIVITY_BATCH_SIZE = 100  # activities claimed by a worker at a time
+    ACTIVITY_POLL_INTERVAL = 1  # seconds a worker waits when there is no activity to run
+    ACTIVITY_LEASE = 300  # seconds before the activities claimed by a crashed worker are claimed again
+    ACTIVITY_MAX_ATTEMPTS = 5  # attempts of a failing activity before it is marked failed
+    ACTIVITY_RETRY_BACKOFF = 5  # seconds before the first retry, doubled on every retry
+    TEMPLATE_CACHE_FOLDER = ''  # folder of the compiled template bytecode shared by workers, '' to keep it in memory only
+    TEMPLATE_AUTO_RELOAD = False  # check the source of a template for changes on every render
 
     # mail settings
+    MAIL_ENABLED = False  # send the sign up confirmations and the request activity emails
     MAIL_SERVER = 'smtp.googlemail.com'
     MAIL_PORT = 465
     MAIL_USE_TLS = False
@@ -54,12 +86,26 @@ class Config(object):
             self.PORT = os.environ.get('PORT', 5000)
             self.DATABASE_URL = os.environ.get('sqlalchemy.url', 'sqlite:///./test.db')
             self.LOG_FOLDER = os.environ.get('log-folder', './logs')
+            self.DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', self.DB_POOL_SIZE))
+            self.DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', self.DB_MAX_OVERFLOW))
+            self.DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', self.DB_POOL_RECYCLE))
+            self.DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', self.DB_POOL_TIMEOUT))
+            self.DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', str(self.DB_POOL_PRE_PING)).lower() in ('1', 'true', 'yes')
+            self.SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', self.SEARCH_BACKEND)
+            self.HTTP_ADAPTER = os.environ.get('HTTP_ADAPTER', self.HTTP_ADAPTER)
+            self.SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', self.SLOW_REQUEST_SECONDS))
+            self.ACTIVITY_WORKERS = int(os.environ.get('ACTIVITY_WORKERS', self.ACTIVITY_WORKERS))
+            self.TYPE_CHECK = os.environ.get('TYPE_CHECK', '0') == '1'
+            self.TEMPLATE_CACHE_FOLDER = os.environ.get('TEMPLATE_CACHE_FOLDER', './cache/templates')
+            self.MAIL_ENABLED = os.environ.get('MAIL_ENABLED', '0') == '1'
+            self.METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
         elif mode == 'develop':
             self.DB_SERVER = '0.0.0.0'
             self.SQL_ECHO = False
             self.DEBUG = True
             self.PORT = os.environ.get('PORT', 5000)
             self.DATABASE_URL = 'sqlite:///./test.db'
+            self.TEMPLATE_AUTO_RELOAD = True
         elif mode == 'test':
             self.DB_SERVER = 'localhost'
             self.SQL_ECHO = False
@@ -1,9 +1,14 @@
-from asyncio import current_task
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import wraps
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Callable, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.orm import sessionmaker, Session, Query
+from typing import Any, Callable, Iterator, List, Optional
 from sqlalchemy.orm import scoped_session
 
 Base = declarative_base()
@@ -12,7 +17,7 @@ Base = declarative_base()
 from app.domain.model.user import User, UserRole
 from app.domain.model.role import Role, PermissionPolicy
 from app.domain.model.blacklist_token import BlacklistToken
-from app.domain.model.access_policy import AccessPolicy
+from app.domain.model.access_policy import AccessPolicy, AccessPolicyLatest
 from app.domain.model.group import Group, GroupMember
 from app.domain.model.process_maker.process import Process, ProcessAdmin
 from app.domain.model.process_maker.target import Target
@@ -21,25 +26,116 @@ from app.domain.model.process_maker.activity import Activity, ActivityTarget
 from app.domain.model.process_maker.state import State, StateActivity
 from app.domain.model.process_maker.route import Route, RouteActivity, RouteAction
 from app.domain.model.process_maker.request import Request, RequestNote, RequestStakeholder, RequestData, RequestAction
+from app.domain.model.process_maker.activity_outbox import ActivityOutbox
+from app.domain.model.trigram_index import add_trigram_indexes
+
+# searched text columns, see SearchBackend
+add_trigram_indexes([Action.__table__.c.name, Activity.__table__.c.name, Group.__table__.c.name,
+                     Process.__table__.c.name, Request.__table__.c.title, Role.__table__.c.name,
+                     State.__table__.c.name, Target.__table__.c.name, User.__table__.c.email])
+
+from app.pkgs.pool_metrics import InstrumentedQueuePool, PoolMetrics
+from app.pkgs.query_metrics import QueryMetrics
+from app.domain.model.session_registry import SessionRegistry
+
+# key of Session.info marking a session whose transaction is committed by its unit of work
+UNIT_OF_WORK = 'unit_of_work'
+# key of Session.info listing the callbacks run once the transaction of the session commits
+AFTER_COMMIT = 'after_commit'
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session: Session):
+    if session.transaction is not None and session.transaction.nested:
+        return  # a savepoint, the transaction is not committed yet
+    for callback in session.info.pop(AFTER_COMMIT, ()):
+        callback()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_after_commit(session: Session):
+    if session.transaction is not None and session.transaction.nested:
+        return
+    session.info.pop(AFTER_COMMIT, None)
 
 
 class ConnectionPool(object):
-    def __init__(self, connection_string: str, echo: bool = False):
-        self.engine = create_engine(connection_string, echo=echo)
+    def __init__(self, connection_string: str, echo: bool = False, async_workers: int = 0,
+                 pool_size: int = 5, max_overflow: int = 10, pool_recycle: int = -1,
+                 pool_timeout: int = 30, pool_pre_ping: bool = False, http_unit_of_work: bool = True):
+        """Pool of database sessions, one session per asyncio task (or per thread for sync code)
+
+        Args:
+            connection_string (str): sqlalchemy database url
+            echo (bool, optional): log all sql statements. Defaults to False.
+            async_workers (int, optional): number of threads which run blocking database work for
+                run_sync, 0 runs it directly on the event loop. Defaults to 0.
+            pool_size (int, optional): connections kept open in the pool. Defaults to 5.
+            max_overflow (int, optional): connections opened above pool_size under load. Defaults to 10.
+            pool_recycle (int, optional): seconds after which a connection is replaced, -1 never.
+                Defaults to -1.
+            pool_timeout (int, optional): seconds to wait for a free connection. Defaults to 30.
+            pool_pre_ping (bool, optional): test a connection before each checkout. Defaults to False.
+            http_unit_of_work (bool, optional): an http call runs in one transaction committed by the
+                adapter, instead of one commit per repository call. Defaults to True.
+
+        Pool sizing only applies to server databases, sqlite keeps the pool of its dialect.
+        """
+        self.async_workers = async_workers
+        self.pool_options = dict(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle,
+                                 pool_timeout=pool_timeout)
+        self.pool_pre_ping = pool_pre_ping
+        self.http_unit_of_work = http_unit_of_work
+        self.pool_metrics = PoolMetrics()
+        self.query_metrics = QueryMetrics()
+        self.engine = self.create_engine(connection_string, echo=echo)
         self.connection_string: str = connection_string
         session_factory = scoped_session(
             sessionmaker(bind=self.engine, expire_on_commit=False, autocommit=False)
         )
         self.session_factory = session_factory
         self._is_test: bool = False
-        self.task_to_session_map: Dict[int, Session] = {}
+        # session of each asyncio task (or thread for sync code) opened by open_session
+        self.sessions = SessionRegistry()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def engine_options(self, connection_string: str) -> dict:
+        options = dict(pool_pre_ping=self.pool_pre_ping)
+        if connection_string.startswith('sqlite'):
+            if connection_string in ('sqlite://', 'sqlite:///:memory:'):
+                # one connection shared by all threads, otherwise each thread sees another empty database
+                options.update(poolclass=StaticPool, connect_args={'check_same_thread': False})
+            elif self.async_workers:
+                # the session of a task is used by different worker threads, one after another
+                options.update(connect_args={'check_same_thread': False})
+            return options
+        options.update(self.pool_options, poolclass=InstrumentedQueuePool)
+        return options
+
+    def create_engine(self, connection_string: str, echo: bool = False) -> Engine:
+        engine = create_engine(connection_string, echo=echo, **self.engine_options(connection_string))
+        self.pool_metrics.listen(engine)
+        self.query_metrics.listen(engine)
+        return engine
+
+    def pool_status(self) -> dict:
+        """Current usage of the engine pool and its counters since start"""
+        pool = self.engine.pool
+        status = dict(pool_class=type(pool).__name__)
+        if isinstance(pool, QueuePool):
+            status.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                          overflow=pool.overflow())
+        status.update(self.pool_metrics.to_json())
+        status.update(self.query_metrics.to_json())
+        status.update(self.sessions.to_json())
+        return status
 
     def open_test_session(self):
         print('warning: this is test session. Do not use in production')
         # create_engine("sqlite:///:memory:") or create_engine('sqlite:///./test_session.db')
         # will work as well, but we use file to make more real world tests
         connection_string = 'sqlite:///:memory:'
-        self.engine = create_engine(connection_string, echo=False)
+        self.engine = self.create_engine(connection_string, echo=False)
         self.connection_string: str = connection_string
         session_factory = scoped_session(
             sessionmaker(bind=self.engine, expire_on_commit=False, autocommit=False)
@@ -53,53 +149,157 @@ class ConnectionPool(object):
 
     def close_test_session(self):
         self._is_test = False
-        for k, session in self.task_to_session_map.items():
+        for session in self.sessions.live_sessions():
             session.close()
             raise ValueError(f'unclose session')
         print('\nwarning: test session is closed')
 
-    def open_session(self) -> Session:
-        task_id = self.get_current_task_id()
-        if task_id not in self.task_to_session_map:
-            # print('open task', task.get_name())
-            self.task_to_session_map[task_id] = self.session_factory()
-        return self.task_to_session_map[task_id]
+    def open_session(self, unit_of_work: bool = False) -> Session:
+        """Session of the current task, used by all repository calls until close_session.
+
+        With unit_of_work, repositories only flush: the caller commits or rolls back the session.
+        """
+        # a plain session, the thread-scoped one is shared by all tasks of the event loop
+        session = self.sessions.open(self.session_factory.session_factory)
+        if unit_of_work:
+            session.info[UNIT_OF_WORK] = True
+        return session
 
     def close_session(self):
-        task_id = self.get_current_task_id()
-        if task_id in self.task_to_session_map:
-            # print('close task', task.get_name())
-            session = self.task_to_session_map.pop(task_id)
+        self.sessions.close()
+
+    @contextmanager
+    def unit_of_work(self) -> Session:
+        """One session and one transaction for all repository calls of the block, committed at its
+        end and rolled back on error. A nested block joins the outer one.
+        """
+        session = self.sessions.get()
+        if session is not None and session.info.get(UNIT_OF_WORK):
+            yield session
+            return
+        owns_session = session is None
+        session = self.open_session(unit_of_work=True)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.info.pop(UNIT_OF_WORK, None)
+            if owns_session:
+                self.close_session()
+
+    def after_commit(self, callback: Callable[[], Any]):
+        """Run callback once the changes made so far are committed, e.g. to invalidate a cache.
+
+        In a unit of work it runs after the commit of the unit of work and is dropped if it rolls
+        back. Otherwise the repository calls have committed already and it runs now.
+        """
+        session = self.sessions.get()
+        if session is None or not session.info.get(UNIT_OF_WORK):
+            callback()
+            return
+        session.info.setdefault(AFTER_COMMIT, []).append(callback)
+
+    def transactional(self, func: Callable) -> Callable:
+        """Decorator running a (service) function in a unit of work"""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.unit_of_work():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def stream(self, build_query: Callable[[Session], Query], batch_size: int = 500,
+               server_side: bool = True) -> Iterator[List]:
+        """Rows of the query made by build_query, in lists of batch_size fetched with yield_per.
+
+        The rows are read with a session of their own, closed when the iteration ends, so they can
+        be read after the call and its session ended (a streamed response). The query is built now:
+        a wrong argument raises here, not in the middle of the iteration.
+
+        A server side cursor (mysql) keeps the connection busy until the end: run other queries of
+        the session between batches only with server_side=False, then the driver buffers the raw rows
+        and only the objects are created a batch at a time.
+        """
+        session = self.session_factory.session_factory()
+        try:
+            query = build_query(session).yield_per(batch_size)
+            if not server_side:
+                query = query.execution_options(stream_results=False)
+        except BaseException:
             session.close()
+            raise
+        return self._iter_batches(session, query, batch_size)
 
-    def get_current_task_id(self) -> int:
+    @staticmethod
+    def _iter_batches(session: Session, query: Query, batch_size: int) -> Iterator[List]:
+        # the identity map holds the rows weakly, a batch is freed once the consumer drops it
         try:
-            return id(current_task())
-        except RuntimeError as e:
-            return 0
+            rows = iter(query)
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    return
+                yield batch
+        finally:
+            session.close()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.async_workers, thread_name_prefix='db')
+        return self._executor
+
+    async def run_sync(self, func: Callable, *args, **kwargs) -> Any:
+        """Run blocking database work of the current task without blocking the event loop.
+
+        func runs in a worker thread but uses the session opened by the calling task, so a handler
+        can call repositories and services through it as usual.
+        """
+        if not self.async_workers:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.sessions.bind(func, *args, **kwargs))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     def new_session(self):
-        task_id = self.get_current_task_id()
-        if task_id in self.task_to_session_map:
-            new_session = self.task_to_session_map[task_id]
+        new_session = self.sessions.get()
+        if new_session is not None:
             auto_handle = True
         else:
             new_session = self.session_factory()
             auto_handle = False
-        return SQLAlchemyDBConnection(session=new_session, auto_handle=auto_handle)
+        return SQLAlchemyDBConnection(session=new_session, auto_handle=auto_handle,
+                                      flush_only=new_session.info.get(UNIT_OF_WORK, False))
 
 
 class SQLAlchemyDBConnection(object):
-    """SQLAlchemy database connection"""
+    """SQLAlchemy database connection
+
+    It commits on exit, or only flushes inside a unit of work which commits once at its end.
+    """
 
-    def __init__(self, session: Session, auto_handle=False):
+    def __init__(self, session: Session, auto_handle=False, flush_only=False):
         self.auto_handle = auto_handle
+        self.flush_only = flush_only
         self.session: Session = session
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.flush_only:
+            # send the changes to get ids and constraint errors now, the unit of work commits them
+            if exc_type is None:
+                self.session.flush()
+            return
         try:
             self.session.commit()
         except Exception as e:
@@ -1,12 +1,19 @@
 import datetime
 from typing import Optional, List
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, Index, text
+
+
+def keyset_index(table_name: str) -> Index:
+    """Index serving the (updated_at desc, id desc) pages of db_helper.paginate"""
+    return Index(f'ix_{table_name}_updated_at_id', 'updated_at', 'id')
 
 
 class Serializable:
     created_at: datetime.datetime = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at: datetime.datetime = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    # never NULL: db_helper.paginate orders and filters the raw (updated_at, id) columns
+    updated_at: datetime.datetime = Column(DateTime, index=True, nullable=False, default=datetime.datetime.utcnow,
+                                           server_default=text('CURRENT_TIMESTAMP'))
     deleted_at: Optional[datetime.datetime] = Column(DateTime, index=True)
     _json_black_list: List[str] = []
 
@@ -31,3 +31,22 @@ class AccessPolicy(Base):
 
     def __repr__(self):
         return f'<UserUpdateChecker: user_id: {self.user_id}, role_id: {self.role_id}'
+
+
+class AccessPolicyLatest(Base):
+    """Latest denial of each user and each role, maintained together with AccessPolicy.
+
+    AccessPolicy keeps every change, this table keeps one row per subject, so token validation
+    reads one row of the user and one per role of the token by primary key.
+    """
+    __tablename__ = 'access_policy_latest'
+    USER = 'user'
+    ROLE = 'role'
+
+    subject_type: str = Column(String(16), primary_key=True)  # USER or ROLE
+    subject_id: int = Column(Integer, primary_key=True)
+    note: str = Column(String(250))
+    denied_before: datetime.datetime = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<AccessPolicyLatest: {self.subject_type}: {self.subject_id}, denied_before: {self.denied_before}'
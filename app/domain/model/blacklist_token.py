@@ -14,6 +14,7 @@ class BlacklistToken(Base):
     id: int = Column(Integer, primary_key=True, autoincrement=True)
     token: str = Column(String(500), unique=True, nullable=False)
     blacklisted_on: datetime.datetime = Column(DateTime, nullable=False)
+    expires_at: datetime.datetime = Column(DateTime, index=True)  # 'exp' of the token, utc
 
     def __repr__(self):
         return '<id: token: {}'.format(self.token)
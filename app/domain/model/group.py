@@ -2,14 +2,15 @@ from sqlalchemy import Column, Integer, ForeignKey, String
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.utils import validation
 
 
 class Group(Base, Serializable):
     __tablename__ = 'group'
+    __table_args__ = (keyset_index('group'),)
     id: int = Column(Integer, primary_key=True)
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
 
     member = relationship("User", secondary='group_member', back_populates="group")
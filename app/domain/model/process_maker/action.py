@@ -2,7 +2,7 @@ from sqlalchemy import Column, String, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.model.process_maker.action_type import ActionType
 from app.domain.utils import validation, error_collection
 
@@ -10,8 +10,9 @@ from app.domain.utils import validation, error_collection
 class Action(Base, Serializable):
     """Actions: Things a user can perform on a Request."""
     __tablename__ = 'action'
+    __table_args__ = (keyset_index('action'),)
     id: int = Column(Integer, primary_key=True)
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
     action_type: str = Column(String(128))
 
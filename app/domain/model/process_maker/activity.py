@@ -5,7 +5,7 @@ from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.model.process_maker.activity_type import ActivityType
 from app.domain.utils import validation, error_collection
 
@@ -14,8 +14,9 @@ class Activity(Base, Serializable):
     """Activities: Things that result from a Request moving to a particular State or following a
     particular Transition. """
     __tablename__ = 'activity'
+    __table_args__ = (keyset_index('activity'),)
     id: int = Column(Integer, primary_key=True)
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
     activity_type: str = Column(String(128))
 
@@ -0,0 +1,34 @@
+import json
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+
+from app.domain.model import Base
+from app.domain.model._serializable import Serializable
+
+
+class OutboxStatus:
+    pending = 'pending'  # waiting for its next attempt
+    running = 'running'  # claimed by a worker until locked_until
+    done = 'done'
+    failed = 'failed'  # gave up after the last attempt
+
+
+class ActivityOutbox(Base, Serializable):
+    """Activity triggered by a request action, recorded in the same transaction and run later by
+    the activity worker"""
+    __tablename__ = 'activity_outbox'
+    id: int = Column(Integer, primary_key=True)
+    request_id: int = Column(Integer, ForeignKey('request.id'), index=True)
+    activity_id: int = Column(Integer)
+    activity_type: str = Column(String(128))
+    payload: str = Column(String(4000))  # arguments of the activity in json format
+    status: str = Column(String(16), default=OutboxStatus.pending, index=True)
+    attempts: int = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, index=True)
+    claim_token: str = Column(String(32), index=True)  # worker batch which runs it
+    locked_until = Column(DateTime)  # a crashed worker's claim expires then
+    last_error: str = Column(String(500))
+
+    @property
+    def arguments(self) -> dict:
+        return json.loads(self.payload) if self.payload else {}
@@ -4,7 +4,7 @@ from sqlalchemy import Column, String, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.utils import validation, error_collection
 
 
@@ -16,8 +16,9 @@ class ProcessStatus:
 
 class Process(Base, Serializable):
     __tablename__ = 'process'
+    __table_args__ = (keyset_index('process'),)
     id: int = Column(Integer, primary_key=True)
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
     status: str = Column(String(64), default='inactive')  # default is active
 
@@ -1,10 +1,10 @@
 from typing import List
 
 from sqlalchemy import Column, String, Integer, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import object_session, relationship
 
 from app.domain.model import Base, Route
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.utils import validation, error_collection
 
 
@@ -36,8 +36,9 @@ class Request(Base, Serializable):
     - if it's empty '', that mean no model and request data can be anything
     """
     __tablename__ = 'request'
+    __table_args__ = (keyset_index('request'),)
     id: int = Column(Integer, primary_key=True)
-    title: str = Column(String(500))
+    title: str = Column(String(500), index=True)
     user_id: int = Column(Integer, ForeignKey('users.id'))
     process_id: int = Column(Integer, ForeignKey('process.id'))
     current_state_id: int = Column(Integer, ForeignKey('state.id'))
@@ -58,6 +59,14 @@ class Request(Base, Serializable):
     def get_route(self) -> List[Route]:
         return self.current_state.route
 
+    def move_to_state(self, state_id: int):
+        """Set the current state by id, without loading the state"""
+        self.current_state_id = state_id
+        session = object_session(self)
+        if session is not None and 'current_state' in self.__dict__:
+            # the loaded state is the previous one, drop it so it is not serialized or flushed back
+            session.expire(self, ['current_state'])
+
     def validate(self):
         self.title = validation.validate_short_paragraph(self.title)
         if self.entity_model:
@@ -4,16 +4,17 @@ from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.model.process_maker.state_type import StateType
 from app.domain.utils import validation, error_collection
 
 
 class State(Base, Serializable):
     __tablename__ = 'state'
+    __table_args__ = (keyset_index('state'),)
     id: int = Column(Integer, primary_key=True)
     process_id: int = Column(Integer, ForeignKey('process.id'))
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
     state_type: str = Column(String(128))
 
@@ -4,7 +4,7 @@ from sqlalchemy import Column, String, Integer
 from sqlalchemy.orm import relationship
 
 from app.domain.model import Base
-from app.domain.model._serializable import Serializable
+from app.domain.model._serializable import Serializable, keyset_index
 from app.domain.utils import validation, error_collection
 
 
@@ -21,8 +21,9 @@ class Target(Base, Serializable):
     As people who can perform Actions
     As people who can receive Activities"""
     __tablename__ = 'target'
+    __table_args__ = (keyset_index('target'),)
     id: int = Column(Integer, primary_key=True)
-    name: str = Column(String(128))
+    name: str = Column(String(128), index=True)
     description: str = Column(String(500))
     target_type: str = Column(String(128), default=TargetType.group)   # default is group but can be user also
     group_id: int = Column(Integer)
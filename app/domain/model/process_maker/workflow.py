@@ -0,0 +1,141 @@
+"""Compiled, read-only view of a process definition (states, routes, actions and activities)"""
+from dataclasses import asdict, dataclass
+from types import MappingProxyType
+from typing import FrozenSet, Iterable, Mapping, Optional, Tuple
+
+from app.domain.model.process_maker.action import Action
+from app.domain.model.process_maker.activity import Activity
+from app.domain.model.process_maker.route import Route
+from app.domain.model.process_maker.state import State
+
+
+def _to_json_value(value):
+    if isinstance(value, (tuple, list)):
+        return [_to_json_value(v) for v in value]
+    if isinstance(value, frozenset):
+        return sorted(value)
+    if isinstance(value, dict):
+        return {k: _to_json_value(v) for k, v in value.items()}
+    return value
+
+
+class _Node:
+    """Serializable like the models, a node can take the place of its model in a response"""
+
+    def to_json(self) -> dict:
+        return _to_json_value(asdict(self))
+
+
+@dataclass(frozen=True)
+class ActivityNode(_Node):
+    id: int
+    name: str
+    activity_type: str
+
+    @classmethod
+    def from_model(cls, activity: Activity) -> 'ActivityNode':
+        return cls(id=activity.id, name=activity.name, activity_type=activity.activity_type)
+
+
+@dataclass(frozen=True)
+class ActionNode(_Node):
+    id: int
+    name: str
+    action_type: str
+    group_ids: FrozenSet[int]  # groups whose members can commit the action
+
+    @classmethod
+    def from_model(cls, action: Action) -> 'ActionNode':
+        return cls(id=action.id, name=action.name, action_type=action.action_type,
+                   group_ids=frozenset(target.group_id for target in action.target))
+
+
+@dataclass(frozen=True)
+class StateNode(_Node):
+    id: int
+    name: str
+    description: str
+    state_type: str
+    activities: Tuple[ActivityNode, ...]
+
+    @classmethod
+    def from_model(cls, state: State) -> 'StateNode':
+        return cls(id=state.id, name=state.name, description=state.description, state_type=state.state_type,
+                   activities=tuple(ActivityNode.from_model(a) for a in state.activity))
+
+
+@dataclass(frozen=True)
+class RouteNode(_Node):
+    id: int
+    current_state_id: int
+    next_state_id: Optional[int]
+    action_ids: Tuple[int, ...]
+    activities: Tuple[ActivityNode, ...]
+
+    @classmethod
+    def from_model(cls, route: Route) -> 'RouteNode':
+        return cls(id=route.id, current_state_id=route.current_state_id, next_state_id=route.next_state_id,
+                   action_ids=tuple(a.id for a in route.action),
+                   activities=tuple(ActivityNode.from_model(a) for a in route.activity))
+
+
+class WorkflowGraph(object):
+    """Immutable workflow of one process, every lookup is a dictionary access.
+
+    Build it with WorkflowGraph.build from the states of a process, each with its activities and its
+    routes (with their actions, action targets and activities) loaded.
+    """
+
+    def __init__(self, process_id: int, states: Iterable[StateNode], routes: Iterable[RouteNode],
+                 actions: Iterable[ActionNode]):
+        self.process_id = process_id
+        states = tuple(states)
+        routes = tuple(routes)
+        self.states: Mapping[int, StateNode] = MappingProxyType({s.id: s for s in states})
+        self.actions: Mapping[int, ActionNode] = MappingProxyType({a.id: a for a in actions})
+        states_by_type = {}
+        for state in states:
+            states_by_type.setdefault(state.state_type, []).append(state)
+        self.states_by_type: Mapping[str, Tuple[StateNode, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in states_by_type.items()})
+        routes_by_state = {}
+        routes_by_state_action = {}
+        for route in routes:
+            routes_by_state.setdefault(route.current_state_id, []).append(route)
+            for action_id in route.action_ids:
+                # like the ORM walk, the last route of a state wins if several carry the action
+                routes_by_state_action[(route.current_state_id, action_id)] = route
+        self.routes_by_state: Mapping[int, Tuple[RouteNode, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in routes_by_state.items()})
+        self.routes_by_state_action: Mapping[Tuple[int, int], RouteNode] = MappingProxyType(
+            routes_by_state_action)
+
+    @classmethod
+    def build(cls, process_id: int, states: Iterable[State]) -> 'WorkflowGraph':
+        state_nodes, route_nodes, action_nodes = [], [], {}
+        for state in states:
+            state_nodes.append(StateNode.from_model(state))
+            for route in state.route:
+                if route.deleted_at is not None:
+                    continue
+                route_nodes.append(RouteNode.from_model(route))
+                for action in route.action:
+                    if action.id not in action_nodes:
+                        action_nodes[action.id] = ActionNode.from_model(action)
+        return cls(process_id, state_nodes, route_nodes, action_nodes.values())
+
+    def find_state(self, state_id: int) -> Optional[StateNode]:
+        return self.states.get(state_id)
+
+    def find_state_by_type(self, state_type: str) -> Optional[StateNode]:
+        states = self.states_by_type.get(state_type)
+        return states[0] if states else None
+
+    def find_route(self, state_id: int, action_id: int) -> Optional[RouteNode]:
+        return self.routes_by_state_action.get((state_id, action_id))
+
+    def find_actions(self, state_id: int) -> Tuple[ActionNode, ...]:
+        """Actions which can be committed from the state, in route order"""
+        return tuple(self.actions[action_id]
+                     for route in self.routes_by_state.get(state_id, ())
+                     for action_id in route.action_ids)
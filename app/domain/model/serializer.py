@@ -0,0 +1,119 @@
+"""Serializers compiled once from the sqlalchemy mapper of a model, the fast path of to_json"""
+import datetime
+import logging
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, inspect as sa_inspect
+
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+
+class NotLoadedError(Exception):
+    """An included relationship is not loaded and the serializer is strict"""
+
+
+def _isoformat(value: Optional[datetime.date]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _split_paths(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """{'a': ['b', 'c']} from ['a.b', 'a.c'], {'a': []} from ['a']"""
+    children = {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        children.setdefault(head, [])
+        if rest:
+            children[head].append(rest)
+    return children
+
+
+class Serializer(object):
+    """Serialize one model with an explicit field list.
+
+    Columns, their converters and the nested serializers are resolved from the mapper when the
+    serializer is created, so serializing an object is a plain loop over attributes without any
+    reflection. The output contains the columns of the model and exactly the included
+    relationships, whatever else is loaded on the object.
+    """
+
+    def __init__(self, model, exclude: Iterable[str] = (), include: Iterable[str] = (),
+                 sources: Mapping[str, str] = None, strict: bool = False):
+        """Compile serializer of model
+
+        Args:
+            model: sqlalchemy model class
+            exclude (Iterable[str], optional): columns left out, dotted paths for nested models
+                (eg: 'user.password'). Defaults to ().
+            include (Iterable[str], optional): relationships to serialize, dotted paths for deeper
+                levels (eg: 'current_state.activity'). The depth of the output is the depth of the
+                paths. Defaults to ().
+            sources (Mapping[str, str], optional): attribute holding an included relationship when
+                it is not loaded on the relationship itself (eg: a dynamic relationship loaded by
+                the repository), dotted keys for nested models. Defaults to None.
+            strict (bool, optional): raise NotLoadedError when an included relationship is not
+                loaded, otherwise it is lazy loaded with a warning. Defaults to False.
+
+        Included relationships should be loaded (eagerly) before serializing, a lazy load costs one
+        query per object.
+        """
+        self.model = model
+        self.strict = strict
+        mapper = sa_inspect(model)
+        excluded = _split_paths(exclude)
+        own_sources = {k: v for k, v in (sources or {}).items() if '.' not in k}
+        self.columns: Tuple[Tuple[str, Optional[Callable]], ...] = tuple(
+            (attr.key, self._converter(attr.columns[0].type))
+            for attr in mapper.column_attrs
+            if not attr.key.startswith('_') and not (attr.key in excluded and not excluded[attr.key]))
+        relationships = []
+        for key, sub_paths in _split_paths(include).items():
+            if key not in mapper.relationships:
+                raise ValueError(f'{model.__name__} has no relationship {key}')
+            relationship = mapper.relationships[key]
+            nested = Serializer(relationship.mapper.class_, exclude=excluded.get(key, ()), include=sub_paths,
+                                sources={k.partition('.')[2]: v for k, v in (sources or {}).items()
+                                         if k.startswith(key + '.')}, strict=strict)
+            relationships.append((key, own_sources.get(key), relationship.uselist, nested))
+        self.relationships: Tuple[Tuple[str, Optional[str], bool, 'Serializer'], ...] = tuple(relationships)
+
+    @staticmethod
+    def _converter(column_type) -> Optional[Callable]:
+        if isinstance(column_type, (DateTime, Date)):
+            return _isoformat
+        return None
+
+    def _relationship_value(self, obj, key: str, source: Optional[str]):
+        if source is not None:
+            value = getattr(obj, source, _MISSING)
+        else:
+            # read the loaded value only, getattr would lazy load it
+            value = obj.__dict__.get(key, _MISSING)
+        if value is _MISSING:
+            message = f'{self.model.__name__}.{key} is not loaded, load it eagerly before serializing'
+            if self.strict:
+                raise NotLoadedError(message)
+            logger.warning(f'{message}, it is lazy loaded')
+            value = getattr(obj, key)
+        return value
+
+    def serialize(self, obj) -> Optional[dict]:
+        if obj is None:
+            return None
+        data = {}
+        for key, convert in self.columns:
+            value = getattr(obj, key)
+            data[key] = convert(value) if convert is not None else value
+        for key, source, uselist, nested in self.relationships:
+            value = self._relationship_value(obj, key, source)
+            if uselist:
+                data[key] = [nested.serialize(item) for item in value]
+            else:
+                data[key] = nested.serialize(value)
+        return data
+
+    def serialize_many(self, objs: Iterable) -> List[dict]:
+        return [self.serialize(obj) for obj in objs]
+
+    __call__ = serialize
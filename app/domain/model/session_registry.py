@@ -0,0 +1,137 @@
+"""Module contain the registry of the database session used by each asyncio task or thread"""
+import asyncio
+import contextvars
+import threading
+import weakref
+from functools import partial
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.pkgs.atomic_counter import AtomicInteger
+
+
+class SessionScope(object):
+    """Session of one owner: an asyncio task, or a thread for sync code"""
+    __slots__ = ('owner', 'session', 'watched', '__weakref__')
+
+    def __init__(self, owner):
+        # weak, the scope must not keep a finished task or thread alive
+        self.owner = weakref.ref(owner)
+        self.session: Optional[Session] = None
+        self.watched = False
+
+
+class SessionRegistry(object):
+    """Session of the current task or thread, kept in a context variable.
+
+    A scope belongs to the task (or thread) which created it: a task started by another one inherits
+    its context but gets its own scope. run_sync hands the scope of a task to the worker thread which
+    runs its blocking code. A session which is not closed is closed when its task ends or its thread
+    is gone, and counted as leaked.
+    """
+
+    def __init__(self, name: str = 'db_session'):
+        self._scope = contextvars.ContextVar(f'{name}_scope', default=None)
+        self._bound_owner = contextvars.ContextVar(f'{name}_owner', default=None)
+        self._live = set()
+        self._lock = threading.Lock()
+        self.opened = AtomicInteger(0)
+        self.leaked = AtomicInteger(0)
+
+    def owner(self):
+        owner = self._bound_owner.get()
+        if owner is not None:
+            return owner
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return task if task is not None else threading.current_thread()
+
+    def scope(self, create: bool = False) -> Optional[SessionScope]:
+        owner = self.owner()
+        scope: SessionScope = self._scope.get()
+        if scope is not None and scope.owner() is owner:
+            return scope
+        if not create:
+            return None
+        scope = SessionScope(owner)
+        self._scope.set(scope)
+        return scope
+
+    def get(self) -> Optional[Session]:
+        scope = self.scope()
+        return scope.session if scope is not None else None
+
+    def open(self, session_factory: Callable[[], Session]) -> Session:
+        scope = self.scope(create=True)
+        if scope.session is None:
+            scope.session = session_factory()
+            with self._lock:
+                self._live.add(scope)
+            self.opened.inc()
+            if not scope.watched:
+                self._watch(scope)
+        return scope.session
+
+    def close(self):
+        scope = self.scope()
+        if scope is not None:
+            self._close(scope)
+
+    def _close(self, scope: SessionScope):
+        session, scope.session = scope.session, None
+        if session is None:
+            return
+        with self._lock:
+            self._live.discard(scope)
+        session.close()
+
+    def _release(self, scope_ref: weakref.ref, *args):
+        # the owner is gone
+        scope = scope_ref()
+        if scope is not None and scope.session is not None:
+            self.leaked.inc()
+            self._close(scope)
+
+    def _watch(self, scope: SessionScope):
+        scope.watched = True
+        owner = scope.owner()
+        release = partial(self._release, weakref.ref(scope))
+        if isinstance(owner, asyncio.Task):
+            if self._bound_owner.get() is None:
+                owner.add_done_callback(release)
+            else:
+                # a worker thread of the task, callbacks must be added in the thread of its loop
+                owner.get_loop().call_soon_threadsafe(owner.add_done_callback, release)
+        else:
+            weakref.finalize(owner, release)
+
+    def bind(self, func: Callable, *args, **kwargs) -> Callable[[], Any]:
+        """func as a call for another thread, sharing the session scope of the current owner"""
+        owner = self.owner()
+        self.scope(create=True)
+        context = contextvars.copy_context()
+        return partial(context.run, self._run_as, owner, func, args, kwargs)
+
+    def _run_as(self, owner, func: Callable, args: tuple, kwargs: dict):
+        self._bound_owner.set(owner)
+        return func(*args, **kwargs)
+
+    def live_sessions(self) -> List[Session]:
+        with self._lock:
+            return [scope.session for scope in self._live if scope.session is not None]
+
+    @property
+    def live(self) -> int:
+        """Gauge of open sessions, it grows with leaks"""
+        with self._lock:
+            return len(self._live)
+
+    def to_json(self) -> dict:
+        return {
+            'live_sessions': self.live,
+            'opened_sessions': self.opened.value,
+            'leaked_sessions': self.leaked.value,
+        }
@@ -0,0 +1,54 @@
+"""Trigram indexes of the searched text columns, they serve SEARCH_BACKEND = 'trigram'.
+
+A plain index cannot answer LIKE '%term%', every database has its own index which can:
+    sqlite: FTS5 table with the trigram tokenizer, kept in sync with the column by triggers.
+    mysql: FULLTEXT index with the ngram parser.
+    postgresql: GIN index with the pg_trgm operator class.
+The indexes are created with their table (create_all), the migration adds them to existing tables.
+"""
+from typing import Iterable, List
+
+from sqlalchemy import DDL, Column, event
+
+MIN_TERM_LENGTH = 3  # an FTS5 trigram query needs at least one trigram
+
+
+def fts_table(column: Column) -> str:
+    """Name of the sqlite FTS5 table of column, its rowid is the id of the row"""
+    return f'fts_{column.table.name}_{column.name}'
+
+
+def sqlite_ddl(table: str, column: str) -> List[str]:
+    fts = f'fts_{table}_{column}'
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id', "
+        f"tokenize='trigram')",
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END',
+    ]
+
+
+def mysql_ddl(table: str, column: str) -> List[str]:
+    return [f'CREATE FULLTEXT INDEX ngram_{table}_{column} ON `{table}` ({column}) WITH PARSER ngram']
+
+
+def postgresql_ddl(table: str, column: str) -> List[str]:
+    return ['CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            f'CREATE INDEX trgm_{table}_{column} ON "{table}" USING gin ({column} gin_trgm_ops)']
+
+
+def add_trigram_indexes(columns: Iterable[Column]):
+    """Create the trigram index of every column together with its table"""
+    for column in columns:
+        table = column.table
+        for dialect, ddl in (('sqlite', sqlite_ddl), ('mysql', mysql_ddl), ('postgresql', postgresql_ddl)):
+            for statement in ddl(table.name, column.name):
+                event.listen(table, 'after_create', DDL(statement).execute_if(dialect=dialect))
+        # the triggers are dropped with the table
+        event.listen(table, 'before_drop', DDL(f'DROP TABLE IF EXISTS {fts_table(column)}')
+                     .execute_if(dialect='sqlite'))
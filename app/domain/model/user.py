@@ -1,6 +1,3 @@
-import binascii
-import hashlib
-import os
 from collections import namedtuple
 from dataclasses import dataclass
 from datetime import datetime
@@ -10,12 +7,14 @@ from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 
 from . import Base
-from ._serializable import Serializable
+from ._serializable import Serializable, keyset_index
 from .role import Role
+from app.pkgs.password_hasher import default_hasher
 
 
 class User(Base, Serializable):
     __tablename__ = 'users'
+    __table_args__ = (keyset_index('users'),)
     id: int = Column(Integer, primary_key=True)
     email: str = Column(String(128), unique=True)
     password: str = Column(String(255))
@@ -25,13 +24,16 @@ class User(Base, Serializable):
     request = relationship("Request", back_populates="user")
     group = relationship("Group", secondary='group_member', back_populates="member")
     token: str = ''
+    loaded_roles: List[Role]  # set by UserRepository.search_with_roles, saves the query of roles
 
-    _json_black_list: List[str] = ['password']
+    _json_black_list: List[str] = ['password', 'loaded_roles']
 
     def to_json(self) -> dict:
         json_data = super().to_json()  # Call the to_json method of the base class
-        roles = [r.to_json() for r in self.roles]
-        json_data['roles'] = roles
+        roles = self.__dict__.get('loaded_roles')
+        if roles is None:
+            roles = self.roles
+        json_data['roles'] = [r.to_json() for r in roles]
         return json_data
 
     def json(self) -> dict:
@@ -46,25 +48,13 @@ class User(Base, Serializable):
         return instance
 
     def hash_password(self, password):
-        """Hash a password for storing."""
-        salt = hashlib.sha256(os.urandom(60)).hexdigest().encode('ascii')
-        password_hash = hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'),
-                                            salt, 100000)
-        password_hash = binascii.hexlify(password_hash)
-        self.password = (salt + password_hash).decode('ascii')
+        """Hash a password for storing. Computed inline, services use their PasswordHasher pool"""
+        self.password = default_hasher.make(password)
         return self.password
 
     def verify_password(self, provided_password):
         """Verify a stored password against one provided by user"""
-        stored_password = self.password
-        salt = stored_password[:64]
-        stored_password = stored_password[64:]
-        password_hash = hashlib.pbkdf2_hmac('sha512',
-                                            provided_password.encode('utf-8'),
-                                            salt.encode('ascii'),
-                                            100000)
-        password_hash = binascii.hexlify(password_hash).decode('ascii')
-        return password_hash == stored_password
+        return default_hasher.check(provided_password, self.password)
 
     def __repr__(self):
         return f"User(id={self.id}, email={self.email})"
@@ -1,25 +1,43 @@
+from typing import List
+
 from app.infrastructure.smtp import Mail, create_message
+from app.pkgs.template_renderer import TemplateRenderer
 from app.pkgs.token_factory import TokenFactory
-from flask import render_template
 
 
 class EmailService(object):
 
     token_factory: TokenFactory
 
-    def __init__(self, mail: Mail, default_mail_sender: str, token: TokenFactory):
+    def __init__(self, mail: Mail, default_mail_sender: str, token: TokenFactory,
+                 renderer: TemplateRenderer = None):
         self.mail = mail
         self.mail_sender = default_mail_sender
         self.token_factory = token
+        self.renderer = renderer or TemplateRenderer()
 
     def send_email(self, to: str, subject: str, template, sender=None):
         msg = create_message(sender_email=sender or self.mail_sender, receiver_email=to, subject=subject, html_body=template)
         self.mail.send(msg)
 
+    def send_bulk_email(self, recipients: List[str], subject: str, template: str, contexts: List[dict] = None,
+                        sender=None, **shared):
+        """Render template for every recipient and send all messages over one smtp connection.
+
+        contexts: context of each recipient (same order), rendered on top of the shared context
+        """
+        contexts = contexts or [{} for _ in recipients]
+        if len(contexts) != len(recipients):
+            raise ValueError(f'receive {len(contexts)} contexts for {len(recipients)} recipients')
+        htmls = self.renderer.render_many(template, contexts, **shared)
+        messages = [create_message(sender_email=sender or self.mail_sender, receiver_email=to, subject=subject,
+                                   html_body=html) for to, html in zip(recipients, htmls)]
+        return self.mail.send_many(messages)
+
     def send_confirm_email(self, email: str, confirm_url: str, template):
         token = self.token_factory.generate_confirmation_token(email)
         confirm_url = confirm_url + str(token)
-        html = render_template(template, confirm_url=confirm_url)  # 'user/activate.html'
+        html = self.renderer.render(template, confirm_url=confirm_url)  # 'user/activate.html'
         subject = "Please confirm your email"
         self.send_email(email, subject, html)
 
@@ -27,7 +45,6 @@ class EmailService(object):
         return self.token_factory.confirm_token(token)
 
     def send_reset_password(self, email: str, reset_password: str, template='user/new_password.html'):
-        token = self.token_factory.generate_confirmation_token(email)
-        html = render_template(template, password=reset_password)
+        html = self.renderer.render(template, password=reset_password)
         subject = "Reset password"
         self.send_email(email, subject, html)
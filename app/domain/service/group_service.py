@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import FrozenSet, Iterator, List, Optional
 
 from app.domain.model import Group, GroupMember
 from app.domain.utils import error_collection, validation
@@ -34,10 +34,14 @@ class GroupService(object):
             raise error_collection.RecordNotFound
         return group
 
-    def search(self, name: str, page: int = 1, page_size: int = 10) -> List[Group]:
-        groups = self.group_repo.search(name, page, page_size)
+    def search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[Group]:
+        groups = self.group_repo.search(name, page, page_size, cursor)
         return groups
 
+    def iter_search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Group]]:
+        return self.group_repo.iter_search(name, page, page_size, cursor, batch_size)
+
     def update(self, group_id: int, name: str = '', description: str = '') -> Group:
         group = self.find_one(group_id)
         if name:
@@ -90,3 +94,6 @@ class GroupService(object):
         if group_member:
             return True
         return False
+
+    def find_group_ids_of_user(self, user_id: int) -> FrozenSet[int]:
+        return frozenset(self.group_repo.find_group_ids_by_user(user_id))
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from app.domain.model import Action, State, Route
 from app.domain.model.process_maker.action_type import ActionType
+from app.domain.service.process_maker.workflow_cache import WorkflowGraphCache
 from app.domain.utils import error_collection, validation
 from app.infrastructure.persistence.process_maker.action import ActionRepository
 from app.infrastructure.persistence.process_maker.target import TargetRepository
@@ -11,9 +12,12 @@ class ActionService(object):
 
     def __init__(self,
                  action_repo: ActionRepository,
-                 target_repo: TargetRepository):
+                 target_repo: TargetRepository,
+                 workflow_cache: WorkflowGraphCache):
         self.action_repo = action_repo
         self.target_repo = target_repo
+        # an action can be used by any process, so changes drop every compiled workflow
+        self.workflow_cache = workflow_cache
 
     def create(self, name: str, description: str = '', action_type: str = ActionType.approve) -> Action:
         new_action = Action(name=name, description=description, action_type=action_type)
@@ -40,8 +44,8 @@ class ActionService(object):
             raise error_collection.RecordNotFound
         return action
 
-    def search(self, name: str, page: int = 1, page_size: int = 10) -> List[Action]:
-        actions = self.action_repo.search(name, page, page_size)
+    def search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[Action]:
+        actions = self.action_repo.search(name, page, page_size, cursor)
         return actions
 
     def update(self, action_id: int, name: str = '', description: str = '',
@@ -60,10 +64,12 @@ class ActionService(object):
         action.validate()
 
         action = self.action_repo.update(action)
+        self.workflow_cache.clear()
         return action
 
     def delete(self, action_id: int):
         action = self.action_repo.delete(action_id)
+        self.workflow_cache.clear()
         return action
 
     def add_target_to_action(self, action_id: int, target_id: int) -> Action:
@@ -77,6 +83,7 @@ class ActionService(object):
 
         action.target.append(target)
         self.action_repo.update(action)
+        self.workflow_cache.clear()
 
         return action
 
@@ -91,6 +98,7 @@ class ActionService(object):
 
         action.target.remove(target)
         self.action_repo.update(action)
+        self.workflow_cache.clear()
 
         return action
 
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from logging import Logger
+from typing import Dict, List
+
+from app.domain.model import ActivityOutbox, RequestNote, User
+from app.domain.model.process_maker.activity_type import ActivityType
+from app.domain.model.process_maker.request import NoteType
+from app.domain.service.email import EmailService
+from app.infrastructure.persistence.process_maker.activity_outbox import ActivityOutboxRepository
+from app.infrastructure.persistence.process_maker.request_note import RequestNoteRepository
+from app.infrastructure.persistence.user import UserRepository
+from app.pkgs.retry import RetryPolicy
+
+
+class UnsupportedActivity(Exception):
+    """The activity cannot run in this version, retrying it would not help"""
+
+
+class ActivityOutboxService(object):
+    """Run the activities recorded by RequestService.user_commit_action, a batch at a time.
+
+    A failed activity is retried with the backoff of the retry policy, then marked failed. An
+    unsupported activity is marked failed at once.
+    """
+
+    def __init__(self,
+                 outbox_repo: ActivityOutboxRepository,
+                 request_note_repo: RequestNoteRepository,
+                 user_repo: UserRepository,
+                 retry_policy: RetryPolicy,
+                 logger: Logger,
+                 email_service: EmailService = None):
+        self.outbox_repo = outbox_repo
+        self.request_note_repo = request_note_repo
+        self.user_repo = user_repo
+        self.retry_policy = retry_policy
+        self.logger = logger
+        self.email_service = email_service
+
+    def run_once(self, batch_size: int = 100, lease_seconds: float = 300) -> int:
+        """Claim and run one batch of due activities, return the number of activities claimed.
+
+        Each activity is committed with its done mark on its own, so a failing one (even on a
+        database error or a failed commit) is rescheduled without holding back the others. The
+        activities of a claim expiring after lease_seconds (a crashed worker) are claimed again.
+        """
+        entries = self.outbox_repo.claim(batch_size, lease_seconds)
+        if not entries:
+            return 0
+        users = self._find_users(entries)
+        for entry in entries:
+            try:
+                with self.outbox_repo.db.unit_of_work():
+                    self._run(entry, users)
+                    self.outbox_repo.mark_done([entry])
+            except UnsupportedActivity as e:
+                self.logger.error(f'activity {entry.id} of request {entry.request_id} failed: {e}')
+                self.outbox_repo.reschedule(entry, f'{type(e).__name__}: {e}')
+            except Exception as e:
+                self.logger.warning(f'activity {entry.id} ({entry.activity_type}) of request {entry.request_id} '
+                                    f'failed: {e}', exc_info=e)
+                self._retry_later(entry, f'{type(e).__name__}: {e}')
+        return len(entries)
+
+    def _find_users(self, entries: List[ActivityOutbox]) -> Dict[int, User]:
+        """Users of the whole batch, loaded in one query"""
+        user_ids = set()
+        for entry in entries:
+            arguments = entry.arguments
+            user_ids.update(arguments.get('stakeholder_ids', []))
+            if 'user_id' in arguments:
+                user_ids.add(arguments['user_id'])
+        return {user.id: user for user in self.user_repo.find_many(list(user_ids))}
+
+    def _run(self, entry: ActivityOutbox, users: Dict[int, User]):
+        arguments = entry.arguments
+        if entry.activity_type == ActivityType.add_note:
+            note = RequestNote(request_id=entry.request_id, user_id=arguments['user_id'],
+                               note=arguments['note'], note_type=NoteType.system_note)
+            note.validate()
+            self.request_note_repo.create(note)
+        elif entry.activity_type == ActivityType.send_email:
+            self._send_email(entry, [users[i] for i in arguments['stakeholder_ids'] if i in users])
+        elif entry.activity_type in (ActivityType.add_stakeholder, ActivityType.remove_stakeholder):
+            raise UnsupportedActivity(f'activity type={entry.activity_type} is not supported yet')
+        else:
+            raise ValueError(f"receive unsupported activity type={entry.activity_type}")
+
+    def _send_email(self, entry: ActivityOutbox, stakeholders: List[User]):
+        """Notify the stakeholders of the request, all messages over one smtp connection"""
+        arguments = entry.arguments
+        if not stakeholders:
+            return
+        if self.email_service is None:
+            # retried until mail is enabled (MAIL_ENABLED) or the attempts run out
+            raise RuntimeError(f'mail is not enabled, {len(stakeholders)} stakeholders are not notified')
+        self.email_service.send_bulk_email(
+            [user.email for user in stakeholders], f'Request #{entry.request_id}: {arguments["action"]}',
+            'request/activity.html', [{'name': user.email_name()} for user in stakeholders],
+            actor=arguments['actor'], action=arguments['action'], request_id=entry.request_id)
+
+    def _retry_later(self, entry: ActivityOutbox, error: str):
+        attempts = (entry.attempts or 0) + 1
+        next_attempt_at = None
+        if self.retry_policy.should_retry(attempts):
+            next_attempt_at = datetime.now() + timedelta(seconds=self.retry_policy.delay(attempts))
+        self.outbox_repo.reschedule(entry, error, next_attempt_at)
+
+    def status(self) -> dict:
+        """Number of activities by status"""
+        return self.outbox_repo.count_by_status()
@@ -3,6 +3,7 @@ from typing import List, Optional
 from app.domain.model import Activity, State, Route
 from app.domain.model.process_maker.activity_type import ActivityType
 from app.domain.utils import error_collection, validation
+from app.domain.service.process_maker.workflow_cache import WorkflowGraphCache
 from app.infrastructure.persistence.process_maker.activity import ActivityRepository
 from app.infrastructure.persistence.process_maker.target import TargetRepository
 
@@ -11,9 +12,12 @@ class ActivityService(object):
 
     def __init__(self,
                  activity_repo: ActivityRepository,
-                 target_repo: TargetRepository):
+                 target_repo: TargetRepository,
+                 workflow_cache: WorkflowGraphCache):
         self.activity_repo = activity_repo
         self.target_repo = target_repo
+        # an activity can be used by any process, so changes drop every compiled workflow
+        self.workflow_cache = workflow_cache
 
     def create(self, name: str, description: str = '',
                activity_type: str = ActivityType.add_note) -> Activity:
@@ -41,8 +45,8 @@ class ActivityService(object):
             raise error_collection.RecordNotFound
         return activity
 
-    def search(self, name: str, page: int = 1, page_size: int = 10) -> List[Activity]:
-        activities = self.activity_repo.search(name, page, page_size)
+    def search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[Activity]:
+        activities = self.activity_repo.search(name, page, page_size, cursor)
         return activities
 
     def update(self, activity_id: int, name: str = '', description: str = '',
@@ -61,10 +65,12 @@ class ActivityService(object):
         activity.validate()
 
         activity = self.activity_repo.update(activity)
+        self.workflow_cache.clear()
         return activity
 
     def delete(self, activity_id: int):
         activity = self.activity_repo.delete(activity_id)
+        self.workflow_cache.clear()
         return activity
     
     def add_target_to_activity(self, activity_id: int, target_id: int) -> Activity:
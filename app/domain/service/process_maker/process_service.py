@@ -1,8 +1,10 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from app.domain.model import Process, State, Route
 from app.domain.model.process_maker.process import ProcessStatus
 from app.domain.model.process_maker.state_type import StateType
+from app.domain.model.process_maker.workflow import StateNode, WorkflowGraph
+from app.domain.service.process_maker.workflow_cache import WorkflowGraphCache
 from app.domain.utils import error_collection, validation
 from app.infrastructure.persistence.process_maker.action import ActionRepository
 from app.infrastructure.persistence.process_maker.activity import ActivityRepository
@@ -20,13 +22,15 @@ class ProcessService(object):
                  activity_repo: ActivityRepository,
                  route_repo: RouteRepository,
                  state_repo: StateRepository,
-                 request_repo: RequestRepository):
+                 request_repo: RequestRepository,
+                 workflow_cache: WorkflowGraphCache):
         self.process_repo = process_repo
         self.action_repo = action_repo
         self.activity_repo = activity_repo
         self.route_repo = route_repo
         self.state_repo = state_repo
         self.request_repo = request_repo
+        self.workflow_cache = workflow_cache
 
     def create(self, name: str, description: str = '') -> Process:
         new_process = Process(name=name, description=description)
@@ -54,10 +58,14 @@ class ProcessService(object):
             raise error_collection.RecordNotFound
         return process
 
-    def search(self, name: str, page: int = 1, page_size: int = 10) -> List[Process]:
-        processes = self.process_repo.search(name, page, page_size)
+    def search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[Process]:
+        processes = self.process_repo.search(name, page, page_size, cursor)
         return processes
 
+    def iter_search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Process]]:
+        return self.process_repo.iter_search(name, page, page_size, cursor, batch_size)
+
     def update(self, process_id: int, name: str = '', description: str = '',
                status: str = '') -> Process:
         process = self.find_one(process_id)
@@ -74,10 +82,12 @@ class ProcessService(object):
         process.validate()
 
         process = self.process_repo.update(process)
+        self.workflow_cache.invalidate(process.id)
         return process
 
     def delete(self, process_id: int):
         process = self.process_repo.delete(process_id)
+        self.workflow_cache.invalidate(process_id)
         return process
 
     # state service
@@ -89,7 +99,9 @@ class ProcessService(object):
         # check duplicate name
         self.check_duplicate_state(process_id, name)
         state.process = process
-        return self.state_repo.create(state)
+        state = self.state_repo.create(state)
+        self.workflow_cache.invalidate(process_id)
+        return state
 
     def find_state_on_process(self, process_id: int, state_id: int) -> State:
         state = self.state_repo.find_by_parent(process_id, state_id)
@@ -103,15 +115,32 @@ class ProcessService(object):
             raise error_collection.RecordNotFound(f'cannot find state name ({name})')
         return state
 
-    def find_start_point(self, process_id: int) -> State:
+    def find_workflow(self, process_id: int) -> WorkflowGraph:
+        """Compiled workflow of the process, built once and cached until the process changes"""
+        return self.workflow_cache.get(process_id, self._build_workflow)
+
+    def _build_workflow(self, process_id: int) -> WorkflowGraph:
+        return WorkflowGraph.build(process_id, self.process_repo.find_workflow_states(process_id))
+
+    def find_workflow_state(self, process_id: int, state_id: int) -> StateNode:
+        """State of the compiled workflow, the graph is rebuilt once if it does not know the state"""
+        state = self.find_workflow(process_id).find_state(state_id)
+        if not state:
+            # the graph was cached by this worker before the state was added
+            self.workflow_cache.discard(process_id)
+            state = self.find_workflow(process_id).find_state(state_id)
+        if not state:
+            raise error_collection.RecordNotFound(f'cannot find state ({state_id}) in process ({process_id})')
+        return state
+
+    def find_start_point(self, process_id: int) -> StateNode:
         return self.find_state_by_type(process_id, state_type=StateType.start)
 
-    def find_state_by_type(self, process_id: int, state_type: str) -> State:
-        list_state = self.state_repo.search(process_id=process_id, page_size=2000)
-        for state in list_state:
-            if state.state_type == state_type:
-                return state
-        raise error_collection.RecordNotFound(f'cannot find state with type=({state_type})')
+    def find_state_by_type(self, process_id: int, state_type: str) -> StateNode:
+        state = self.find_workflow(process_id).find_state_by_type(state_type)
+        if not state:
+            raise error_collection.RecordNotFound(f'cannot find state with type=({state_type})')
+        return state
 
     def check_duplicate_state(self, process_id: int, name: str):
         dup_state = self.state_repo.find_by_name_and_parent(process_id, name)
@@ -132,17 +161,22 @@ class ProcessService(object):
         if state_type:
             state.state_type = state_type
         state.validate()
-        return self.state_repo.update(state)
+        state = self.state_repo.update(state)
+        self.workflow_cache.invalidate(process_id)
+        return state
 
     def remove_state_from_process(self, process_id: int, state_id: int) -> State:
         state = self.find_state_on_process(process_id, state_id)
-        return self.state_repo.delete(state.id)
+        state = self.state_repo.delete(state.id)
+        self.workflow_cache.invalidate(process_id)
+        return state
 
     def add_activity_to_state(self, process_id: int, state_id: int, activity_id: int) -> State:
         activity = self.activity_repo.find_one(activity_id)
         state = self.find_state_on_process(process_id, state_id)
         state.activity.append(activity)
         self.state_repo.update(state)
+        self.workflow_cache.invalidate(process_id)
         return state
 
     def remove_activity_from_state(self, process_id: int, state_id: int, activity_id: int) -> State:
@@ -150,6 +184,7 @@ class ProcessService(object):
         state = self.find_state_on_process(process_id, state_id)
         state.activity.remove(activity)
         self.state_repo.update(state)
+        self.workflow_cache.invalidate(process_id)
         return state
 
     # route service
@@ -166,7 +201,9 @@ class ProcessService(object):
             next_state = self.find_state_on_process(process_id, next_state_id)
             route.next_state_id = next_state.id
         route.validate()
-        return self.route_repo.create(route)
+        route = self.route_repo.create(route)
+        self.workflow_cache.invalidate(process_id)
+        return route
 
     def check_duplicate_route(self, process_id: int, current_state_id: int, next_state_id: int):
         dup_route = self.route_repo.find_for_duplication(process_id, current_state_id, next_state_id)
@@ -189,12 +226,15 @@ class ProcessService(object):
         route.validate()
         # find duplicate route, allow one route from state to state only
         self.check_duplicate_route(process_id, current_state_id, next_state_id)
-        return self.route_repo.update(route)
+        route = self.route_repo.update(route)
+        self.workflow_cache.invalidate(process_id)
+        return route
 
     def remove_route_from_process(self, process_id: int, route_id: int) -> State:
         route = self.find_route_on_process(process_id, route_id)
 
         self.route_repo.delete(route.id)
+        self.workflow_cache.invalidate(process_id)
         return route
 
     def add_activity_to_route(self, process_id: int, route_id: int, activity_id: int) -> State:
@@ -202,6 +242,7 @@ class ProcessService(object):
         route = self.find_route_on_process(process_id, route_id)
         route.activity.append(activity)
         self.route_repo.update(route)
+        self.workflow_cache.invalidate(process_id)
         return route
 
     def remove_activity_from_route(self, process_id: int, route_id: int, activity_id: int) -> State:
@@ -209,6 +250,7 @@ class ProcessService(object):
         route = self.find_route_on_process(process_id, route_id)
         route.activity.remove(activity)
         self.route_repo.update(route)
+        self.workflow_cache.invalidate(process_id)
         return route
 
     def add_action_to_route(self, process_id: int, route_id: int, action_id: int) -> State:
@@ -216,6 +258,7 @@ class ProcessService(object):
         route = self.find_route_on_process(process_id, route_id)
         route.action.append(action)
         self.route_repo.update(route)
+        self.workflow_cache.invalidate(process_id)
         return route
 
     def remove_action_from_route(self, process_id: int, route_id: int, action_id: int) -> State:
@@ -223,4 +266,5 @@ class ProcessService(object):
         route = self.find_route_on_process(process_id, route_id)
         route.action.remove(action)
         self.route_repo.update(route)
+        self.workflow_cache.invalidate(process_id)
         return route
@@ -1,17 +1,20 @@
 import json
 import pprint
-from typing import List
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
 
-from app.domain.model import Request, RequestData, RequestNote, RequestStakeholder, User, Action, \
-    Route, Activity
+from app.domain.model import Action, Activity, ActivityOutbox, Request, RequestData, RequestNote, \
+    RequestStakeholder, Route, User
 from app.domain.model.process_maker.activity_type import ActivityType
 from app.domain.model.process_maker.request import DataType, NoteType, RequestAction
+from app.domain.model.process_maker.workflow import ActivityNode, StateNode
 from app.domain.service.group_service import GroupService
 from app.domain.service.process_maker.action_service import ActionService
 from app.domain.service.process_maker.activity_service import ActivityService
 from app.domain.service.process_maker.process_service import ProcessService
 from app.domain.service.user import UserService
 from app.domain.utils import error_collection
+from app.pkgs import errors
+from app.infrastructure.persistence.process_maker.activity_outbox import ActivityOutboxRepository
 from app.infrastructure.persistence.process_maker.request import RequestRepository
 from app.infrastructure.persistence.process_maker.request_action import RequestActionRepository
 from app.infrastructure.persistence.process_maker.request_data import RequestDataRepository
@@ -19,6 +22,8 @@ from app.infrastructure.persistence.process_maker.request_note import RequestNot
 from app.infrastructure.persistence.process_maker.request_stakeholder import \
     RequestStakeholderRepository
 
+MAX_BULK_REQUESTS = 1000  # requests per create_requests_bulk call, bounds the size of one transaction
+
 
 class RequestService(object):
 
@@ -32,7 +37,8 @@ class RequestService(object):
                  group_service: GroupService,
                  process_service: ProcessService,
                  action_service: ActionService,
-                 activity_service: ActivityService):
+                 activity_service: ActivityService,
+                 activity_outbox_repo: ActivityOutboxRepository):
         self.request_repo = request_repo
         self.request_note_repo = request_note_repo
         self.request_action_repo = request_action_repo
@@ -43,26 +49,42 @@ class RequestService(object):
         self.process_service = process_service
         self.action_service = action_service
         self.activity_service = activity_service
+        self.activity_outbox_repo = activity_outbox_repo
 
-    def _add_request_data(self, request: Request, value: dict, name: str= 'content', data_type: str = 'json') -> Request:
+    @staticmethod
+    def _new_request_data(value: dict, name: str = 'content', data_type: str = 'json') -> RequestData:
         request_data = RequestData(data_type=data_type, status='active', name=name)
         request_data.value = json.dumps(value) if data_type==DataType.json else value
-        request_data.request_id = request.id
         request_data.validate()
+        return request_data
+
+    @staticmethod
+    def _new_request_note(note: str, user_id: int = 0, note_type=NoteType.user_note) -> RequestNote:
+        request_note = RequestNote(user_id=user_id, note=note, note_type=note_type)
+        request_note.validate()
+        return request_note
+
+    @staticmethod
+    def _new_request_stakeholder(stakeholder_id: int, stakeholder_type: str = 'user') -> RequestStakeholder:
+        request_stakeholder = RequestStakeholder(stakeholder_id=stakeholder_id, stakeholder_type=stakeholder_type)
+        request_stakeholder.validate()
+        return request_stakeholder
+
+    def _add_request_data(self, request: Request, value: dict, name: str= 'content', data_type: str = 'json') -> Request:
+        request_data = self._new_request_data(value, name, data_type)
+        request_data.request_id = request.id
         self.request_data_repo.create(request_data)
         return request
 
     def _add_request_note(self, request: Request, note: str, user_id: int = 0, note_type=NoteType.user_note) -> Request:
-        request_note = RequestNote(user_id=user_id, note=note, note_type=note_type)
+        request_note = self._new_request_note(note, user_id, note_type)
         request_note.request_id = request.id
-        request_note.validate()
         self.request_note_repo.create(request_note)
         return request
 
     def _add_request_stakeholder(self, request: Request, stakeholder_id: int, stakeholder_type: str = 'user') -> Request:
-        request_stakeholder = RequestStakeholder(stakeholder_id=stakeholder_id, stakeholder_type=stakeholder_type)
+        request_stakeholder = self._new_request_stakeholder(stakeholder_id, stakeholder_type)
         request_stakeholder.request_id = request.id
-        request_stakeholder.validate()
         self.request_stakeholder_repo.create(request_stakeholder)
         return request
 
@@ -105,50 +127,106 @@ class RequestService(object):
         request.current_state_id = state.id
         return self.request_repo.update(request)
 
+    def _new_request(self, user: User, item: dict, start_states: Dict[int, int]) -> Request:
+        """Validated request of a create_requests_bulk item, with its data, note and stakeholders"""
+        process_id = item['process_id']
+        if process_id not in start_states:
+            process = self.process_service.find_one(process_id)
+            start_states[process_id] = self.process_service.find_start_point(process.id).id
+        entity_model = item.get('entity_model', '')
+        request = Request(title=item['title'], entity_id=item.get('entity_id', 0), entity_model=entity_model)
+        request.process_id = process_id
+        request.user_id = user.id
+        request.current_state_id = start_states[process_id]
+        request.validate()
+        request.request_data.append(self._new_request_data(item['content'], name=entity_model))
+        request.request_note.append(self._new_request_note(item['note'], user_id=user.id))
+        for stakeholder_id in item.get('stakeholders', []):
+            request.request_stakeholder.append(self._new_request_stakeholder(stakeholder_id))
+        return request
+
+    def create_requests_bulk(self, user_id: int, items: List[dict]) -> List[Request]:
+        """Create many requests in one transaction. An item has the arguments of create_request
+        except user_id.
+
+        Every item is validated before anything is written, the error of an invalid item names its
+        position. The process and start state of each process are looked up once per batch.
+        """
+        if len(items) > MAX_BULK_REQUESTS:
+            raise error_collection.ValidationError(f'receive {len(items)} requests, the limit is {MAX_BULK_REQUESTS}')
+        if not items:
+            return []
+        user = self.user_service.find_by_id(user_id)
+        start_states = {}  # process id -> id of its start state
+        requests = []
+        for i, item in enumerate(items):
+            try:
+                requests.append(self._new_request(user, item, start_states))
+            except KeyError as e:
+                raise error_collection.ValidationError(f'item {i}: missing {e}') from e
+            except errors.Error as e:
+                raise e.with_prefix(f'item {i}: ') from e
+        return self.request_repo.create_many(requests)
+
     def find_one_request(self, request_id: int, user_id: int=0):
         # todo: should have another method which receive user_id and check if user_id in
         #  request_stakeholder or in action_target
-        request = self.request_repo.find_one(request_id)
+        request = self.request_repo.find_detail(request_id)
         if not request:
             raise error_collection.RecordNotFound
         return request
 
+    def search(self, title: str = '', page: int = 1, page_size: int = 10, cursor: str = '') -> List[Request]:
+        return self.request_repo.search(title, page, page_size, cursor)
+
+    def iter_search(self, title: str = '', page: int = 1, page_size: int = 10, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Request]]:
+        return self.request_repo.iter_search(title, page, page_size, cursor, batch_size)
+
     def find_request_allowed_action(self, request_id: int, user_id: int):
         request = self.find_one_request(request_id, user_id)
-        routes = request.get_route()
-        actions = []
-        for route in routes:
-            actions.extend(route.action)
-        for i in range(len(actions)):
-            actions[i] = self.action_service.find_one(actions[i].id)
-        return actions
-
-    def _should_user_commit_action(self, user_id: int, action: Action) -> bool:
-        group_ids = [target.group_id for target in action.target]
-        for group_id in group_ids:
-            if self.group_service.is_user_in_group(group_id, user_id):
-                return True
-        return False
+        return self._allowed_actions(request)
+
+    @staticmethod
+    def _current_routes(request: Request) -> List[Route]:
+        """Routes of the current state of a request loaded by find_one_request, with their actions,
+        action targets and activities"""
+        return [route for route in request.get_route() if route.deleted_at is None]
+
+    @classmethod
+    def _allowed_actions(cls, request: Request) -> List[Action]:
+        """Actions of the current state of a request loaded by find_one_request"""
+        return [action for route in cls._current_routes(request) for action in route.action]
+
+    @staticmethod
+    def _should_user_commit_action(user_group_ids: FrozenSet[int], action: Action) -> bool:
+        """user_group_ids: from GroupService.find_group_ids_of_user, load it once per request.
+
+        The targets of the action are read from the database with the request, never from the
+        cached workflow, so a revoked permission is seen by every worker at once.
+        """
+        return any(target.group_id in user_group_ids for target in action.target)
 
     def find_request_allowed_action_for_specific_user(self, request_id: int, user_id: int, specific_user_id: int):
-        actions = self.find_request_allowed_action(request_id, user_id)
+        request = self.find_one_request(request_id, user_id)
+        actions = self._allowed_actions(request)
         specific_user = self.user_service.find_by_id(specific_user_id)
-        return [action for action in actions if self._should_user_commit_action(specific_user.id, action)]
-
-    def _add_request_action(self, request: Request, user: User, committed_action: Action):
-        routes = request.get_route()
-        turning_route = None
-        actions = []
-        for route in routes:
-            for act in route.action:
-                if act.id == committed_action.id:
-                    actions.append(act)
-                    turning_route = route
-
-        # all actions, which user is allowed to commit
-        allowed_actions = [action for action in actions if self._should_user_commit_action(user.id, action)]
-
-        if not allowed_actions or not turning_route:
+        user_group_ids = self.group_service.find_group_ids_of_user(specific_user.id)
+        return [action for action in actions if self._should_user_commit_action(user_group_ids, action)]
+
+    def _add_request_action(self, request: Request, user: User, action_id: int,
+                            activities: List[ActivityOutbox]) -> Tuple[RequestAction, Action]:
+        turning_route, committed_action = None, None
+        for route in self._current_routes(request):
+            for action in route.action:
+                if action.id == action_id:
+                    # like the compiled workflow, the last route of the state carrying the action wins
+                    turning_route, committed_action = route, action
+        if not turning_route:
+            # raise RecordNotFound if the action does not exist at all
+            self.action_service.find_one(action_id, with_children=False)
+        if not turning_route or not self._should_user_commit_action(
+                self.group_service.find_group_ids_of_user(user.id), committed_action):
             raise error_collection.DontHaveRight(f"user ({user.id}) do not have right to commit this action")
         request_action = RequestAction(user_id=user.id)
         request_action.route_to_next_state = turning_route
@@ -160,52 +238,58 @@ class RequestService(object):
 
         # trigger activity of route
         for act in turning_route.activity:
-            self._trigger_activity(request, act, user, committed_action)
-        return request_action
+            activities.append(self._trigger_activity(request, act, user, committed_action))
+        return request_action, committed_action
 
-    def _trigger_activity(self, request: Request, activity: Activity, user: User, committed_action: Action):
+    @staticmethod
+    def _trigger_activity(request: Request, activity: Union[Activity, ActivityNode], user: User,
+                          committed_action: Action) -> ActivityOutbox:
+        """Outbox entry of the activity, it is run by ActivityOutboxService after the commit"""
         if activity.activity_type == ActivityType.add_note:
-            self._add_request_note(request, note=committed_action.name, user_id=user.id, note_type=NoteType.system_note)
+            payload = {'note': committed_action.name, 'user_id': user.id}
         elif activity.activity_type == ActivityType.send_email:
-            # todo: add send email here
-            for stakeholder in request.request_stakeholder:
-                stakeholder_user = self.user_service.find_by_id(stakeholder.stakeholder_id)
-                if stakeholder_user:
-                    print(f'send email to {stakeholder_user.email_name()} (stakeholder) that {user.email_name()} {committed_action.name}')
-        elif activity.activity_type == ActivityType.add_stakeholder:
-            # todo: add action here
-            print(f"activity do add stakeholder")
-        elif activity.activity_type == ActivityType.remove_stakeholder:
-            # todo: add action here
-            print(f"activity do remove stakeholder")
+            payload = {'stakeholder_ids': [stakeholder.stakeholder_id for stakeholder in request.request_stakeholder],
+                       'actor': user.email_name(), 'action': committed_action.name}
+        elif activity.activity_type in (ActivityType.add_stakeholder, ActivityType.remove_stakeholder):
+            payload = {'action': committed_action.name}
         else:
             raise ValueError(f"receive unsupported activity={activity.name} type={activity.activity_type}")
+        return ActivityOutbox(request_id=request.id, activity_id=activity.id,
+                              activity_type=activity.activity_type, payload=json.dumps(payload))
 
-    def _change_request_state(self, request: Request, request_action: RequestAction) -> bool:
+    def _change_request_state(self, request: Request, request_action: RequestAction) -> Optional[StateNode]:
+        """Return the next state of the request, or None if the route keeps the current state"""
         # this action is accepted => disable all other action
-        for request_action in request.request_action:
-            request_action.status = 'done'
+        for other_action in request.request_action:
+            other_action.status = 'done'
         # trigger the change state of request id
-        if request_action.route_to_next_state.next_state_id:
+        next_state_id = request_action.route_to_next_state.next_state_id
+        if not next_state_id:
             # there are route that does not have next state id. it will not change state.
             # for example: edit action will not change the state
-            request.current_state = self.process_service.find_state_on_process(request.process_id, request_action.route_to_next_state.next_state_id)
-            return True
-        return False
+            return None
+        next_state = self.process_service.find_workflow_state(request.process_id, next_state_id)
+        request.move_to_state(next_state.id)
+        return next_state
 
     def user_commit_action(self, request_id: int, user_id: int, action_id: int):
+        # the routes, actions and their targets are read with the request, the compiled workflow
+        # of the process only finds the next state
         request = self.find_one_request(request_id)
         user = self.user_service.find_by_id(user_id)
-        # find the action
-        action = self.action_service.find_one(action_id)
-        # add request action
-        request_action = self._add_request_action(request, user, action)
-        is_changed = self._change_request_state(request, request_action)
-        # trigger activity of new state
-        if is_changed:
-            for act in request.current_state.activity:
-                self._trigger_activity(request, act, user, action)
-        return self.request_repo.update(request)
+        # the activities are recorded in the transaction of the action and run by the activity workers
+        activities: List[ActivityOutbox] = []
+        with self.request_repo.db.unit_of_work():
+            # add request action
+            request_action, action = self._add_request_action(request, user, action_id, activities)
+            next_state = self._change_request_state(request, request_action)
+            # trigger activity of new state
+            if next_state:
+                for act in next_state.activities:
+                    activities.append(self._trigger_activity(request, act, user, action))
+            request = self.request_repo.update(request)
+            self.activity_outbox_repo.add_many(activities)
+        return request
 
     def find_request_actions(self, request_id: int, user_id: int=0):
         request = self.find_one_request(request_id, user_id)
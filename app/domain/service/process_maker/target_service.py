@@ -3,6 +3,7 @@ from typing import List, Optional
 from app.domain.model import Target, State, Route
 from app.domain.model.process_maker.target import TargetType
 from app.domain.utils import error_collection, validation
+from app.domain.service.process_maker.workflow_cache import WorkflowGraphCache
 from app.infrastructure.persistence.group import GroupRepository
 from app.infrastructure.persistence.process_maker.target import TargetRepository
 
@@ -11,9 +12,12 @@ class TargetService(object):
 
     def __init__(self,
                  target_repo: TargetRepository,
-                 group_repo: GroupRepository):
+                 group_repo: GroupRepository,
+                 workflow_cache: WorkflowGraphCache):
         self.target_repo = target_repo
         self.group_repo = group_repo
+        # compiled workflows keep the group ids of action targets
+        self.workflow_cache = workflow_cache
 
     def create(self, name: str, description: str = '', target_type: str = TargetType.group,
                group_id: int = 0) -> Target:
@@ -43,8 +47,8 @@ class TargetService(object):
             raise error_collection.RecordNotFound
         return target
 
-    def search(self, name: str, page: int = 1, page_size: int = 10) -> List[Target]:
-        targets = self.target_repo.search(name, page, page_size)
+    def search(self, name: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[Target]:
+        targets = self.target_repo.search(name, page, page_size, cursor)
         return targets
 
     def update(self, target_id: int, name: str = '', description: str = '',
@@ -66,8 +70,10 @@ class TargetService(object):
         target.validate()
 
         target = self.target_repo.update(target)
+        self.workflow_cache.clear()
         return target
 
     def delete(self, target_id: int):
         target = self.target_repo.delete(target_id)
+        self.workflow_cache.clear()
         return target
@@ -0,0 +1,46 @@
+from functools import partial
+from typing import Callable
+
+from app.domain.model import ConnectionPool
+from app.domain.model.process_maker.workflow import WorkflowGraph
+from app.pkgs.cache_tools import LRUCache
+
+
+class WorkflowGraphCache(object):
+    """Compiled workflow graph per process id.
+
+    Services which change a process definition must invalidate it. With a connection pool, the
+    graphs are dropped once the change is committed, so a graph built meanwhile from the old rows is
+    not kept. The cache lives in one process, so a change made by another worker is only seen here
+    after expire_time.
+    """
+
+    def __init__(self, max_size: int = 1000, expire_time: float = 300, connection_pool: ConnectionPool = None):
+        self._cache = LRUCache(max_size=max_size, expire_time=expire_time)
+        self.connection_pool = connection_pool
+
+    def _after_commit(self, callback: Callable[[], None]):
+        if self.connection_pool is None:
+            callback()
+        else:
+            self.connection_pool.after_commit(callback)
+
+    def get(self, process_id: int, build: Callable[[int], WorkflowGraph]) -> WorkflowGraph:
+        """Return the graph of process, build(process_id) is called once on a miss"""
+        return self._cache.get_or_set(process_id, build, process_id)
+
+    def invalidate(self, process_id: int):
+        """Drop the graph of process after the commit of the current transaction"""
+        self._after_commit(partial(self._cache.invalidate, process_id))
+
+    def discard(self, process_id: int):
+        """Drop the graph of process now, used when a read finds it stale"""
+        self._cache.invalidate(process_id)
+
+    def clear(self):
+        """Drop all graphs after the commit, used when a shared definition (action, activity, target)
+        changes"""
+        self._after_commit(self._cache.clear)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
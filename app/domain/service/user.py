@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import List, Set
+from typing import Iterator, List, Set
 
 import jwt
 
@@ -13,7 +13,7 @@ from app.infrastructure.persistence.access_policy import AccessPolicyRepository
 from app.infrastructure.persistence.blacklist_token import BlacklistTokenRepository
 from app.infrastructure.persistence.user import UserRepository
 from app.pkgs import errors
-from app.pkgs.query import get_start_stop_pos
+from app.pkgs.password_hasher import PasswordHasher
 from app.pkgs.time_utils import time_to_int
 from app.pkgs.type_check import type_check
 
@@ -25,14 +25,20 @@ class UserService(object):
                  access_blacklist: AccessPolicyRepository,
                  blacklist_token_repo: BlacklistTokenRepository,
                  config: Config,
+                 password_hasher: PasswordHasher = None,
                  email_service: EmailService = None):
         self.user_repo: UserRepository = user_repo
+        self.password_hasher = password_hasher or PasswordHasher(workers=0)
         self.access_policy_repo = access_blacklist
         self.blacklist_token_repo = blacklist_token_repo
         self.private_key = config.PRIVATE_KEY
         self.public_key = config.PUBLIC_KEY
         self.email_service = email_service
 
+    async def _run_sync(self, func, *args, **kwargs):
+        # database work of the async methods, in the session of the calling task
+        return await self.user_repo.db.run_sync(func, *args, **kwargs)
+
     def is_exist_email(self, email: str) -> bool:
         count = self.user_repo.count_by_email(email)
         return count > 0
@@ -46,16 +52,23 @@ class UserService(object):
     def create_new_user(self, email: str, password: str):
         email = email.lower()
         self.validate_user_email_password(email, password)
-        user = User(email=email, password=password)
-        user.hash_password(password)
+        user = User(email=email, password=self.password_hasher.hash(password))
         # set is_confirm to true until we complete setup email confirmation
         user.is_confirmed = True
         return self.user_repo.create(user)
 
+    async def create_new_user_async(self, email: str, password: str):
+        """create_new_user for async handlers, database work runs through run_sync of the pool
+        and the hash is awaited on the hasher pool"""
+        email = email.lower()
+        await self._run_sync(self.validate_user_email_password, email, password)
+        user = User(email=email, password=await self.password_hasher.hash_async(password))
+        user.is_confirmed = True
+        return await self._run_sync(self.user_repo.create, user)
+
     def sign_up_new_user(self, email: str, password: str, confirm_url: str):
         self.validate_user_email_password(email, password)
-        user: User = User(email=email, password=password)
-        user.hash_password(password)
+        user: User = User(email=email, password=self.password_hasher.hash(password))
         # set is_confirm to False
         user.is_confirmed = False
         u = self.user_repo.create(user)
@@ -105,34 +118,56 @@ class UserService(object):
             if not user:
                 raise error_collection.RecordNotFound
             new_password = generator.gen_reset_password()
-            user.hash_password(new_password)
+            user.password = self.password_hasher.hash(new_password)
             user = self.user_repo.update(user)
             self.access_policy_repo.change_user(user, note=f'update user password')
             self.email_service.send_reset_password(user.email, new_password)
             return True
         return False
 
-    def login(self, email: str, password: str):
+    def _find_user_for_login(self, email: str):
         validation.validate_email(email)
         user, roles, permissions = self.user_repo.find_user_for_auth(email)
-        if user:
-            if user.verify_password(password):
-                role_ids = [r.id for r in roles]
-                permissions_name: Set[str] = set()
-                for p in permissions:
-                    permissions_name.add(p.permission)
-                other_info = pack_user_payload(user, role_ids, list(permissions_name))
-                token = self.encode_auth_token(user, other_payload_info=other_info)
-                # create and return token here
-                return token
-            else:
-                raise error_collection.PasswordVerifyingFailed
-        raise error_collection.EmailCannotBeFound
+        if not user:
+            raise error_collection.EmailCannotBeFound
+        return user, roles, permissions
+
+    def _login_token(self, user: User, roles, permissions) -> str:
+        role_ids = [r.id for r in roles]
+        permissions_name: Set[str] = set()
+        for p in permissions:
+            permissions_name.add(p.permission)
+        other_info = pack_user_payload(user, role_ids, list(permissions_name))
+        return self.encode_auth_token(user, other_payload_info=other_info)
+
+    def login(self, email: str, password: str):
+        user, roles, permissions = self._find_user_for_login(email)
+        if not self.password_hasher.verify(password, user.password):
+            raise error_collection.PasswordVerifyingFailed
+        if self.password_hasher.needs_rehash(user.password):
+            # stored with a legacy format or an older cost, upgrade it while the password is known
+            user.password = self.password_hasher.hash(password)
+            self.user_repo.update(user)
+        return self._login_token(user, roles, permissions)
+
+    async def login_async(self, email: str, password: str):
+        """login for async handlers, the hashing does not hold the event loop or a database worker"""
+        user, roles, permissions = await self._run_sync(self._find_user_for_login, email)
+        if not await self.password_hasher.verify_async(password, user.password):
+            raise error_collection.PasswordVerifyingFailed
+        if self.password_hasher.needs_rehash(user.password):
+            user.password = await self.password_hasher.hash_async(password)
+            await self._run_sync(self.user_repo.update, user)
+        return self._login_token(user, roles, permissions)
 
     def logout(self, auth_token: str) -> str:
         t = self.blacklist_token_repo.add_token(auth_token)
         return f'logout at: {t.blacklisted_on}'
 
+    def purge_expired_tokens(self) -> int:
+        """Delete blacklisted tokens which are expired anyway, return number of deleted tokens"""
+        return self.blacklist_token_repo.purge_expired()
+
     def find_by_id(self, user_id: int) -> User:
         validation.validate_id(user_id)
         user = self.user_repo.find(user_id)
@@ -154,26 +189,50 @@ class UserService(object):
             return user, permissions
         raise error_collection.RecordNotFound
 
-    def search(self, email: str, page=1, page_size=10) -> List[User]:
-        o, l = get_start_stop_pos(page, page_size)
-        users = self.user_repo.search_with_roles(email, offset=o, limit=l)
+    def search(self, email: str, page=1, page_size=10, cursor: str = '') -> List[User]:
+        page, page_size = max(1, page), max(1, page_size)
+        users = self.user_repo.search_with_roles(email, page=page, page_size=page_size, cursor=cursor)
         return users
 
-    @type_check
-    def update_password(self, user_id: int, old_password: str, new_password: str,
-                        retype_password: str):
+    def iter_search(self, email: str, page=1, page_size=10, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[User]]:
+        page, page_size = max(1, page), max(1, page_size)
+        return self.user_repo.iter_search_with_roles(email, page=page, page_size=page_size, cursor=cursor,
+                                                     batch_size=batch_size)
+
+    @staticmethod
+    def _validate_new_password(new_password: str, retype_password: str):
         if new_password != retype_password:
             raise errors.Error(
                 'New Password and retype password is not matched')
         validation.validate_password(new_password)
+
+    def _save_password(self, user: User) -> User:
+        user = self.user_repo.update(user)
+        self.access_policy_repo.change_user(user, note=f'update user password')
+        return user
+
+    @type_check
+    def update_password(self, user_id: int, old_password: str, new_password: str,
+                        retype_password: str):
+        self._validate_new_password(new_password, retype_password)
         user = self.find_by_id(user_id)
         if not user:
             raise error_collection.RecordNotFound
-        if user.verify_password(old_password):
+        if self.password_hasher.verify(old_password, user.password):
             # confirm old password
-            user.hash_password(new_password)
-            user = self.user_repo.update(user)
-            self.access_policy_repo.change_user(user, note=f'update user password')
+            user.password = self.password_hasher.hash(new_password)
+            user = self._save_password(user)
+        return user
+
+    @type_check
+    async def update_password_async(self, user_id: int, old_password: str, new_password: str,
+                                    retype_password: str):
+        self._validate_new_password(new_password, retype_password)
+        user = await self._run_sync(self.find_by_id, user_id)
+        if await self.password_hasher.verify_async(old_password, user.password):
+            user.password = await self.password_hasher.hash_async(new_password)
+            user = await self._run_sync(self._save_password, user)
         return user
 
     @type_check
@@ -1,3 +1,13 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Query
+
+from app.domain.utils import error_collection
 from app.pkgs.errors import Error
 
 
@@ -10,3 +20,44 @@ def get_limit_offset(page: int, page_size: int):
 
     return limit, offset
 
+
+def encode_cursor(updated_at: datetime, record_id: int) -> str:
+    """Opaque cursor pointing at one record in the (updated_at desc, id desc) order"""
+    raw = json.dumps([updated_at.isoformat(), record_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        updated_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(updated_at), int(record_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise error_collection.InvalidCursor(f'invalid cursor, receive {cursor}')
+
+
+def paginate(query: Query, model, page: int = 1, page_size: int = 20, cursor: str = '') -> Query:
+    """Order query by (updated_at desc, id desc) and select one page of it.
+
+    With a cursor (next_cursor of the previous page) the page is found by keyset, which costs the
+    same at any depth, and page is ignored. Without it, page is used as offset. Both are served by
+    the (updated_at, id) index of the model, see keyset_index.
+    """
+    query = query.order_by(model.updated_at.desc(), model.id.desc())
+    if cursor:
+        if page_size < 1:
+            raise Error("Page and page_size must be positive integers.")
+        updated_at, record_id = decode_cursor(cursor)
+        # rows after (updated_at, id), the redundant first bound starts the index range scan at the cursor
+        query = query.filter(model.updated_at <= updated_at,
+                             or_(model.updated_at < updated_at, model.id < record_id))
+        return query.limit(page_size)
+    limit, offset = get_limit_offset(page, page_size)
+    return query.offset(offset).limit(limit)
+
+
+def next_cursor(records: List, page_size: int) -> str:
+    """Cursor of the page after records, empty if records is the last page"""
+    if not records or len(records) < page_size:
+        return ''
+    last = records[-1]
+    return encode_cursor(last.updated_at, last.id)
@@ -97,6 +97,12 @@ class ValidationError(Error):
     error_code: int = HttpStatusCode.Bad_Request
 
 
+@dataclass
+class InvalidCursor(Error):
+    message: str = 'invalid cursor'
+    error_code: int = HttpStatusCode.Bad_Request
+
+
 
 def test_raise_error():
     try:
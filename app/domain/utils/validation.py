@@ -1,9 +1,19 @@
 import re
+from typing import Callable, Iterable, List, TypeVar
 
 from app.pkgs import errors
 from app.pkgs.type_check import type_check
 
+T = TypeVar('T')
+
 special_symbol = ['$', '@', '#', '%']
+_special_symbols = frozenset(special_symbol)
+
+# patterns are compiled once at import instead of looked up in the re cache on every call
+name_without_space_pattern = re.compile("^[a-zA-Z0-9_.-]+$")
+name_pattern = re.compile("^[a-zA-Z0-9_. -]+$")
+email_pattern = re.compile(
+    r"^((([!#$%&'*+\-/=?^_`{|}~\w])|([!#$%&'*+\-/=?^_`{|}~\w][!#$%&'*+\-/=?^_`{|}~\.\w]{0,}[!#$%&'*+\-/=?^_`{|}~\w]))[@]\w+([-.]\w+)*\.\w+([-.]\w+)*)$")
 
 
 @type_check
@@ -19,7 +29,7 @@ def validate_id(_id: int) -> int:
 def validate_name_without_space(name: str) -> str:
     if len(name) > 128:
         raise errors.Error('Name should not be longer than 128 characters')
-    if re.match("^[a-zA-Z0-9_.-]+$", name) is None:
+    if name_without_space_pattern.match(name) is None:
         raise errors.Error(f'It should contain a-z, A-Z, 0-9, _, -, . without any space, receive {name}')
     return name
 
@@ -27,7 +37,7 @@ def validate_name_without_space(name: str) -> str:
 def validate_name(name: str) -> str:
     if len(name) > 128:
         raise errors.Error('Name should not be longer than 128 characters')
-    if re.match("^[a-zA-Z0-9_. -]+$", name) is None:
+    if name_pattern.match(name) is None:
         raise errors.Error(
             f'It should contain a-z, A-Z, 0-9, _, -, ., and spaces without any leading/trailing spaces, receive {name}')
     return name
@@ -51,9 +61,7 @@ def validate_medium_paragraph(paragraph: str) -> str:
 def validate_email(email: str) -> str:
     if len(email) > 128:
         raise errors.Error('email should not be longer than 128 characters')
-    if re.match(
-            r"^((([!#$%&'*+\-/=?^_`{|}~\w])|([!#$%&'*+\-/=?^_`{|}~\w][!#$%&'*+\-/=?^_`{|}~\.\w]{0,}[!#$%&'*+\-/=?^_`{|}~\w]))[@]\w+([-.]\w+)*\.\w+([-.]\w+)*)$",
-            email) is None:
+    if email_pattern.match(email) is None:
         raise errors.Error('Email validation type failed')
     return email
 
@@ -66,16 +74,40 @@ def validate_password(passwd: str) -> str:
     if len(passwd) > 20:
         raise errors.Error('length should be not be greater than 20')
 
-    if not any(char.isdigit() for char in passwd):
+    # classify the characters in one pass
+    has_digit = has_upper = has_lower = has_symbol = False
+    for char in passwd:
+        if char.isdigit():
+            has_digit = True
+        elif char.isupper():
+            has_upper = True
+        elif char.islower():
+            has_lower = True
+        elif char in _special_symbols:
+            has_symbol = True
+
+    if not has_digit:
         raise errors.Error('Password should have at least one numeral')
 
-    if not any(char.isupper() for char in passwd):
+    if not has_upper:
         raise errors.Error('Password should have at least one uppercase letter')
 
-    if not any(char.islower() for char in passwd):
+    if not has_lower:
         raise errors.Error('Password should have at least one lowercase letter')
 
-    if not any(char in special_symbol for char in passwd):
+    if not has_symbol:
         raise errors.Error(f'Password should have at least one of the symbols {special_symbol}')
 
     return passwd
+
+
+def validate_many(validator: Callable[[T], T], values: Iterable[T]) -> List[T]:
+    """Validate a batch of values with one validator, return the validated values.
+    The error of the first invalid value tells its position in the batch."""
+    results = []
+    for i, value in enumerate(values):
+        try:
+            results.append(validator(value))
+        except errors.Error as e:
+            raise e.with_prefix(f'item {i}: ') from e
+    return results
@@ -14,9 +14,16 @@ def process_service():
 
 
 @cache
-def create_work_flow(name: str = 'approval process 1', des: str = 'testing'):
+def _get_or_create_work_flow_id(name: str, des: str) -> int:
     process_service = container.get_singleton(ProcessService)
     try:
-        return process_service.find_one_by_name(name)
+        return process_service.find_one_by_name(name).id
     except error_collection.RecordNotFound:
-        return process_service.create(name, des)
+        return process_service.create(name, des).id
+
+
+def create_work_flow(name: str = 'approval process 1', des: str = 'testing'):
+    # only the id is cached, the process is loaded again in the session of the caller
+    _get_or_create_work_flow_id(name, des)
+    process_service = container.get_singleton(ProcessService)
+    return process_service.find_one_by_name(name)
@@ -1,47 +1,58 @@
+from functools import partial
 from typing import List
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
-from app.cmd.center_store import user_role_service, user_service, fastapi_middleware as middleware
+from app.cmd.center_store import user_role_service, user_service, token_cache, connection_pool, \
+    fastapi_middleware as middleware
+from app.config import cli_config
+from app.domain.model import User
+from app.domain.model.serializer import Serializer
 from .api_model import LoginReq, UserAPI, UserConfirm, RoleAPI, User2PermissionAPI
 
 admin_api = APIRouter()
+user_serializer = Serializer(User, exclude=['password'], include=['roles'], sources={'roles': 'loaded_roles'})
 
 
 @admin_api.post("/admin", tags=["admin"], response_model=UserAPI)
 @middleware.error_handler
 @middleware.require_permissions('admin', 'admin.create')
 async def create_new_user_by_admin(request: Request, e: LoginReq):
-    user = user_service.create_new_user(e.email, e.password)
-    return user.to_json()
+    user = await user_service.create_new_user_async(e.email, e.password)
+    return await middleware.run_sync(user.to_json)
 
 
 @admin_api.get('/admin/users', tags=["admin"], response_model=List[UserAPI])
 @middleware.error_handler
 @middleware.require_permissions('admin')
-async def find_all(request: Request, search_word: str = '', page: int = 1):
-    users = user_service.search(search_word, page=int(page))
-    res = []
-    for u in users:
-        res.append(u.to_json())
-    return res
+async def find_all(request: Request, search_word: str = '', page: int = 1, page_size: int = 10,
+                   cursor: str = '', stream: str = ''):
+    if stream:
+        # the rows as a json array or ndjson, read and sent a batch at a time (exports)
+        return await middleware.stream(stream, partial(user_service.iter_search, search_word, int(page), page_size,
+                                                       cursor, cli_config.STREAM_BATCH_SIZE),
+                                       user_serializer.serialize_many)
+    res, next_page = await middleware.run_sync_page(page_size, user_service.search, search_word, page=int(page),
+                                                    page_size=page_size, cursor=cursor,
+                                                    serialize=user_serializer.serialize_many)
+    # the body stays a list, the cursor of the next page is sent as a header
+    return JSONResponse(content=res, headers={'X-Next-Cursor': next_page})
 
 
 @admin_api.get('/admin/users/{_id}', tags=["admin"], response_model=UserAPI)
 @middleware.error_handler
 @middleware.require_permissions('admin')
 async def find_one(request: Request, _id: str):
-    user = user_service.find_by_id(int(_id))
-    return user.to_json()
+    return await middleware.run_sync_json(user_service.find_by_id, int(_id))
 
 
 @admin_api.get('/admin/users/{_id}/profile', tags=["admin"], response_model=UserAPI)
 @middleware.error_handler
 @middleware.require_permissions('admin')
 async def find_one_with_all_profile(request: Request, _id: str):
-    user, permissions = user_service.find_user_info_by_id(int(_id))
-    user_dict = user.to_json()
-    user_dict['permissions'] = [p.to_json() for p in permissions]
+    user_dict, permissions = await middleware.run_sync_json(user_service.find_user_info_by_id, int(_id))
+    user_dict['permissions'] = permissions
     return user_dict
 
 
@@ -50,8 +61,21 @@ async def find_one_with_all_profile(request: Request, _id: str):
 @middleware.require_permissions('admin', 'admin.update')
 async def update_is_confirmed(request: Request, _id: str, u: UserConfirm):
     is_confirmed = u.is_confirmed
-    user = user_service.update_is_confirmed(int(_id), is_confirmed)
-    return user.to_json()
+    return await middleware.run_sync_json(user_service.update_is_confirmed, int(_id), is_confirmed)
+
+
+@admin_api.get('/admin/token_cache', tags=["admin"], response_model=dict)
+@middleware.error_handler
+@middleware.require_permissions('admin')
+async def view_token_cache_stats(request: Request):
+    return token_cache.stats()
+
+
+@admin_api.get('/admin/db_pool', tags=["admin"], response_model=dict)
+@middleware.error_handler
+@middleware.require_permissions('admin')
+async def view_db_pool_status(request: Request):
+    return connection_pool.pool_status()
 
 
 # admin role-permission base access control
@@ -61,27 +85,21 @@ async def update_is_confirmed(request: Request, _id: str, u: UserConfirm):
 async def create_new_role(request: Request, u: RoleAPI):
     name = u.name
     description = u.description
-    role = user_role_service.create_new_role(name, description)
-    return role.to_json()
+    return await middleware.run_sync_json(user_role_service.create_new_role, name, description)
 
 
 @admin_api.get('/admin/roles', tags=["admin"], response_model=List[RoleAPI])
 @middleware.error_handler
 @middleware.require_permissions('admin')
 async def view_role(request: Request, name: str, page: int):
-    roles_dict = []
-    roles = user_role_service.search_roles_with_permission(name, page=int(page))
-    for r in roles:
-        roles_dict.append(r.to_json())
-    return roles_dict
+    return await middleware.run_sync_json(user_role_service.search_roles_with_permission, name, page=int(page))
 
 
 @admin_api.get('/admin/roles/{role_id}', tags=["admin"], response_model=List[RoleAPI])
 @middleware.error_handler
 @middleware.require_permissions('admin')
 async def view_role_by_admin(request: Request, role_id: str):
-    role = user_role_service.find_by_id(int(role_id))
-    return role.to_json()
+    return await middleware.run_sync_json(user_role_service.find_by_id, int(role_id))
 
 
 @admin_api.post('/admin/users2roles', tags=["admin"], response_model=UserAPI)
@@ -90,8 +108,7 @@ async def view_role_by_admin(request: Request, role_id: str):
 async def append_role_to_user_by_admin(request: Request, u: User2PermissionAPI):
     user_id = u.user_id
     role_id = u.role_id
-    user = user_role_service.append_role_to_user(user_id, role_id)
-    return user.to_json()
+    return await middleware.run_sync_json(user_role_service.append_role_to_user, user_id, role_id)
 
 
 @admin_api.put('/admin/users2roles', tags=["admin"], response_model=UserAPI)
@@ -100,8 +117,7 @@ async def append_role_to_user_by_admin(request: Request, u: User2PermissionAPI):
 async def remove_role_to_user_by_admin(request: Request, u: User2PermissionAPI):
     user_id = u.user_id
     role_id = u.role_id
-    u = user_role_service.remove_role_from_user(user_id, role_id)
-    return u.to_json()
+    return await middleware.run_sync_json(user_role_service.remove_role_from_user, user_id, role_id)
 
 
 # permission append, remove...
@@ -119,8 +135,7 @@ async def view_all_available_permission_by_admin(request: Request):
 async def append_permission_to_role_by_admin(request: Request, u: User2PermissionAPI):
     role_id = u.role_id
     permission = u.permission
-    r = user_role_service.append_permission_to_role(role_id, permission)
-    return r.to_json()
+    return await middleware.run_sync_json(user_role_service.append_permission_to_role, role_id, permission)
 
 
 @admin_api.put('/admin/roles2permissions', tags=["admin"], response_model=RoleAPI)
@@ -129,5 +144,4 @@ async def append_permission_to_role_by_admin(request: Request, u: User2Permissio
 async def remove_permission_to_role_by_admin(request: Request, u: User2PermissionAPI):
     role_id = u.role_id
     permission = u.permission
-    r = user_role_service.remove_permission_from_role(role_id, permission)
-    return r.to_json()
+    return await middleware.run_sync_json(user_role_service.remove_permission_from_role, role_id, permission)
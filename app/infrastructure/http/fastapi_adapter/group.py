@@ -1,14 +1,15 @@
+from functools import partial
 from typing import List
 
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
 
 from app.cmd import center_store
+from app.config import cli_config
 from app.domain.service.group_service import GroupService
-from app.infrastructure.http.fastapi_adapter.middle_ware import FastAPIMiddleware
 
 group_api = APIRouter()
-middleware = center_store.container.get_singleton(FastAPIMiddleware)
+middleware = center_store.fastapi_middleware
 group_service = center_store.container.get_singleton(GroupService)
 
 
@@ -27,47 +28,49 @@ class ListGroupResponse(BaseModel):
     data: List[GroupResponse]
     page: int
     page_size: int
+    next_cursor: str = ''  # pass it as cursor to get the next page, empty on the last page
 
 
 @group_api.post('/group', tags=['group'], response_model=GroupResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def create_new_group(request: Request, group: GroupReq):
-    p = group_service.create(group.name, group.description)
-    return p.to_json()
+    return await middleware.run_sync_json(group_service.create, group.name, group.description)
 
 
 @group_api.get('/group/{group_id}', tags=['group'], response_model=GroupResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def find_one_group(request: Request, group_id: int):
-    p = group_service.find_one(group_id)
-    return p.to_json()
+    return await middleware.run_sync_json(group_service.find_one, group_id)
 
 
 @group_api.get('/group', tags=['group'], response_model=ListGroupResponse)
 @middleware.error_handler
 @middleware.require_permissions()
-async def search_groups(request: Request, name: str, page: int = 1, page_size: int = 10):
-    groups = group_service.search(name, page, page_size)
-    data = [group.to_json() for group in groups]
-    return {"data": data, "page": page, "page_size": page_size}
+async def search_groups(request: Request, name: str, page: int = 1, page_size: int = 10, cursor: str = '',
+                        stream: str = ''):
+    if stream:
+        # the rows as a json array or ndjson, read and sent a batch at a time (exports)
+        return await middleware.stream(stream, partial(group_service.iter_search, name, page, page_size, cursor,
+                                                       cli_config.STREAM_BATCH_SIZE),
+                                       lambda batch: [group.to_json() for group in batch])
+    data, next_page = await middleware.run_sync_page(page_size, group_service.search, name, page, page_size, cursor)
+    return {"data": data, "page": page, "page_size": page_size, "next_cursor": next_page}
 
 
 @group_api.put('/group/{group_id}', tags=['group'], response_model=GroupResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def update_group(request: Request, group_id: int, group: GroupReq):
-    p = group_service.update(group_id, group.name, group.description)
-    return p.to_json()
+    return await middleware.run_sync_json(group_service.update, group_id, group.name, group.description)
 
 
 @group_api.delete('/group/{group_id}', tags=['group'], response_model=GroupResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def delete_group(request: Request, group_id: int):
-    p = group_service.delete(group_id)
-    return p.to_json()
+    return await middleware.run_sync_json(group_service.delete, group_id)
 
 
 @group_api.post('/group/{group_id}/member/{member_id}', tags=['group'],
@@ -75,8 +78,7 @@ async def delete_group(request: Request, group_id: int):
 @middleware.error_handler
 @middleware.require_permissions()
 async def add_member_to_group(request: Request, group_id: int, member_id: int):
-    member = group_service.add_user_to_group(group_id, member_id)
-    return member.to_json()
+    return await middleware.run_sync_json(group_service.add_user_to_group, group_id, member_id)
 
 
 @group_api.delete('/group/{group_id}/member/{member_id}', tags=['group'],
@@ -84,5 +86,4 @@ async def add_member_to_group(request: Request, group_id: int, member_id: int):
 @middleware.error_handler
 @middleware.require_permissions()
 async def remove_member_from_group(request: Request, group_id: int, member_id: int):
-    member = group_service.remove_user_from_group(group_id, member_id)
-    return member.to_json()
+    return await middleware.run_sync_json(group_service.remove_user_from_group, group_id, member_id)
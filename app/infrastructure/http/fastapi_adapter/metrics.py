@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.cmd.center_store import connection_pool, request_metrics, token_cache, fastapi_middleware as middleware
+from app.config import cli_config
+from app.pkgs.metrics import render_gauges
+
+metrics_api = APIRouter()
+
+
+async def _render_metrics(request: Request) -> PlainTextResponse:
+    lines = request_metrics.to_prometheus() if request_metrics else []
+    lines += render_gauges('db_pool', connection_pool.pool_status())
+    lines += render_gauges('token_cache', token_cache.stats())
+    return PlainTextResponse('\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
+
+
+# the token is checked like on the admin api, so these scrapes are measured themselves
+_render_metrics_for_admin = middleware.error_handler(middleware.require_permissions('admin')(_render_metrics))
+
+
+@metrics_api.get('/metrics', tags=["metrics"], response_class=PlainTextResponse)
+async def view_metrics(request: Request):
+    """Http and database metrics in the prometheus text format, served to admins only.
+
+    With METRICS_PUBLIC (scraped from an internal network) it is served without a token, and is
+    not behind error_handler, so scrapes are not measured themselves and open no database session.
+    """
+    if cli_config.METRICS_PUBLIC:
+        return await _render_metrics(request)
+    return await _render_metrics_for_admin(request)
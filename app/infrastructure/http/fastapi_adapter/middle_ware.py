@@ -1,6 +1,8 @@
+import itertools
+import time
 from asyncio import current_task
-from typing import Any, Union, Optional
-from fastapi.responses import JSONResponse
+from typing import Any, Callable, Iterator, List, Union, Optional, Tuple
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi import Request
 from pydantic import BaseModel
 from fastapi import status
@@ -8,13 +10,29 @@ from functools import wraps
 from logging import Logger
 
 from app.domain.model import ConnectionPool
+from app.pkgs.query_metrics import QueryStats
 from app.domain.model.user import UserPayload, unpack_user_payload
 from app.domain.utils import error_collection
+from app.domain.utils.db_helper import next_cursor
 from app.domain.service.user import UserService
+from app.pkgs import json_stream
 from app.pkgs.errors import Error
+from app.pkgs.metrics import RequestMetrics
+from app.pkgs.token_cache import TokenCache
 import traceback
 
 
+def to_json(value) -> Union[dict, list]:
+    """to_json of a model, or of each model of a list or tuple"""
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    return value.to_json()
+
+
+def call_to_json(func: Callable, *args, **kwargs) -> Union[dict, list]:
+    return to_json(func(*args, **kwargs))
+
+
 class ErrorResponse(BaseModel):
     error: str
     data: Union[Any, None]
@@ -40,11 +58,14 @@ class Req(Request):
 
 
 class FastAPIMiddleware(object):
-    def __init__(self, a: UserService, connection_pool: ConnectionPool, logger: Logger):
+    def __init__(self, a: UserService, connection_pool: ConnectionPool, logger: Logger,
+                 token_cache: TokenCache = None, request_metrics: RequestMetrics = None):
         self.user_service = a
         self.connection_pool = connection_pool
         self.permissions_list = set()
         self.logger = logger
+        self.token_cache = token_cache
+        self.request_metrics = request_metrics
 
     def error_handler(self, func):
         """Contain handler for json and error exception. Accept only one value (not tuple) and should be a dict/list
@@ -58,26 +79,101 @@ class FastAPIMiddleware(object):
 
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            db_session = self.connection_pool.open_session()
+            if self.request_metrics is None:
+                return await self._handle(func, args, kwargs)
+            start = time.perf_counter()
+            with self.connection_pool.query_metrics.track() as query_stats:
+                res = await self._handle(func, args, kwargs)
+            self._observe(func, args, kwargs, res, time.perf_counter() - start, query_stats)
+            return res
+
+        return wrapper
+
+    async def _handle(self, func, args: tuple, kwargs: dict):
+        # one transaction per call: repositories flush, it is committed here once
+        db_session = self.connection_pool.open_session(unit_of_work=self.connection_pool.http_unit_of_work)
+        try:
+            res = await func(*args, **kwargs)
+            await self.run_sync(db_session.commit)
+            if isinstance(res, (BaseModel, Response)):
+                return res
+            return JSONResponse(content=res)
+        except Error as e:
+            await self.run_sync(db_session.rollback)
+            self.logger.error(e, exc_info=e)
+            return JSONResponse(content=e.to_json(), status_code=e.code())
+        except Exception as e:
+            await self.run_sync(db_session.rollback)
+            self.logger.error(e, exc_info=e)
+            return JSONResponse(content=dict(data=None, error=f'Unknown error: {str(e)}'),
+                                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            await self.run_sync(self.connection_pool.close_session)
+
+    @staticmethod
+    def _route_of(func, args: tuple, kwargs: dict) -> Tuple[str, str]:
+        """Method and path template of the call, e.g. ('GET', '/api/request/{request_id}')"""
+        for value in itertools.chain(kwargs.values(), args):
+            if isinstance(value, Request):
+                route = value.scope.get('route')
+                return value.method, getattr(route, 'path', func.__name__)
+        return '', func.__name__
+
+    def _observe(self, func, args: tuple, kwargs: dict, res, seconds: float, query_stats: QueryStats):
+        method, route = self._route_of(func, args, kwargs)
+        status_code = getattr(res, 'status_code', status.HTTP_200_OK)
+        self.request_metrics.observe(method, route, status_code, seconds, query_stats.statements, query_stats.seconds)
+        if self.request_metrics.is_slow(seconds):
+            slowest = '; '.join(f'{count}x {query_seconds:.3f}s {" ".join(statement.split())[:200]}'
+                                for statement, count, query_seconds in query_stats.slowest())
+            self.logger.warning(f'slow request {method} {route} {status_code} took {seconds:.3f}s, '
+                                f'{query_stats.statements} sql statements in {query_stats.seconds:.3f}s: {slowest}')
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Call blocking service/repository code from a handler, see ConnectionPool.run_sync"""
+        return await self.connection_pool.run_sync(func, *args, **kwargs)
+
+    async def run_sync_json(self, func, *args, **kwargs) -> Union[dict, list]:
+        """run_sync then to_json of the result in the same worker call, to_json can load
+        relationships (e.g. User.roles) which must not block the event loop"""
+        return await self.connection_pool.run_sync(call_to_json, func, *args, **kwargs)
+
+    # page_size and func are positional only, func can take a page_size keyword too
+    async def run_sync_page(self, page_size: int, func, /, *args,
+                            serialize: Callable[[List], List[dict]] = to_json, **kwargs) -> Tuple[List[dict], str]:
+        """run_sync of a paged search, return its rows serialized in the worker call and the cursor
+        of the next page"""
+        def page():
+            rows = func(*args, **kwargs)
+            return serialize(rows), next_cursor(rows, page_size)
+
+        return await self.connection_pool.run_sync(page)
+
+    async def stream(self, stream_format: str, iter_batches: Callable[[], Iterator[List]],
+                     serialize: Callable[[List], List[dict]]) -> StreamingResponse:
+        """Response sending the rows of iter_batches as they are read, as one json array or as ndjson.
+
+        iter_batches is called in a worker thread, e.g. a repository iter_search. Each batch is read
+        and serialized in a worker thread too, so at most one batch is held in memory.
+        """
+        if stream_format not in json_stream.STREAM_FORMATS:
+            raise Error(f'stream must be one of {json_stream.STREAM_FORMATS}, receive {stream_format}')
+        batches = await self.run_sync(iter_batches)
+        chunks = json_stream.iter_encoded((serialize(batch) for batch in batches), stream_format)
+
+        async def body():
             try:
-                res = await func(*args, **kwargs)
-                db_session.commit()
-                if isinstance(res, BaseModel):
-                    return res
-                return JSONResponse(content=res)
-            except Error as e:
-                db_session.rollback()
-                self.logger.error(e, exc_info=e)
-                return JSONResponse(content=e.to_json(), status_code=e.code())
-            except Exception as e:
-                db_session.rollback()
-                self.logger.error(e, exc_info=e)
-                return JSONResponse(content=dict(data=None, error=f'Unknown error: {str(e)}'),
-                                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                while True:
+                    chunk = await self.run_sync(next, chunks, None)
+                    if chunk is None:
+                        return
+                    yield chunk
             finally:
-                self.connection_pool.close_session()
+                # the client may disconnect before the end, close the session of the rows
+                await self.run_sync(chunks.close)
+                await self.run_sync(batches.close)
 
-        return wrapper
+        return StreamingResponse(body(), media_type=json_stream.MEDIA_TYPES[stream_format])
 
     @staticmethod
     def get_bearer_token(request: Request) -> str:
@@ -114,12 +210,35 @@ class FastAPIMiddleware(object):
         # to avoid unwanted interactions with CORS.
         if request.method.upper() != 'OPTIONS':  # pragma: no cover
             token = self.get_bearer_token(request)
-            payload = self.user_service.validate_auth_token(token)
-            self.user_service.validate_access_policy(payload['sub'], payload['role_ids'],
-                                                     payload['iat'])
+            payload = self._get_cached_payload(token)
+            if payload is None:
+                payload = self._validate_token(token)
             return unpack_user_payload(payload)
         return None
 
+    async def _verify_auth_token_async(self, request: Request) -> Optional[UserPayload]:
+        """Same as _verify_auth_token, only a cache miss goes to the database worker threads"""
+        if request.method.upper() != 'OPTIONS':  # pragma: no cover
+            token = self.get_bearer_token(request)
+            payload = self._get_cached_payload(token)
+            if payload is None:
+                payload = await self.run_sync(self._validate_token, token)
+            return unpack_user_payload(payload)
+        return None
+
+    def _get_cached_payload(self, token: str) -> Optional[dict]:
+        return self.token_cache.get(token) if self.token_cache else None
+
+    def _validate_token(self, token: str) -> dict:
+        # read generation before verifying, so a denial written meanwhile is not cached
+        generation = self.token_cache.generation if self.token_cache else None
+        payload = self.user_service.validate_auth_token(token)
+        self.user_service.validate_access_policy(payload['sub'], payload['role_ids'],
+                                                 payload['iat'])
+        if self.token_cache:
+            self.token_cache.set(token, payload, generation=generation)
+        return payload
+
     def require_permissions(self, *permissions):
         """
         Require on of the following permissions to pass over:
@@ -131,7 +250,7 @@ class FastAPIMiddleware(object):
         def check_permission(fn):
             @wraps(fn)
             async def permit(request: Request, *args, **kwargs):
-                u = self._verify_auth_token(request)
+                u = await self._verify_auth_token_async(request)
                 if not u:
                     # any handler for OPTION method should be here
                     raise Error("permission denied", status.HTTP_403_FORBIDDEN)
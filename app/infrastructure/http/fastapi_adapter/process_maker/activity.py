@@ -6,10 +6,9 @@ from pydantic import BaseModel
 from app.cmd import center_store
 from app.domain.model.process_maker.activity import Activity
 from app.domain.service.process_maker.activity_service import ActivityService
-from app.infrastructure.http.fastapi_adapter.middle_ware import FastAPIMiddleware
 
 activity_api = APIRouter()
-middleware = center_store.container.get_singleton(FastAPIMiddleware)
+middleware = center_store.fastapi_middleware
 activity_service = center_store.container.get_singleton(ActivityService)
 
 
@@ -29,60 +28,54 @@ class ListActivityResponse(BaseModel):
     data: List[ActivityResponse]
     page: int
     page_size: int
+    next_cursor: str = ''  # pass it as cursor to get the next page, empty on the last page
 
 
 @activity_api.post('/activity', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def create_new_activity(request: Request, activity: ActivityReq):
-    a = activity_service.create(activity.name, activity.description, activity.activity_type)
-    return a.to_json()
+    return await middleware.run_sync_json(activity_service.create, activity.name, activity.description, activity.activity_type)
 
 
 @activity_api.get('/activity/{activity_id}', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def find_one_activity(request: Request, activity_id: int):
-    a = activity_service.find_one(activity_id)
-    return a.to_json()
+    return await middleware.run_sync_json(activity_service.find_one, activity_id)
 
 
 @activity_api.get('/activity', tags=['activity'], response_model=ListActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
-async def search_activities(request: Request, name: str, page: int = 1, page_size: int = 10):
-    activities = activity_service.search(name, page, page_size)
-    data = [activity.to_json() for activity in activities]
-    return {"data": data, "page": page, "page_size": page_size}
+async def search_activities(request: Request, name: str, page: int = 1, page_size: int = 10, cursor: str = ''):
+    data, next_page = await middleware.run_sync_page(page_size, activity_service.search, name, page, page_size, cursor)
+    return {"data": data, "page": page, "page_size": page_size, "next_cursor": next_page}
 
 
 @activity_api.put('/activity/{activity_id}', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def update_activity(request: Request, activity_id: int, activity: ActivityReq):
-    a = activity_service.update(activity_id, activity.name, activity.description, activity.activity_type)
-    return a.to_json()
+    return await middleware.run_sync_json(activity_service.update, activity_id, activity.name, activity.description, activity.activity_type)
 
 
 @activity_api.delete('/activity/{activity_id}', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def delete_activity(request: Request, activity_id: int):
-    a = activity_service.delete(activity_id)
-    return a.to_json()
+    return await middleware.run_sync_json(activity_service.delete, activity_id)
 
 
 @activity_api.post('/activity/{activity_id}/target/{target_id}', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def add_target_to_activity(request: Request, activity_id: int, target_id: int):
-    p = activity_service.add_target_to_activity(activity_id, target_id)
-    return p.to_json()
+    return await middleware.run_sync_json(activity_service.add_target_to_activity, activity_id, target_id)
 
 
 @activity_api.delete('/activity/{activity_id}/target/{target_id}', tags=['activity'], response_model=ActivityResponse)
 @middleware.error_handler
 @middleware.require_permissions()
 async def remove_target_from_activity(request: Request, activity_id: int, target_id: int):
-    p = activity_service.remove_target_from_activity(activity_id, target_id)
-    return p.to_json()
+    return await middleware.run_sync_json(activity_service.remove_target_from_activity, activity_id, target_id)
@@ -1,16 +1,24 @@
+from functools import partial
 from typing import List
 
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
 
 from app.cmd import center_store
+from app.config import cli_config
 from app.domain.service.process_maker.request_service import RequestService
 from app.domain.model.process_maker.request import Request
-from app.infrastructure.http.fastapi_adapter.middle_ware import FastAPIMiddleware, Req
+from app.domain.model.serializer import Serializer
+from app.infrastructure.http.fastapi_adapter.middle_ware import Req
 
 request_api = APIRouter()
-middleware = center_store.container.get_singleton(FastAPIMiddleware)
+middleware = center_store.fastapi_middleware
 request_service = center_store.container.get_singleton(RequestService)
+# the graph loaded by RequestRepository.find_detail
+request_detail_serializer = Serializer(
+    Request,
+    include=['request_action.action', 'request_note', 'request_stakeholder', 'request_data',
+             'current_state.activity', 'current_state.route.action.target', 'current_state.route.activity'])
 
 
 class RequestDataPayload(BaseModel):
@@ -35,6 +43,10 @@ class RequestContent(BaseModel):
     entity_id: int = 0
 
 
+class BulkRequestContent(BaseModel):
+    requests: List[RequestContent]
+
+
 class RequestResponse(BaseModel):
     process_id: int
     user_id: int
@@ -54,6 +66,11 @@ class ListRequestResponse(BaseModel):
     data: List[RequestResponse]
     page: int
     page_size: int
+    next_cursor: str = ''  # pass it as cursor to get the next page, empty on the last page
+
+
+class ListCreatedRequestResponse(BaseModel):
+    data: List[RequestResponse]
 
 
 class ActionPayload(BaseModel):
@@ -66,7 +83,8 @@ class ActionPayload(BaseModel):
 @middleware.require_permissions()
 async def create_new_request(request: Req, request_content: RequestContent):
     user_payload = request.user_payload
-    req = request_service.create_request(
+    return await middleware.run_sync_json(
+        request_service.create_request,
         process_id=request_content.process_id,
         user_id=user_payload.user.id,
         title=request_content.title,
@@ -76,7 +94,33 @@ async def create_new_request(request: Req, request_content: RequestContent):
         entity_model=request_content.entity_model,
         entity_id=request_content.entity_id,
     )
-    return req.to_json()
+
+
+@request_api.post('/request/bulk', tags=['request'], response_model=ListCreatedRequestResponse)
+@middleware.error_handler
+@middleware.require_permissions()
+async def create_new_requests_bulk(request: Req, bulk_content: BulkRequestContent):
+    user_payload = request.user_payload
+    requests = await middleware.run_sync_json(
+        request_service.create_requests_bulk, user_payload.user.id,
+        [request_content.dict() for request_content in bulk_content.requests])
+    return dict(data=requests)
+
+
+@request_api.get('/request', tags=['request'], response_model=ListRequestResponse)
+@middleware.error_handler
+@middleware.require_permissions()
+async def search_requests(request: Req, title: str = '', page: int = 1, page_size: int = 10, cursor: str = '',
+                          stream: str = ''):
+    if stream:
+        # the rows as a json array or ndjson, read and sent a batch at a time (exports)
+        return await middleware.stream(stream, partial(request_service.iter_search, title, page, page_size, cursor,
+                                                       cli_config.STREAM_BATCH_SIZE),
+                                       lambda batch: [req.to_json() for req in batch])
+    data, next_page = await middleware.run_sync_page(page_size, request_service.search, title, page, page_size,
+                                                     cursor)
+    return dict(data=data, page=page, page_size=page_size, next_cursor=next_page)
+
 
 @request_api.get('/request/{request_id}', tags=['request'], response_model=RequestResponse)
 @middleware.error_handler
@@ -84,8 +128,9 @@ async def create_new_request(request: Req, request_content: RequestContent):
 async def find_one_request(request: Req, request_id: int):
     user_payload = request.user_payload
     # todo: add a check if the user can view this request
-    req = request_service.find_one_request(request_id)
-    return req.to_json()
+    # serialized in the worker call, the detail reads the eager loaded graph of the request
+    return await middleware.run_sync(lambda: request_detail_serializer.serialize(
+        request_service.find_one_request(request_id)))
 
 
 @request_api.get('/request/{request_id}/allowed_action', tags=['request'], response_model=ListRequestResponse)
@@ -93,8 +138,9 @@ async def find_one_request(request: Req, request_id: int):
 @middleware.require_permissions()
 async def find_one_request(request: Req, request_id: int):
     user_payload = request.user_payload
-    actions = request_service.find_request_allowed_action(request_id, user_payload.user.id)
-    return dict(data=[action.to_json() for action in actions ])
+    actions = await middleware.run_sync_json(request_service.find_request_allowed_action, request_id,
+                                             user_payload.user.id)
+    return dict(data=actions)
 
 
 @request_api.get('/request/{request_id}/allowed_action/{specific_user_id}', tags=['request'], response_model=ListRequestResponse)
@@ -102,8 +148,9 @@ async def find_one_request(request: Req, request_id: int):
 @middleware.require_permissions()
 async def find_one_request(request: Req, request_id: int, specific_user_id: int):
     user_payload = request.user_payload
-    actions = request_service.find_request_allowed_action_for_specific_user(request_id, user_payload.user.id, specific_user_id)
-    return dict(data=[action.to_json() for action in actions])
+    actions = await middleware.run_sync_json(request_service.find_request_allowed_action_for_specific_user,
+                                             request_id, user_payload.user.id, specific_user_id)
+    return dict(data=actions)
 
 
 @request_api.post('/request/{request_id}/action/{action_id}', tags=['request'], response_model=ListRequestResponse)
@@ -111,5 +158,4 @@ async def find_one_request(request: Req, request_id: int, specific_user_id: int)
 @middleware.require_permissions()
 async def user_commit_action(request: Req, request_id: int, action_id: int):
     user_payload = request.user_payload
-    request_action = request_service.user_commit_action(request_id, user_payload.user.id, action_id)
-    return request_action.to_json()
+    return await middleware.run_sync_json(request_service.user_commit_action, request_id, user_payload.user.id, action_id)
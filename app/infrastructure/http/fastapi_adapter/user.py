@@ -17,8 +17,8 @@ reset_password_path = '/user/reset_password/'
 @middleware.error_handler
 @middleware.require_permissions('admin', 'admin.create')
 async def create_new_user_by_admin(request: Request, e: LoginReq):
-    user = user_service.create_new_user(e.email, e.password)
-    return user.to_json()
+    user = await user_service.create_new_user_async(e.email, e.password)
+    return await middleware.run_sync(user.to_json)
 
 
 @user_api.post('/users', tags=["user"], response_model=Token)
@@ -26,7 +26,7 @@ async def create_new_user_by_admin(request: Request, e: LoginReq):
 async def sign_up(request: Request, u: LoginReq):
     email = u.email
     password = u.password
-    token = user_service.sign_up_new_user(email, password,
+    token = await middleware.run_sync(user_service.sign_up_new_user, email, password,
                                           confirm_url=request.url_for('user_confirm_sign_up', token=''))
     return {'token': token}
 
@@ -34,7 +34,7 @@ async def sign_up(request: Request, u: LoginReq):
 @user_api.get(confirm_path + '{token}', tags=["user"], response_model=ErrorResponse)
 @middleware.error_handler
 async def user_confirm_sign_up(request: Request, token: str):
-    confirm = user_service.confirm_user_email(token)
+    confirm = await middleware.run_sync(user_service.confirm_user_email, token)
     if confirm:
         return {'data': 'User confirmed. Please login again'}
     return {'error': 'User confirmation failed'}
@@ -44,14 +44,15 @@ async def user_confirm_sign_up(request: Request, token: str):
 @middleware.error_handler
 async def user_reset_password(request: Request, u: LoginReq):
     email = u.email
-    user_service.request_reset_user_password(email, confirm_url=request.url_for('user_confirm_reset_password', token=''))
+    await middleware.run_sync(user_service.request_reset_user_password, email,
+                              confirm_url=request.url_for('user_confirm_reset_password', token=''))
     return {'data': f'Confirmation link was sent to the email {email}'}
 
 
 @user_api.post(reset_password_path + '{token}', tags=["user"], response_model=ErrorResponse)
 @middleware.error_handler
 async def user_confirm_reset_password(request: Request, token):
-    confirm = user_service.confirm_reset_user_password(token)
+    confirm = await middleware.run_sync(user_service.confirm_reset_user_password, token)
     if confirm:
         return {'data': 'Password reset. Please check your email to receive new password'}
     return {'error': 'Reset password confirmation failed'}
@@ -62,7 +63,7 @@ async def user_confirm_reset_password(request: Request, token):
 async def login(request: Request, u: LoginReq):
     email = u.email
     password = u.password
-    token = user_service.login(email, password)
+    token = await user_service.login_async(email, password)
     return {'token': token}
 
 
@@ -81,8 +82,8 @@ async def update_password(request: Request, _id: str, u: UpdatePasswordAPI):
     old_password = u.old_password
     new_password = u.new_password
     retype_password = u.retype_password
-    user = user_service.update_password(int(_id), old_password, new_password, retype_password)
-    return user.to_json()
+    user = await user_service.update_password_async(int(_id), old_password, new_password, retype_password)
+    return await middleware.run_sync(user.to_json)
 
 
 @user_api.get('/logout', tags=["user"], response_model=ErrorResponse)
@@ -90,6 +91,6 @@ async def update_password(request: Request, _id: str, u: UpdatePasswordAPI):
 @middleware.require_permissions()
 async def logout(request: Request):
     token = middleware.get_bearer_token(request)
-    r = user_service.logout(token)
+    r = await middleware.run_sync(user_service.logout, token)
     return {'data': r}
 
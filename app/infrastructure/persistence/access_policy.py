@@ -1,30 +1,89 @@
-from app.domain.model import ConnectionPool, AccessPolicy, Role, User
+from functools import partial
+from typing import List, Optional
+
+from app.domain.model import ConnectionPool, AccessPolicy, AccessPolicyLatest, Role, User
 from datetime import datetime
-from sqlalchemy import or_
+from sqlalchemy import DateTime, String, and_, case, exists, func, literal, or_
+from sqlalchemy.dialects import mysql, postgresql
+
+from app.pkgs.token_cache import TokenCache
 
 
 class AccessPolicyRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, token_cache: TokenCache = None):
         self.db = sql_connection
+        self.token_cache = token_cache
+
+    @staticmethod
+    def _deny(session, subject_type: str, subject_id: int, checker: AccessPolicy):
+        """Append to the history and move the latest denial of the subject, never backwards.
+
+        Two concurrent denials of one subject both upsert the row in one statement, the later
+        denied_before wins whatever the commit order.
+        """
+        session.add(checker)
+        table = AccessPolicyLatest.__table__
+        values = dict(subject_type=subject_type, subject_id=subject_id, note=checker.note,
+                      denied_before=checker.denied_before)
+        dialect = session.get_bind().dialect.name
+        if dialect == 'mysql':
+            denied_before = literal(checker.denied_before, DateTime)
+            # mysql assigns in order, note is compared with the old denied_before
+            statement = mysql.insert(table).values(**values).on_duplicate_key_update([
+                ('note', case([(table.c.denied_before < denied_before, literal(checker.note, String))],
+                              else_=table.c.note)),
+                ('denied_before', func.greatest(table.c.denied_before, denied_before)),
+            ])
+        elif dialect == 'postgresql':
+            statement = postgresql.insert(table).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.subject_type, table.c.subject_id],
+                set_={'note': statement.excluded.note, 'denied_before': statement.excluded.denied_before},
+                where=table.c.denied_before < statement.excluded.denied_before)
+        else:
+            # sqlite: the update takes the database write lock, no other writer can insert the row
+            # before the insert below
+            subject = and_(AccessPolicyLatest.subject_type == subject_type,
+                           AccessPolicyLatest.subject_id == subject_id)
+            updated = session.query(AccessPolicyLatest) \
+                .filter(subject, AccessPolicyLatest.denied_before < checker.denied_before) \
+                .update({AccessPolicyLatest.note: checker.note,
+                         AccessPolicyLatest.denied_before: checker.denied_before}, synchronize_session=False)
+            if updated or session.query(exists().where(subject)).scalar():
+                return
+            statement = table.insert().values(**values)
+        session.execute(statement)
 
     def change_user(self, user: User, note: object = 'change in user') -> object:
         with self.db.new_session() as db:
             checker = AccessPolicy(user_id=user.id, note=note)
             checker.denied_before = datetime.utcnow()
-            db.session.add(checker)
+            self._deny(db.session, AccessPolicyLatest.USER, user.id, checker)
+        if self.token_cache:
+            # a token verified before the commit would be cached again with the old access
+            self.db.after_commit(partial(self.token_cache.invalidate_user, user.id))
         return checker
 
     def change_role(self, role: Role, note: str = 'change in role'):
         with self.db.new_session() as db:
             checker = AccessPolicy(role_id=role.id, note=note)
             checker.denied_before = datetime.utcnow()
-            db.session.add(checker)
+            self._deny(db.session, AccessPolicyLatest.ROLE, role.id, checker)
+        if self.token_cache:
+            # a token verified before the commit would be cached again with the old access
+            self.db.after_commit(partial(self.token_cache.invalidate_role, role.id))
         return checker
 
-    def find_for_token_validation(self, user_id, role_ids):
+    def find_for_token_validation(self, user_id: int, role_ids: List[int]) -> Optional[AccessPolicyLatest]:
+        """Latest denial of the user or any of the roles, read by primary key from
+        access_policy_latest (one row for the user and one per role at most)"""
+        subjects = AccessPolicyLatest.subject_type == AccessPolicyLatest.USER
+        subjects = and_(subjects, AccessPolicyLatest.subject_id == user_id)
+        if role_ids:
+            subjects = or_(subjects, and_(AccessPolicyLatest.subject_type == AccessPolicyLatest.ROLE,
+                                          AccessPolicyLatest.subject_id.in_(role_ids)))
         with self.db.new_session() as db:
-            checker: AccessPolicy = db.session.query(AccessPolicy) \
-                .filter(or_(AccessPolicy.user_id == user_id, AccessPolicy.role_id.in_(role_ids))) \
-                .order_by(AccessPolicy.denied_before.desc()) \
-                .first()
-        return checker
+            # the rows are written by statements, refresh the ones an earlier read left in the session
+            checkers: List[AccessPolicyLatest] = db.session.query(AccessPolicyLatest).filter(subjects) \
+                .populate_existing().all()
+        return max(checkers, key=lambda c: c.denied_before, default=None)
@@ -4,27 +4,85 @@ from app.domain.model import PermissionPolicy
 from app.domain.model.blacklist_token import BlacklistToken
 from app.pkgs import errors
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+
+import jwt
+
+from app.pkgs.token_blacklist import TokenBlacklist
+from app.pkgs.token_cache import TokenCache
+
+
+# rows of concurrent transactions can commit out of id order, a sync reloads the last ones again
+_SYNC_OVERLAP_IDS = 100
+
+
+def token_expires_at(auth_token) -> Optional[datetime]:
+    """'exp' of a token as utc datetime, the signature is checked elsewhere"""
+    try:
+        exp = jwt.decode(str(auth_token), options={'verify_signature': False}).get('exp')
+    except jwt.InvalidTokenError:
+        return None
+    return datetime.utcfromtimestamp(exp) if exp is not None else None
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return (value - datetime(1970, 1, 1)).total_seconds() if value is not None else None
 
 
 class BlacklistTokenRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, token_cache: TokenCache = None,
+                 blacklist_index: TokenBlacklist = None):
         self.db = sql_connection
+        self.token_cache = token_cache
+        self.blacklist_index = blacklist_index
 
     def is_blacklist(self, auth_token):
         # check whether auth token has been blacklisted
+        if self.blacklist_index is not None:
+            if self.blacklist_index.needs_sync():
+                self.sync_index()
+            found = self.blacklist_index.lookup(auth_token)
+            if found is not None:
+                return found
         with self.db.new_session() as db:
-            res = db.session.query(BlacklistToken).filter_by(
+            res = db.session.query(BlacklistToken.id).filter_by(
                 token=str(auth_token)).first()
             if res:
                 return True
             else:
                 return False
 
+    def sync_index(self):
+        """Load the rows added since the last sync (by any worker) into the index"""
+        index = self.blacklist_index
+        with self.db.new_session() as db:
+            rows = db.session.query(BlacklistToken.id, BlacklistToken.token, BlacklistToken.expires_at)\
+                .filter(BlacklistToken.id > index.last_id - _SYNC_OVERLAP_IDS)\
+                .filter((BlacklistToken.expires_at == None) | (BlacklistToken.expires_at > datetime.utcnow()))\
+                .order_by(BlacklistToken.id).all()
+        last_id = rows[-1].id if rows else index.last_id
+        index.add_many(((row.token, _timestamp(row.expires_at)) for row in rows), last_id=last_id)
+
     def add_token(self, auth_token):
         # check whether auth token has been blacklisted
         with self.db.new_session() as db:
             bl_token = BlacklistToken(token=str(auth_token))
             bl_token.blacklisted_on = datetime.utcnow()
+            bl_token.expires_at = token_expires_at(auth_token)
             db.session.add(bl_token)
-        return bl_token
\ No newline at end of file
+        if self.blacklist_index is not None:
+            self.blacklist_index.add(str(auth_token), _timestamp(bl_token.expires_at))
+        if self.token_cache:
+            self.token_cache.invalidate(auth_token)
+        return bl_token
+
+    def purge_expired(self, now: datetime = None) -> int:
+        """Delete tokens past their 'exp', they cannot be used anyway. Return number of deleted rows"""
+        now = now or datetime.utcnow()
+        with self.db.new_session() as db:
+            deleted = db.session.query(BlacklistToken)\
+                .filter(BlacklistToken.expires_at <= now)\
+                .delete(synchronize_session=False)
+        if self.blacklist_index is not None:
+            self.blacklist_index.purge(_timestamp(now))
+        return deleted
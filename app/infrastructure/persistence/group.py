@@ -1,16 +1,18 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set
 
 from sqlalchemy.orm import joinedload
 
 from app.domain.model import ConnectionPool, GroupMember, User
 from app.domain.model import Group
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class GroupRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, group: Group) -> Group:
         with self.db.new_session() as db:
@@ -31,17 +33,23 @@ class GroupRepository(object):
             group: Group = db.session.query(Group).filter_by(name=name).first()
         return group
 
-    def search(self, name: str = '', page: int = 1, page_size: int = 20) -> List[Group]:
-        limit, offset = get_limit_offset(page, page_size)
-        with self.db.new_session() as db:
-            query = db.session.query(Group).filter(Group.deleted_at == None).order_by(Group.updated_at.desc())
+    def _search_query(self, session, name: str = '', page: int = 1, page_size: int = 20, cursor: str = ''):
+        query = session.query(Group).filter(Group.deleted_at == None)
 
-            if name:
-                query = query.filter(Group.name.like(f"%{name}%"))
+        query = self.search_backend.filter(query, Group.name, name)
+        return paginate(query, Group, page, page_size, cursor)
 
-            groups: List[Group] = query.offset(offset).limit(limit).all()
+    def search(self, name: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Group]:
+        with self.db.new_session() as db:
+            groups: List[Group] = self._search_query(db.session, name, page, page_size, cursor).all()
         return groups
 
+    def iter_search(self, name: str = '', page: int = 1, page_size: int = 20, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Group]]:
+        """Rows of search in batches, read as they are consumed (streamed responses)"""
+        return self.db.stream(lambda session: self._search_query(session, name, page, page_size, cursor), batch_size)
+
     def is_user_in_group(self, group_id: int, user_id: int) -> Optional[GroupMember]:
         with self.db.new_session() as db:
             group_member = db.session.query(GroupMember)\
@@ -49,6 +57,13 @@ class GroupRepository(object):
                 .filter(GroupMember.user_id == user_id).first()
         return group_member
 
+    def find_group_ids_by_user(self, user_id: int) -> Set[int]:
+        """Ids of all groups the user is member of, in one query"""
+        with self.db.new_session() as db:
+            rows = db.session.query(GroupMember.group_id)\
+                .filter(GroupMember.user_id == user_id).all()
+        return {row.group_id for row in rows}
+
     def update(self, group: Group) -> Group:
         with self.db.new_session() as db:
             group.updated_at = datetime.now()
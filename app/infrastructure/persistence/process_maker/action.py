@@ -5,12 +5,14 @@ from sqlalchemy.orm import joinedload
 
 from app.domain.model import ConnectionPool
 from app.domain.model import Action
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class ActionRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, action: Action) -> Action:
         with self.db.new_session() as db:
@@ -39,17 +41,15 @@ class ActionRepository(object):
                 name=name).first()
         return action
 
-    def search(self, name: str = '', page: int = 1, page_size: int = 20) -> List[Action]:
-        limit, offset = get_limit_offset(page, page_size)
+    def search(self, name: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Action]:
         with self.db.new_session() as db:
             query = db.session.query(Action) \
-                .filter(Action.deleted_at == None) \
-                .order_by(Action.updated_at.desc())
+                .filter(Action.deleted_at == None)
 
-            if name:
-                query = query.filter(Action.name.like(f"%{name}%"))
+            query = self.search_backend.filter(query, Action.name, name)
 
-            actions: List[Action] = query.offset(offset).limit(limit).all()
+            actions: List[Action] = paginate(query, Action, page, page_size, cursor).all()
         return actions
 
     def update(self, action: Action) -> Action:
@@ -3,12 +3,14 @@ from typing import List, Optional
 
 from app.domain.model import ConnectionPool
 from app.domain.model import Activity
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class ActivityRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, activity: Activity) -> Activity:
         with self.db.new_session() as db:
@@ -36,17 +38,15 @@ class ActivityRepository(object):
             activity.target
         return activity
 
-    def search(self, name: str = '', page: int = 1, page_size: int = 20) -> List[Activity]:
-        limit, offset = get_limit_offset(page, page_size)
+    def search(self, name: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Activity]:
         with self.db.new_session() as db:
             query = db.session.query(Activity) \
-                .filter(Activity.deleted_at == None) \
-                .order_by(Activity.updated_at.desc())
+                .filter(Activity.deleted_at == None)
 
-            if name:
-                query = query.filter(Activity.name.like(f"%{name}%"))
+            query = self.search_backend.filter(query, Activity.name, name)
 
-            activites: List[Activity] = query.offset(offset).limit(limit).all()
+            activites: List[Activity] = paginate(query, Activity, page, page_size, cursor).all()
         return activites
 
     def update(self, activity: Activity) -> Activity:
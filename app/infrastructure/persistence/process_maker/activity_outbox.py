@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import and_, or_, func
+
+from app.domain.model import ConnectionPool
+from app.domain.model.process_maker.activity_outbox import ActivityOutbox, OutboxStatus
+
+
+class ActivityOutboxRepository(object):
+    def __init__(self, sql_connection: ConnectionPool):
+        self.db = sql_connection
+
+    def add_many(self, entries: List[ActivityOutbox]) -> List[ActivityOutbox]:
+        if not entries:
+            return entries
+        now = datetime.now()
+        with self.db.new_session() as db:
+            for entry in entries:
+                entry.created_at = entry.updated_at = now
+                entry.status = OutboxStatus.pending
+                entry.attempts = 0
+                entry.next_attempt_at = now
+            db.session.add_all(entries)
+        return entries
+
+    @staticmethod
+    def _due(now: datetime):
+        # pending entries whose time has come, and entries of a worker whose claim expired
+        return or_(and_(ActivityOutbox.status == OutboxStatus.pending, ActivityOutbox.next_attempt_at <= now),
+                   and_(ActivityOutbox.status == OutboxStatus.running, ActivityOutbox.locked_until < now))
+
+    def claim(self, limit: int, lease_seconds: float = 300, now: datetime = None) -> List[ActivityOutbox]:
+        """Claim up to limit due entries for the calling worker, the oldest first. Concurrent workers
+        never claim the same entry: the update only takes the rows which are still due."""
+        now = now or datetime.now()
+        token = uuid.uuid4().hex
+        with self.db.new_session() as db:
+            ids = [row.id for row in db.session.query(ActivityOutbox.id).filter(self._due(now))
+                   .order_by(ActivityOutbox.id).limit(limit)]
+            if not ids:
+                return []
+            db.session.query(ActivityOutbox).filter(ActivityOutbox.id.in_(ids)).filter(self._due(now)) \
+                .update({ActivityOutbox.status: OutboxStatus.running, ActivityOutbox.claim_token: token,
+                         ActivityOutbox.locked_until: now + timedelta(seconds=lease_seconds)},
+                        synchronize_session=False)
+            entries: List[ActivityOutbox] = db.session.query(ActivityOutbox) \
+                .filter(ActivityOutbox.claim_token == token).order_by(ActivityOutbox.id).all()
+        return entries
+
+    def mark_done(self, entries: List[ActivityOutbox]):
+        if not entries:
+            return
+        with self.db.new_session() as db:
+            db.session.query(ActivityOutbox).filter(ActivityOutbox.id.in_([e.id for e in entries])) \
+                .update({ActivityOutbox.status: OutboxStatus.done, ActivityOutbox.locked_until: None,
+                         ActivityOutbox.updated_at: datetime.now()}, synchronize_session=False)
+
+    def reschedule(self, entry: ActivityOutbox, error: str, next_attempt_at: datetime = None):
+        """Record a failed attempt, the entry is retried at next_attempt_at or failed without it"""
+        with self.db.new_session() as db:
+            db.session.query(ActivityOutbox).filter(ActivityOutbox.id == entry.id) \
+                .update({ActivityOutbox.attempts: ActivityOutbox.attempts + 1,
+                         ActivityOutbox.status: OutboxStatus.pending if next_attempt_at else OutboxStatus.failed,
+                         ActivityOutbox.next_attempt_at: next_attempt_at,
+                         ActivityOutbox.locked_until: None,
+                         ActivityOutbox.last_error: error[:500],
+                         ActivityOutbox.updated_at: datetime.now()}, synchronize_session=False)
+
+    def count_by_status(self) -> dict:
+        with self.db.new_session() as db:
+            rows = db.session.query(ActivityOutbox.status, func.count(ActivityOutbox.id)) \
+                .group_by(ActivityOutbox.status).all()
+        return {status: count for status, count in rows}
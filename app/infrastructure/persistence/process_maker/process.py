@@ -1,16 +1,18 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.domain.model import ConnectionPool
-from app.domain.model import Process
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.model import Process, State, Route, Action
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class ProcessRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, process: Process) -> Process:
         with self.db.new_session() as db:
@@ -34,6 +36,19 @@ class ProcessRepository(object):
                     s.route
         return process
 
+    def find_workflow_states(self, process_id: int) -> List[State]:
+        """States of process with everything the workflow graph needs, in a fixed number of queries"""
+        with self.db.new_session() as db:
+            states: List[State] = db.session.query(State) \
+                .filter(State.process_id == process_id, State.deleted_at == None) \
+                .options(selectinload(State.activity),
+                         selectinload(State.route).selectinload(Route.action).selectinload(Action.target),
+                         selectinload(State.route).selectinload(Route.activity)) \
+                .order_by(State.updated_at.desc()) \
+                .populate_existing() \
+                .all()
+        return states
+
     def find_by_name(self, name: str) -> Optional[Process]:
         with self.db.new_session() as db:
             process: Process = db.session.query(Process).filter_by(name=name).filter(Process.deleted_at == None).first()
@@ -41,19 +56,24 @@ class ProcessRepository(object):
                 process.state
         return process
 
-    def search(self, name: str = '', page: int = 1, page_size: int = 20) -> List[Process]:
-        limit, offset = get_limit_offset(page, page_size)
-        with self.db.new_session() as db:
-            query = db.session.query(Process) \
-                .filter(Process.deleted_at == None) \
-                .order_by(Process.updated_at.desc())
+    def _search_query(self, session, name: str = '', page: int = 1, page_size: int = 20, cursor: str = ''):
+        query = session.query(Process) \
+            .filter(Process.deleted_at == None)
 
-            if name:
-                query = query.filter(Process.name.like(f"%{name}%"))
+        query = self.search_backend.filter(query, Process.name, name)
+        return paginate(query, Process, page, page_size, cursor)
 
-            processes: List[Process] = query.offset(offset).limit(limit).all()
+    def search(self, name: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Process]:
+        with self.db.new_session() as db:
+            processes: List[Process] = self._search_query(db.session, name, page, page_size, cursor).all()
         return processes
 
+    def iter_search(self, name: str = '', page: int = 1, page_size: int = 20, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Process]]:
+        """Rows of search in batches, read as they are consumed (streamed responses)"""
+        return self.db.stream(lambda session: self._search_query(session, name, page, page_size, cursor), batch_size)
+
     def update(self, process: Process) -> Process:
         with self.db.new_session() as db:
             process.updated_at = datetime.now()
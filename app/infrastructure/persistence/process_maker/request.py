@@ -1,16 +1,19 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.domain.model import ConnectionPool
-from app.domain.model import Request, RequestNote, RequestData, RequestStakeholder, RequestAction
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.model import Request, RequestNote, RequestData, RequestStakeholder, RequestAction, \
+    State, Route, Action
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class RequestRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, request: Request) -> Request:
         with self.db.new_session() as db:
@@ -19,17 +22,69 @@ class RequestRepository(object):
             db.session.add(request)
         return request
 
+    def create_many(self, requests: List[Request]) -> List[Request]:
+        """Insert requests with their data, notes and stakeholders in one transaction.
+
+        A request takes one insert to get its id, the children of all requests take one executemany
+        per table. The objects are not attached to the session.
+        """
+        now = datetime.now()
+        with self.db.new_session() as db:
+            for request in requests:
+                request.created_at = request.updated_at = now
+            db.session.bulk_save_objects(requests, return_defaults=True)
+            for children in ('request_data', 'request_note', 'request_stakeholder'):
+                rows = []
+                for request in requests:
+                    for child in getattr(request, children):
+                        child.request_id = request.id
+                        child.created_at = child.updated_at = now
+                        rows.append(child)
+                db.session.bulk_save_objects(rows)
+        return requests
+
+    @staticmethod
+    def _children_options() -> list:
+        return [
+            selectinload(Request.request_action).joinedload(RequestAction.action),
+            selectinload(Request.request_note),
+            selectinload(Request.request_stakeholder),
+            selectinload(Request.request_data),
+            joinedload(Request.current_state),
+        ]
+
+    @classmethod
+    def _detail_options(cls) -> list:
+        state_route = joinedload(Request.current_state).selectinload(State.route)
+        return cls._children_options() + [
+            # an action of a route can also be the action of a request_action, which is refreshed
+            # by populate_existing without its targets when loaded by that path last
+            selectinload(Request.request_action).joinedload(RequestAction.action).selectinload(Action.target),
+            state_route.selectinload(Route.action).selectinload(Action.target),
+            state_route.selectinload(Route.activity),
+            joinedload(Request.current_state).selectinload(State.activity),
+        ]
+
     def find_one(self, request_id: int) -> Optional[Request]:
         with self.db.new_session() as db:
-            request: Request = db.session.query(Request).filter_by(
-                id=request_id).first()
-            if request:
-                for act in request.request_action:
-                    act.action
-                request.request_note
-                request.request_stakeholder
-                request.request_data
-                request.current_state
+            request: Request = db.session.query(Request).filter_by(id=request_id) \
+                .options(*self._children_options()) \
+                .populate_existing() \
+                .first()
+        return request
+
+    def find_detail(self, request_id: int) -> Optional[Request]:
+        """Load request with its children, current state, the state routes with their actions,
+        action targets and activities, and the state activities. It costs a fixed number of
+        queries (one per relationship level), whatever the number of routes and actions.
+
+        Both loaders refresh a request which an earlier read left in the session.
+        """
+        with self.db.new_session() as db:
+            request: Request = db.session.query(Request).filter_by(id=request_id) \
+                .options(*self._detail_options()) \
+                .populate_existing() \
+                .first()
         return request
 
     def find_one_by_title(self, title: str) -> Optional[Request]:
@@ -37,19 +92,24 @@ class RequestRepository(object):
             request: Request = db.session.query(Request).filter(Request.title == title).first()
         return request
 
-    def search(self, title: str = '', page: int = 1, page_size: int = 20) -> List[Request]:
-        limit, offset = get_limit_offset(page, page_size)
-        with self.db.new_session() as db:
-            query = db.session.query(Request) \
-                .filter(Request.deleted_at == None) \
-                .order_by(Request.updated_at.desc())
+    def _search_query(self, session, title: str = '', page: int = 1, page_size: int = 20, cursor: str = ''):
+        query = session.query(Request) \
+            .filter(Request.deleted_at == None)
 
-            if title:
-                query = query.filter(Request.title.like(f"%{title}%"))
+        query = self.search_backend.filter(query, Request.title, title)
+        return paginate(query, Request, page, page_size, cursor)
 
-            requests: List[Request] = query.offset(offset).limit(limit).all()
+    def search(self, title: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Request]:
+        with self.db.new_session() as db:
+            requests: List[Request] = self._search_query(db.session, title, page, page_size, cursor).all()
         return requests
 
+    def iter_search(self, title: str = '', page: int = 1, page_size: int = 20, cursor: str = '',
+                    batch_size: int = 500) -> Iterator[List[Request]]:
+        """Rows of search in batches, read as they are consumed (streamed responses)"""
+        return self.db.stream(lambda session: self._search_query(session, title, page, page_size, cursor), batch_size)
+
     def update(self, request: Request) -> Request:
         with self.db.new_session() as db:
             request.updated_at = datetime.now()
@@ -3,12 +3,14 @@ from typing import List, Optional
 
 from app.domain.model import ConnectionPool
 from app.domain.model import State
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class StateRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, state: State) -> State:
         with self.db.new_session() as db:
@@ -39,19 +41,17 @@ class StateRepository(object):
                 .filter(State.deleted_at == None).first()
         return state
 
-    def search(self, name: str = '', process_id: int = 0, page: int = 1, page_size: int = 20) -> List[State]:
-        limit, offset = get_limit_offset(page, page_size)
+    def search(self, name: str = '', process_id: int = 0, page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[State]:
         with self.db.new_session() as db:
             query = db.session.query(State) \
-                .filter(State.deleted_at == None) \
-                .order_by(State.updated_at.desc())
+                .filter(State.deleted_at == None)
 
-            if name:
-                query = query.filter(State.name.like(f"%{name}%"))
+            query = self.search_backend.filter(query, State.name, name)
             if process_id:
                 query = query.filter(State.process_id == process_id)
 
-            states: List[State] = query.offset(offset).limit(limit).all()
+            states: List[State] = paginate(query, State, page, page_size, cursor).all()
         return states
 
     def update(self, state: State) -> State:
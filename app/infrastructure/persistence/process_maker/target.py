@@ -3,12 +3,14 @@ from typing import List, Optional
 
 from app.domain.model import ConnectionPool
 from app.domain.model import Target
-from app.domain.utils.db_helper import get_limit_offset
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class TargetRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, target: Target) -> Target:
         with self.db.new_session() as db:
@@ -29,17 +31,15 @@ class TargetRepository(object):
                 name=name).first()
         return target
 
-    def search(self, name: str = '', page: int = 1, page_size: int = 20) -> List[Target]:
-        limit, offset = get_limit_offset(page, page_size)
+    def search(self, name: str = '', page: int = 1, page_size: int = 20,
+               cursor: str = '') -> List[Target]:
         with self.db.new_session() as db:
             query = db.session.query(Target) \
-                .filter(Target.deleted_at == None) \
-                .order_by(Target.updated_at.desc())
+                .filter(Target.deleted_at == None)
 
-            if name:
-                query = query.filter(Target.name.like(f"%{name}%"))
+            query = self.search_backend.filter(query, Target.name, name)
 
-            targets: List[Target] = query.offset(offset).limit(limit).all()
+            targets: List[Target] = paginate(query, Target, page, page_size, cursor).all()
         return targets
 
     def update(self, target: Target) -> Target:
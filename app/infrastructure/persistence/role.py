@@ -3,11 +3,13 @@ from typing import List
 
 from app.domain.model import ConnectionPool
 from app.domain.model.role import Role, PermissionPolicy
+from app.infrastructure.persistence.search_backend import SearchBackend
 
 
 class RoleRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, role: Role) -> Role:
         with self.db.new_session() as db:
@@ -30,14 +32,15 @@ class RoleRepository(object):
 
     def search(self, name: str) -> List[Role]:
         with self.db.new_session() as db:
-            roles: List[Role] = db.session.query(Role).filter(
-                Role.name.like(f'%{name}%')).filter(Role.deleted_at == None).all()
+            query = db.session.query(Role).filter(Role.deleted_at == None)
+            roles: List[Role] = self.search_backend.filter(query, Role.name, name).all()
         return roles
 
     def search_with_permission(self, name: str, offset: int = 0, limit: int = 10) -> List[Role]:
         with self.db.new_session() as db:
-            roles: List[Role] = db.session.query(Role).filter(
-                Role.name.like(f'%{name}%')).filter(Role.deleted_at == None).order_by(Role.updated_at.desc()).offset(offset).limit(limit).all()
+            query = db.session.query(Role).filter(Role.deleted_at == None)
+            roles: List[Role] = self.search_backend.filter(query, Role.name, name)\
+                .order_by(Role.updated_at.desc()).offset(offset).limit(limit).all()
             # for r in roles:
             #     r.list_permissions = r.permissions.all()
         return roles
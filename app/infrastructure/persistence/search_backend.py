@@ -0,0 +1,85 @@
+"""Text search of the repositories, the matching strategy is chosen by config (SEARCH_BACKEND)"""
+import re
+
+from sqlalchemy import and_, column as sql_column, literal_column, select, table
+from sqlalchemy.orm import Query
+
+from app.domain.model import ConnectionPool
+from app.domain.model.trigram_index import MIN_TERM_LENGTH, fts_table
+from app.pkgs import errors
+
+_LIKE_ESCAPE = '\\'
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def escape_like(term: str) -> str:
+    """Escape the LIKE wildcards of a user term, so '%' and '_' only match themselves"""
+    return term.replace(_LIKE_ESCAPE, _LIKE_ESCAPE * 2).replace('%', _LIKE_ESCAPE + '%') \
+        .replace('_', _LIKE_ESCAPE + '_')
+
+
+class SearchBackend(object):
+    """Build the search filter of a text column.
+
+    Modes:
+        trigram: matches anywhere like contains, answered by the trigram index of the column (see
+            trigram_index): an FTS5 table on sqlite, a FULLTEXT ngram index on mysql (the rows it
+            finds are checked with LIKE), a pg_trgm index serving the LIKE on postgresql. A term
+            shorter than 3 characters and other databases fall back to contains.
+        contains: column LIKE '%term%', matches anywhere but always scans the whole table (no index).
+        prefix: column LIKE 'term%', answered by the index of the column (on sqlite only when the
+            index is case insensitive or PRAGMA case_sensitive_like is on).
+        fulltext: MySQL FULLTEXT index (MATCH ... AGAINST in boolean mode, every word as a prefix).
+            Other databases fall back to prefix.
+    """
+    TRIGRAM = 'trigram'
+    CONTAINS = 'contains'
+    PREFIX = 'prefix'
+    FULLTEXT = 'fulltext'
+    modes = (TRIGRAM, CONTAINS, PREFIX, FULLTEXT)
+
+    def __init__(self, connection_pool: ConnectionPool, mode: str = TRIGRAM):
+        if mode not in self.modes:
+            raise errors.Error(f'search backend must be one of {self.modes}, receive {mode}')
+        self.db = connection_pool
+        self.mode = mode
+
+    @property
+    def dialect(self) -> str:
+        # read on every call, the engine of the pool can be replaced (eg: by the test session)
+        return self.db.engine.dialect.name
+
+    def match(self, column, term: str):
+        """Filter clause of rows whose column matches term"""
+        if self.mode == self.FULLTEXT and self.dialect == 'mysql':
+            words = _WORD.findall(term)
+            if words:
+                return column.match(' '.join(f'+{w}*' for w in words))
+        if self.mode == self.TRIGRAM:
+            return self._match_trigram(column, term)
+        if self.mode == self.CONTAINS:
+            return self._contains(column, term)
+        return column.like(f'{escape_like(term)}%', escape=_LIKE_ESCAPE)
+
+    @staticmethod
+    def _contains(column, term: str):
+        return column.like(f'%{escape_like(term)}%', escape=_LIKE_ESCAPE)
+
+    def _match_trigram(self, column, term: str):
+        dialect = self.dialect
+        if len(term) < MIN_TERM_LENGTH or dialect not in ('sqlite', 'mysql'):
+            # postgresql answers the LIKE with the pg_trgm index
+            return self._contains(column, term)
+        phrase = '"' + term.replace('"', '""') + '"'  # the term as one phrase, matched anywhere
+        if dialect == 'mysql':
+            return and_(column.match(phrase), self._contains(column, term))
+        column = column.expression
+        fts = table(fts_table(column), sql_column('rowid'))
+        return column.table.c.id.in_(
+            select([fts.c.rowid]).where(literal_column(fts.name).op('MATCH')(phrase)))
+
+    def filter(self, query: Query, column, term: str) -> Query:
+        """Apply match to query, an empty term does not filter anything"""
+        if not term:
+            return query
+        return query.filter(self.match(column, term))
@@ -1,16 +1,21 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
+
+from sqlalchemy.orm import object_session
 
 from app.domain.utils import error_collection
 from app.domain.model import ConnectionPool
 from app.domain.model import PermissionPolicy
-from app.domain.model.user import User, Role
+from app.domain.model.user import User, Role, UserRole
+from app.domain.utils.db_helper import paginate
+from app.infrastructure.persistence.search_backend import SearchBackend
 from app.pkgs import errors
 
 
 class UserRepository(object):
-    def __init__(self, sql_connection: ConnectionPool):
+    def __init__(self, sql_connection: ConnectionPool, search_backend: SearchBackend):
         self.db = sql_connection
+        self.search_backend = search_backend
 
     def create(self, user: User) -> User:
         with self.db.new_session() as db:
@@ -25,6 +30,14 @@ class UserRepository(object):
                 id=user_id).filter(User.deleted_at == None).first()
         return user
 
+    def find_many(self, user_ids: List[int]) -> List[User]:
+        if not user_ids:
+            return []
+        with self.db.new_session() as db:
+            users: List[User] = db.session.query(User).filter(User.id.in_(user_ids)) \
+                .filter(User.deleted_at == None).all()
+        return users
+
     def find_user_for_auth(self, email: str):
         with self.db.new_session() as db:
             user: User = db.session.query(User).filter_by(
@@ -63,14 +76,41 @@ class UserRepository(object):
                 email=email).filter(User.deleted_at == None).count()
         return total
 
-    def search_with_roles(self, email: str, offset: int = 0, limit: int = 10) -> List[User]:
+    def _search_query(self, session, email: str, page: int = 1, page_size: int = 10, cursor: str = ''):
+        query = session.query(User).filter(User.deleted_at == None)
+        query = self.search_backend.filter(query, User.email, email)
+        return paginate(query, User, page, page_size, cursor)
+
+    def search_with_roles(self, email: str, page: int = 1, page_size: int = 10, cursor: str = '') -> List[User]:
         with self.db.new_session() as db:
-            users: List[User] = db.session.query(User).filter(
-                User.email.like(f'%{email}%')).filter(User.deleted_at == None).order_by(User.updated_at.desc()).offset(offset).limit(limit).all()
-            for u in users:
-                u.roles.all()
+            users: List[User] = self._search_query(db.session, email, page, page_size, cursor).all()
+            self._load_roles(db.session, users)
         return users
 
+    def iter_search_with_roles(self, email: str, page: int = 1, page_size: int = 10, cursor: str = '',
+                               batch_size: int = 500) -> Iterator[List[User]]:
+        """Rows of search_with_roles in batches, read as they are consumed (streamed responses)"""
+        # the roles of a batch are read with the session of the users
+        batches = self.db.stream(lambda session: self._search_query(session, email, page, page_size, cursor),
+                                 batch_size, server_side=False)
+        return (self._with_roles(users) for users in batches)
+
+    def _with_roles(self, users: List[User]) -> List[User]:
+        self._load_roles(object_session(users[0]), users)
+        return users
+
+    @staticmethod
+    def _load_roles(session, users: List[User]):
+        """Set loaded_roles of all users with one query, roles is dynamic and queries per user"""
+        roles_of_user = {u.id: [] for u in users}
+        if roles_of_user:
+            rows = session.query(UserRole.user_id, Role).join(Role, Role.id == UserRole.role_id)\
+                .filter(UserRole.user_id.in_(roles_of_user.keys())).order_by(Role.id).all()
+            for user_id, role in rows:
+                roles_of_user[user_id].append(role)
+        for u in users:
+            u.loaded_roles = roles_of_user[u.id]
+
     def update(self, user: User) -> User:
         with self.db.new_session() as db:
             user.updated_at = datetime.now()
@@ -1,7 +1,10 @@
+import queue
 import smtplib
 import ssl
+import threading
+import time
 from email.message import Message
-from typing import List
+from typing import Dict, List, Tuple
 
 
 def create_message(sender_email: str, receiver_email: str, subject: str, html_body):
@@ -15,21 +18,130 @@ def create_message(sender_email: str, receiver_email: str, subject: str, html_bo
 
 
 class Mail(object):
+    """Smtp transport keeping its logged in connections open between sends.
 
-    def __init__(self, sender_email: str, sender_password: str, port=456, smtp_server="smtp.gmail.com"):
+    Connections are reused by any thread, an idle one is checked with NOOP before reuse and replaced
+    when the server dropped it. A message interrupted by a dropped connection is sent again on a
+    new one.
+    """
+
+    def __init__(self, sender_email: str, sender_password: str, port=456, smtp_server="smtp.gmail.com",
+                 use_ssl: bool = True, use_tls: bool = False, pool_size: int = 2,
+                 keepalive: float = 30, timeout: float = 30):
+        """Init mail transport
+
+        Args:
+            use_ssl (bool, optional): connect with SMTP_SSL, else plain SMTP. Defaults to True.
+            use_tls (bool, optional): STARTTLS on a plain connection. Defaults to False.
+            pool_size (int, optional): idle connections kept open. Defaults to 2.
+            keepalive (float, optional): seconds a connection can idle before it is checked with NOOP.
+                Defaults to 30.
+            timeout (float, optional): socket timeout in seconds. Defaults to 30.
+        """
         self.sender_email = sender_email
         self.password = sender_password
         self.port = port  # For SSL
         self.smtp_server = smtp_server
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls
+        self.keepalive = keepalive
+        self.timeout = timeout
+        # idle connections with the time they were last used
+        self._idle: 'queue.LifoQueue[Tuple[smtplib.SMTP, float]]' = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connects = 0  # connections opened since start
+
+    def _connect(self) -> smtplib.SMTP:
+        # Create secure connection with server
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.port, timeout=self.timeout,
+                                      context=ssl.create_default_context())
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.port, timeout=self.timeout)
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+        try:
+            if self.password:
+                server.login(self.sender_email, self.password)
+        except BaseException:
+            self._close(server)
+            raise
+        with self._lock:
+            self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
 
-    def send(self, message: Message):
-        # Create secure connection with server and send email
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.keepalive or self._is_alive(server):
+                return server
+            self._close(server)
+
+    def _release(self, server: smtplib.SMTP):
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    def send(self, message: Message) -> Dict[str, tuple]:
+        """Send message, return its refused recipients like smtplib sendmail"""
+        return self.send_many([message])[0]
+
+    def send_many(self, messages: List[Message]) -> List[Dict[str, tuple]]:
+        """Send messages one after the other over one connection, return the refused recipients
+        of each message. Raise the error of the first message which cannot be sent."""
+        refused = []
+        server = self._acquire()
+        try:
+            for message in messages:
+                try:
+                    refused.append(self._sendmail(server, message))
+                except smtplib.SMTPServerDisconnected:
+                    # dropped by the server (idle timeout, restart) before it accepted the message
+                    server.close()
+                    server = self._connect()
+                    refused.append(self._sendmail(server, message))
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            # sendmail has reset the transaction, the connection is still usable
+            self._release(server)
+            raise
+        except BaseException:
+            server.close()
+            raise
+        self._release(server)
+        return refused
+
+    @staticmethod
+    def _sendmail(server: smtplib.SMTP, message: Message) -> Dict[str, tuple]:
         sender_email = message["From"]
         receiver_email = message["To"]
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(self.smtp_server, self.port, context=context) as server:
-            server.login(self.sender_email, self.password)
-            server.sendmail(sender_email, receiver_email, message.as_string())
+        return server.sendmail(sender_email, receiver_email, message.as_string())
+
+    def close(self):
+        """Close the idle connections"""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
 
     def create_message(self, receiver_email: str, subject: str, html_body):
         return create_message(self.sender_email, receiver_email, subject, html_body)
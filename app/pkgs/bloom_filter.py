@@ -0,0 +1,50 @@
+"""Module contain a Bloom filter of byte strings"""
+import hashlib
+import math
+
+
+class BloomFilter(object):
+    """Set membership with false positives but no false negatives, in a fixed bit array.
+
+    Items are byte strings. The k bit positions come from one sha256 of the item by double
+    hashing. Items cannot be removed, rebuild the filter instead.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        """Init bloom filter
+
+        Args:
+            capacity (int, optional): number of items the error rate is sized for. Defaults to 100000.
+            error_rate (float, optional): false positive rate at capacity. Defaults to 0.001.
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError('capacity must be positive and error_rate between 0 and 1')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: bytes):
+        digest = hashlib.sha256(item).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: bytes):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+    def __len__(self) -> int:
+        """Number of added items, an item added twice is counted twice"""
+        return self.count
@@ -1,101 +1,194 @@
+"""Module contain in-process cache engine and cache decorator"""
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
 
-import pytest
+_MISSING = object()
 
 
-class Cache:
-    def __init__(self, max_size=None, expire_time=None):
-        self.max_size = max_size
-        self.expire_time = expire_time  # seconds
-        self.cache_dict = {}
-        self.cache_order = {}
-
-    def __call__(self, func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            key = (args, tuple(kwargs.items()))
-
-            if key in self.cache_dict:
-                # Check if the cache has expired
-                if self.expire_time is not None:
-                    cached_time = self.cache_order[key]
-                    current_time = time.time()
-                    if current_time - cached_time > self.expire_time:
-                        # Remove the expired cache entry
-                        del self.cache_dict[key]
-                        del self.cache_order[key]
-                else:
-                    # Return cached result if available
-                    return self.cache_dict[key]
-
-            # Call the function and cache the result
-            result = func(*args, **kwargs)
-
-            if self.max_size is not None and len(self.cache_order) >= self.max_size:
-                # Remove the least recently used item if cache is full
-                oldest_key = min(self.cache_order, key=self.cache_order.get)
-                del self.cache_dict[oldest_key]
-                del self.cache_order[oldest_key]
-
-            self.cache_dict[key] = result
-            self.cache_order[key] = time.time()
-
-            return result
-
-        return wrapper
-
-
-cache = Cache(max_size=1000, expire_time=120)
-
-# Define a test function
-def expensive_function(n):
-    # Simulate an expensive computation
-    time.sleep(1)
-    return n
+class _InflightCall(object):
+    """A computation of one key, shared by every thread which misses that key meanwhile"""
 
+    def __init__(self):
+        self.event = threading.Event()
+        self.thread_id = threading.get_ident()
+        self.result = None
+        self.error: Optional[BaseException] = None
 
-# Create an instance of the Cache decorator with a max size of 5 and expire time of 2 seconds
-cache_decorator = Cache(max_size=5, expire_time=2)
 
+class LRUCache(object):
+    """Thread-safe LRU cache with per-entry expire time.
 
-# Define a test case for caching the expensive_function
-def test_cache_decorator():
-    # Apply the cache decorator to the expensive_function
-    cached_function = cache_decorator(expensive_function)
+    Entries are kept in an OrderedDict from the least to the most recently used one, so get, set
+    and eviction are all O(1).
+    """
 
-    # Call the cached function multiple times with the same argument
-    result1 = cached_function(5)
-    result2 = cached_function(5)
-    result3 = cached_function(5)
+    def __init__(self, max_size: int = None, expire_time: float = None):
+        """Init cache engine
 
-    # Ensure that the function is only called once
-    assert expensive_function.call_count == 1
-
-    # Ensure that the results are cached and equal
-    assert result1 == result2 == result3
-
-    # Call the function with a different argument
-    result4 = cached_function(10)
-
-    # Ensure that the function is called again for the new argument
-    assert expensive_function.call_count == 2
-
-    # Ensure that the results are different for the new argument
-    assert result4 != result1
-
-    # Wait for the cache to expire
-    time.sleep(3)
+        Args:
+            max_size (int, optional): max number of entries, None is unbounded. Defaults to None.
+            expire_time (float, optional): default seconds an entry lives, None is forever.
+                Defaults to None.
+        """
+        self.max_size = max_size
+        self.expire_time = expire_time  # seconds
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._inflight: Dict[Hashable, _InflightCall] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key: Hashable):
+        # must be called with self._lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expire_at, value = entry
+        if expire_at is not None and expire_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self._discard(key, value)
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, expire_time: float = None):
+        # must be called with self._lock held
+        if expire_time is None:
+            expire_time = self.expire_time
+        expire_at = time.monotonic() + expire_time if expire_time is not None else None
+        if key in self._entries:
+            self._discard(key, self._entries.pop(key)[1])
+        elif self.max_size is not None:
+            while self._entries and len(self._entries) >= self.max_size:
+                evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._discard(evicted_key, evicted_value)
+        if self.max_size is None or self.max_size > 0:
+            self._entries[key] = (expire_at, value)
+
+    def _discard(self, key: Hashable, value: Any):
+        """Called with self._lock held when an entry is removed, expired or evicted"""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expire_time: float = None):
+        """Store value, expire_time overrides the default expire time of the cache"""
+        with self._lock:
+            self._store(key, value, expire_time)
+
+    def get_or_set(self, key: Hashable, func: Callable, *args, expire_time: float = None, **kwargs) -> Any:
+        """Return cached value of key, otherwise compute it by func(*args, **kwargs).
+
+        Concurrent misses on one key compute it only once, the other callers wait for the result
+        (or the error) of the first one.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+
+        if not is_leader:
+            if call.thread_id == threading.get_ident():
+                # func asks for its own key again, waiting for itself would dead lock
+                return func(*args, **kwargs)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, call.result, expire_time)
+            return call.result
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.event.set()
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove key from cache, return True if it was cached"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._discard(key, entry[1])
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Cache(LRUCache):
+    """LRUCache which can be used as a function decorator.
+
+    One Cache instance can decorate several functions, entries are keyed by the function and
+    its arguments. The wrapper exposes invalidate(*args, **kwargs) for one call and the cache
+    itself as wrapper.cache.
+    """
+
+    @staticmethod
+    def make_key(func: Callable, args: tuple, kwargs: dict) -> tuple:
+        return func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items()))
 
-    # Call the function again with the same argument
-    result5 = cached_function(5)
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self.make_key(func, args, kwargs)
+            return self.get_or_set(key, func, *args, **kwargs)
 
-    # Ensure that the function is called again after cache expiration
-    assert expensive_function.call_count == 3
+        def invalidate(*args, **kwargs) -> bool:
+            return self.invalidate(self.make_key(func, args, kwargs))
 
-    # Ensure that the new result is different from the previous cached result
-    assert result5 != result1
+        wrapper.invalidate = invalidate
+        wrapper.cache = self
+        return wrapper
 
 
-# Run the tests using pytest
-# pytest.main([__file__])
+cache = Cache(max_size=1000, expire_time=120)
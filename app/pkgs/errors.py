@@ -1,3 +1,4 @@
+import copy
 from functools import wraps
 
 
@@ -33,6 +34,12 @@ class Error(Exception):
     def code(self):
         return self.error_code
 
+    def with_prefix(self, prefix: str) -> 'Error':
+        """Copy of the error, of the same class, with prefix added before its message"""
+        error = copy.copy(self)
+        error.message = f'{prefix}{self.message}'
+        return error
+
     def __str__(self):
         return self.message
 
@@ -0,0 +1,54 @@
+"""Module contain import cost profile of python statements, based on `python -X importtime`"""
+import subprocess
+import sys
+from typing import List, NamedTuple
+
+
+class ImportCost(NamedTuple):
+    module: str
+    self_us: int  # microseconds spent in the module itself
+    cumulative_us: int  # microseconds including the modules it imports
+    depth: int  # 0 for modules imported by the statement directly
+
+
+def parse_importtime(output: str) -> List[ImportCost]:
+    """Parse the stderr of `python -X importtime`, lines look like
+    `import time:       341 |       1052 |   app.pkgs.injector`"""
+    costs = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        costs.append(ImportCost(module, int(fields[0]), int(fields[1]), depth))
+    return costs
+
+
+def profile_imports(statement: str, timeout: float = 120) -> List[ImportCost]:
+    """Import cost of every module loaded by running statement in a fresh interpreter.
+
+    A fresh process is used because modules imported already by this process cost nothing.
+    Raise RuntimeError if the statement fails.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             universal_newlines=True, timeout=timeout)
+    if process.returncode != 0:
+        lines = [line for line in process.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f'profile of {statement!r} failed: ' + '\n'.join(lines[-10:]))
+    return parse_importtime(process.stderr)
+
+
+def top_imports(costs: List[ImportCost], limit: int = 20, by: str = 'cumulative') -> List[ImportCost]:
+    """Most expensive imports by 'cumulative' or 'self' time"""
+    key = (lambda c: c.self_us) if by == 'self' else (lambda c: c.cumulative_us)
+    return sorted(costs, key=key, reverse=True)[:limit]
+
+
+def total_us(costs: List[ImportCost]) -> int:
+    """Time of all imports, the sum of the top level cumulative times"""
+    return sum(c.cumulative_us for c in costs if c.depth == 0)
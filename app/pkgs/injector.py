@@ -1,7 +1,53 @@
 import inspect
+import threading
 import typing as t
+from functools import partial
 
 D = t.TypeVar('D')  # dependency
+_MISSING = object()
+
+
+class LazyObject(object):
+    """Stand-in for an instance which is created by factory on first use.
+
+    Attribute access, assignment and truth test go to the real instance. isinstance() sees the
+    class of the provider, so the container can inject the stand-in like the instance itself.
+    """
+
+    def __init__(self, factory: t.Callable[[], D], cls: type):
+        self.__dict__['_factory'] = factory
+        self.__dict__['_cls'] = cls
+        self.__dict__['_wrapped'] = _MISSING
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _setup(self):
+        if self._wrapped is _MISSING:
+            with self._lock:
+                if self._wrapped is _MISSING:
+                    self.__dict__['_wrapped'] = self._factory()
+        return self._wrapped
+
+    @property
+    def is_created(self) -> bool:
+        return self._wrapped is not _MISSING
+
+    @property
+    def __class__(self):
+        return self.__dict__['_cls']
+
+    def __getattr__(self, name: str):
+        return getattr(self._setup(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._setup(), name, value)
+
+    def __bool__(self) -> bool:
+        return bool(self._setup())
+
+    def __repr__(self) -> str:
+        if self.is_created:
+            return repr(self._wrapped)
+        return f'<LazyObject of {self._cls.__name__}, not created>'
 
 
 class Container(object):
@@ -9,6 +55,9 @@ class Container(object):
     def __init__(self):
         self.map_class = {}
         self.map_instance = {}
+        self.map_lazy = {}  # name of lazy provider -> factory of its instance
+        self.map_factory = {}  # name of factory provider -> class created on every injection
+        self._plans = {}  # class -> tuple of (parameter name, dependence name, annotation)
         self.last_error = None
 
     def get_class_name(self, dependency) -> str:
@@ -25,15 +74,32 @@ class Container(object):
             return True
         return False
 
+    def plan(self, dependency: type) -> tuple:
+        """Parameters of dependency with the names they are resolved by, inspected once per class"""
+        plan = self._plans.get(dependency)
+        if plan is None:
+            parameter: t.Mapping[str, inspect.Parameter] = inspect.signature(dependency).parameters
+            try:
+                # resolve annotations written as strings (forward references)
+                hints = t.get_type_hints(dependency.__init__)
+            except Exception:
+                hints = {}
+            annotations = {k: hints.get(k, p.annotation) for k, p in parameter.items()}
+            plan = tuple((k, self.get_class_name(annotation) or k, annotation)
+                         for k, annotation in annotations.items())
+            self._plans[dependency] = plan
+        return plan
+
     def inject(self, dependency: t.Type[D]) -> t.Optional[D]:
         if not inspect.isclass(dependency):
             return dependency
-        parameter: t.Mapping[str, inspect.Parameter] = inspect.signature(dependency).parameters
         prepared_input = dict()
-        for k, p in parameter.items():
-            dependence_name = self.get_class_name(p.annotation)
-            dependence_instance = self.map_instance.get(dependence_name or k, None)
-            if isinstance(dependence_instance, p.annotation):
+        for k, dependence_name, annotation in self.plan(dependency):
+            if dependence_name in self.map_factory:
+                dependence_instance = self.create(self.map_factory[dependence_name])
+            else:
+                dependence_instance = self.map_instance.get(dependence_name, None)
+            if inspect.isclass(annotation) and isinstance(dependence_instance, annotation):
                 prepared_input[k] = dependence_instance
         try:
             return dependency(**prepared_input)
@@ -41,13 +107,20 @@ class Container(object):
             self.last_error = ValueError(f"{dependency.__name__} error: {str(e)}")
             return None
 
+    def create(self, dependency: t.Type[D]) -> D:
+        """New instance of dependency with its dependencies injected, raise ValueError if it fails"""
+        instance = self.inject(dependency)
+        if instance is None:
+            raise self.last_error
+        return instance
+
     def auto_inject(self, dependency: t.Type[D]) -> t.Optional[D]:
         """try to create instance of dependency. If not successful, return None
         """
         if not inspect.isclass(dependency):
             raise ValueError(f'auto inject receive class only but receive {dependency}, type is {type(dependency)}')
         if dependency.__name__ in self.map_instance:
-            return self.map_instance
+            return self.map_instance[dependency.__name__]
         class_instance = self.inject(dependency)
         if not class_instance:
             return None
@@ -76,6 +149,20 @@ class Container(object):
             raise ValueError(f"add_singleton receive class only, but receive {dependency}")
         self.map_class[dependency.__name__] = dependency
 
+    def add_lazy(self, dependency: t.Type[D], factory: t.Callable[[], D] = None):
+        """Singleton created on first use instead of by build. Its dependents receive a LazyObject.
+
+        Without factory, the instance is created by injecting the dependencies of the class.
+        """
+        self.add_singleton(dependency)
+        self.map_lazy[dependency.__name__] = factory or partial(self.create, dependency)
+
+    def add_factory(self, dependency: t.Type[D]):
+        """Provider which creates a new instance for every dependent and every get()"""
+        if not inspect.isclass(dependency):
+            raise ValueError(f"add_factory receive class only, but receive {dependency}")
+        self.map_factory[dependency.__name__] = dependency
+
     def get_singleton(self, dependency: t.Type[D]) -> D:
         if inspect.isclass(dependency):
             name = dependency.__name__
@@ -83,22 +170,44 @@ class Container(object):
             name = type(dependency).__name__
         return self.map_instance.get(name, None)
 
-    def build(self, max_round=10) -> int:
-        i = 0
-        while i < max_round:
-            if len(self.map_class) == len(self.map_instance):
-                # all class is created
-                break
-            for k, dependency in self.map_class.items():
-                # dependency = '' if it's config
-                if dependency:
-                    self.auto_inject(dependency)
-            i += 1
-        if len(self.map_class) != len(self.map_instance):
-            if self.last_error:
-                raise self.last_error
-            else:
-                raise ValueError('cannot create all instance')
-        return i
+    def get(self, dependency: t.Type[D]) -> D:
+        """Instance of any provider: a new one for factory providers, the singleton otherwise"""
+        if dependency.__name__ in self.map_factory:
+            return self.create(self.map_factory[dependency.__name__])
+        return self.get_singleton(dependency)
+
+    def dependency_graph(self) -> t.Dict[str, t.Set[str]]:
+        """Name of each singleton not created yet -> names of the singletons it waits for"""
+        pending = {name: dependency for name, dependency in self.map_class.items()
+                   if dependency and name not in self.map_instance}
+        graph = {}
+        for name, dependency in pending.items():
+            graph[name] = {dependence_name for _, dependence_name, _ in self.plan(dependency)
+                           if dependence_name in pending and dependence_name != name}
+        return graph
 
+    def build(self, max_round=10) -> int:
+        """Create all singletons in dependency order, return the number of dependency levels built.
 
+        Every class is inspected once. Raise ValueError on a dependency cycle, on a class which
+        cannot be created, or if the graph is deeper than max_round levels.
+        """
+        for name, factory in self.map_lazy.items():
+            if name not in self.map_instance:
+                self.map_instance[name] = LazyObject(factory, self.map_class[name])
+        graph = self.dependency_graph()
+        level = 0
+        while graph:
+            if level >= max_round:
+                raise ValueError(f'cannot create all instance in {max_round} levels, left: {sorted(graph)}')
+            ready = [name for name, waiting in graph.items() if not waiting]
+            if not ready:
+                raise ValueError(f'dependency cycle between {sorted(graph)}')
+            for name in ready:
+                if self.auto_inject(self.map_class[name]) is None:
+                    raise self.last_error
+                del graph[name]
+            for waiting in graph.values():
+                waiting.difference_update(ready)
+            level += 1
+        return level
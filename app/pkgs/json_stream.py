@@ -0,0 +1,37 @@
+"""Module contain incremental json encoding of lists, for streamed responses"""
+import json
+from typing import Iterable, Iterator, List
+
+JSON = 'json'  # one json array
+NDJSON = 'ndjson'  # one json object per line
+STREAM_FORMATS = (JSON, NDJSON)
+MEDIA_TYPES = {JSON: 'application/json', NDJSON: 'application/x-ndjson'}
+
+
+def dumps(item) -> str:
+    # same encoding as starlette JSONResponse
+    return json.dumps(item, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':'))
+
+
+def iter_json_array(batches: Iterable[List]) -> Iterator[bytes]:
+    """Chunks of one json array of all items of batches, a chunk per batch"""
+    yield b'['
+    separator = ''
+    for batch in batches:
+        if batch:
+            yield (separator + ','.join(dumps(item) for item in batch)).encode('utf-8')
+            separator = ','
+    yield b']'
+
+
+def iter_ndjson(batches: Iterable[List]) -> Iterator[bytes]:
+    """Chunks of one json document per line, a chunk per batch"""
+    for batch in batches:
+        if batch:
+            yield ''.join(dumps(item) + '\n' for item in batch).encode('utf-8')
+
+
+def iter_encoded(batches: Iterable[List], stream_format: str = JSON) -> Iterator[bytes]:
+    if stream_format == NDJSON:
+        return iter_ndjson(batches)
+    return iter_json_array(batches)
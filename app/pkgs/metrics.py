@@ -0,0 +1,136 @@
+"""Module contain in-process http metrics, served in the prometheus text format"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)  # sql statements per request
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{escape_label(v)}"' for k, v in labels) + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram(object):
+    """Observations counted in buckets, with their sum. Not locked, its owner locks it."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # a bucket counts the values less than or equal to its bound
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels(tuple(labels) + (("le", format_value(bound)),))} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {format_value(self.sum)}')
+        lines.append(f'{name}_count{format_labels(labels)} {self.count}')
+        return lines
+
+
+def render_metric(name: str, metric_type: str, description: str, lines: Iterable[str]) -> List[str]:
+    return [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}'] + list(lines)
+
+
+def render_gauges(prefix: str, values: Dict[str, float], description: str = '') -> List[str]:
+    """One gauge per numeric value, e.g. of ConnectionPool.pool_status()"""
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = f'{prefix}_{key}'
+            lines.extend(render_metric(name, 'gauge', description or key, [f'{name} {format_value(value)}']))
+    return lines
+
+
+class RequestMetrics(object):
+    """Latency, response status and sql statements of http calls, per method and route"""
+
+    def __init__(self, slow_request_seconds: float = 1.0, latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+                 statement_buckets: Sequence[float] = STATEMENT_BUCKETS):
+        """Init request metrics
+
+        Args:
+            slow_request_seconds (float, optional): calls slower than it are counted (and logged by
+                the middleware) as slow, 0 to disable. Defaults to 1.0.
+        """
+        self.slow_request_seconds = slow_request_seconds
+        self.latency_buckets = latency_buckets
+        self.statement_buckets = statement_buckets
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._statements: Dict[Tuple[str, str], Histogram] = {}
+        self._db_seconds: Dict[Tuple[str, str], float] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+        self._slow: Dict[Tuple[str, str], int] = {}
+
+    def is_slow(self, seconds: float) -> bool:
+        return 0 < self.slow_request_seconds <= seconds
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, statements: int = 0,
+                db_seconds: float = 0.0):
+        key = (method, route)
+        with self._lock:
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(self.latency_buckets)
+                self._statements[key] = Histogram(self.statement_buckets)
+                self._db_seconds[key] = 0.0
+            latency.observe(seconds)
+            self._statements[key].observe(statements)
+            self._db_seconds[key] += db_seconds
+            self._responses[key + (status_code,)] = self._responses.get(key + (status_code,), 0) + 1
+            if self.is_slow(seconds):
+                self._slow[key] = self._slow.get(key, 0) + 1
+
+    def to_json(self) -> dict:
+        """Count, mean latency and statements per call of every route"""
+        with self._lock:
+            return {f'{method} {route}': {
+                'count': latency.count,
+                'latency_avg': latency.sum / latency.count,
+                'statements_avg': self._statements[(method, route)].sum / latency.count,
+                'db_seconds_avg': self._db_seconds[(method, route)] / latency.count,
+                'slow': self._slow.get((method, route), 0),
+            } for (method, route), latency in self._latency.items()}
+
+    def to_prometheus(self) -> List[str]:
+        with self._lock:
+            latency = [line for (method, route), histogram in sorted(self._latency.items())
+                       for line in histogram.samples('http_request_duration_seconds',
+                                                     (('method', method), ('route', route)))]
+            statements = [line for (method, route), histogram in sorted(self._statements.items())
+                          for line in histogram.samples('http_request_sql_statements',
+                                                        (('method', method), ('route', route)))]
+            db_seconds = [f'http_request_db_seconds_total{format_labels((("method", m), ("route", r)))} {format_value(v)}'
+                          for (m, r), v in sorted(self._db_seconds.items())]
+            responses = [f'http_requests_total{format_labels((("method", m), ("route", r), ("status", s)))} {v}'
+                         for (m, r, s), v in sorted(self._responses.items())]
+            slow = [f'http_slow_requests_total{format_labels((("method", m), ("route", r)))} {v}'
+                    for (m, r), v in sorted(self._slow.items())]
+        return (render_metric('http_requests_total', 'counter', 'HTTP calls by response status', responses)
+                + render_metric('http_request_duration_seconds', 'histogram', 'HTTP call latency', latency)
+                + render_metric('http_request_sql_statements', 'histogram', 'SQL statements per HTTP call', statements)
+                + render_metric('http_request_db_seconds_total', 'counter', 'Time of SQL statements of HTTP calls', db_seconds)
+                + render_metric('http_slow_requests_total', 'counter', 'HTTP calls slower than the slow request threshold', slow))
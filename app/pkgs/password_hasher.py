@@ -0,0 +1,111 @@
+"""Module contain PBKDF2 password hashing, run on a bounded worker pool"""
+import asyncio
+import binascii
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Tuple
+
+LEGACY_ITERATIONS = 100000  # cost of the hashes written before the encoded format
+
+
+class PasswordHasher(object):
+    """PBKDF2-SHA512 password hasher.
+
+    Hashes are stored as 'pbkdf2_sha512$<iterations>$<salt>$<hash>', so the cost can be raised
+    later: needs_rehash tells which stored hashes are outdated. The legacy format of User
+    (64 hex chars of salt followed by the hex hash) is still verified.
+
+    hash and verify run on a pool of `workers` threads (pbkdf2_hmac releases the GIL), which
+    bounds the cpu a burst of logins can take. Sync callers wait for the result, async callers
+    await hash_async and verify_async without holding the event loop or a database worker.
+    """
+    algorithm = 'pbkdf2_sha512'
+
+    def __init__(self, iterations: int = LEGACY_ITERATIONS, workers: int = 2):
+        """Init password hasher
+
+        Args:
+            iterations (int, optional): pbkdf2 rounds of new hashes. Defaults to 100000.
+            workers (int, optional): threads computing hashes, 0 computes them in the calling
+                thread. Defaults to 2.
+        """
+        self.iterations = iterations
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @staticmethod
+    def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+        password_hash = hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'), salt.encode('ascii'), iterations)
+        return binascii.hexlify(password_hash).decode('ascii')
+
+    @staticmethod
+    def _parse(encoded: str) -> Tuple[int, str, str]:
+        """iterations, salt and hash of a stored password"""
+        if encoded.startswith(PasswordHasher.algorithm + '$'):
+            _, iterations, salt, password_hash = encoded.split('$', 3)
+            return int(iterations), salt, password_hash
+        return LEGACY_ITERATIONS, encoded[:64], encoded[64:]
+
+    def make(self, password: str) -> str:
+        """Hash password in the calling thread"""
+        salt = hashlib.sha256(os.urandom(60)).hexdigest()
+        password_hash = self._pbkdf2(password, salt, self.iterations)
+        return f'{self.algorithm}${self.iterations}${salt}${password_hash}'
+
+    def check(self, password: str, encoded: str) -> bool:
+        """Verify password against a stored hash in the calling thread"""
+        if not encoded:
+            return False
+        try:
+            iterations, salt, password_hash = self._parse(encoded)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._pbkdf2(password, salt, iterations), password_hash)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """True if the stored hash is legacy or was made with another cost"""
+        if not encoded.startswith(self.algorithm + '$'):
+            return True
+        try:
+            return self._parse(encoded)[0] != self.iterations
+        except ValueError:
+            return True
+
+    def _submit(self, func: Callable, *args):
+        if not self.workers:
+            return func(*args)
+        return self.executor.submit(func, *args).result()
+
+    async def _submit_async(self, func: Callable, *args):
+        if not self.workers:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+    def hash(self, password: str) -> str:
+        return self._submit(self.make, password)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return self._submit(self.check, password, encoded)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._submit_async(self.make, password)
+
+    async def verify_async(self, password: str, encoded: str) -> bool:
+        return await self._submit_async(self.check, password, encoded)
+
+
+default_hasher = PasswordHasher(workers=0)
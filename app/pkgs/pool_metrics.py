@@ -0,0 +1,90 @@
+"""Module contain connection pool instrumentation"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics(object):
+    """Counters of one engine pool: checkouts, new connections, timeouts and checkout wait time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def listen(self, engine: Engine):
+        """Register pool events of engine, they are kept when the engine pool is recreated"""
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'connect', self._on_connect)
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.metrics = self
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def record_wait(self, seconds: float, timeout: bool = False):
+        with self._lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+            if timeout:
+                self.timeouts += 1
+
+    def to_json(self) -> dict:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'wait_time_total': self.wait_time_total,
+                'wait_time_max': self.wait_time_max,
+                'wait_time_avg': self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool which reports how long every checkout waited for a connection"""
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        return self._timed_checkout(super().connect)
+
+    def unique_connection(self):
+        # used by Engine.connect() and Engine.raw_connection()
+        return self._timed_checkout(super().unique_connection)
+
+    def _timed_checkout(self, checkout):
+        start = time.perf_counter()
+        try:
+            connection = checkout()
+        except exc.TimeoutError:
+            self._record_wait(start, timeout=True)
+            raise
+        self._record_wait(start)
+        return connection
+
+    def _record_wait(self, start: float, timeout: bool = False):
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start, timeout=timeout)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
@@ -0,0 +1,98 @@
+"""Module contain sql statement instrumentation"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_START_TIMES = 'query_metrics_start_times'
+
+
+class QueryStats(object):
+    """Statements executed by one unit of work (an http call), grouped by their sql"""
+    __slots__ = ('statements', 'seconds', 'queries', 'max_queries')
+
+    def __init__(self, max_queries: int = 50):
+        self.statements = 0
+        self.seconds = 0.0
+        self.queries: Dict[str, List] = {}  # sql -> [count, seconds]
+        self.max_queries = max_queries  # distinct sql kept, the others are only counted
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        query = self.queries.get(statement)
+        if query is None:
+            if len(self.queries) >= self.max_queries:
+                return
+            query = self.queries[statement] = [0, 0.0]
+        query[0] += 1
+        query[1] += seconds
+
+    def slowest(self, limit: int = 5) -> List[Tuple[str, int, float]]:
+        """(sql, count, seconds) of the statements which took the most time in total"""
+        queries = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [(statement, count, seconds) for statement, (count, seconds) in queries]
+
+
+class QueryMetrics(object):
+    """Count and time the statements of an engine, in total and for the block of track().
+
+    The stats of track() live in a context variable, so they follow a task into the worker threads
+    of ConnectionPool.run_sync.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = contextvars.ContextVar('query_stats', default=None)
+        self.statements = 0
+        self.seconds = 0.0
+        self.errors = 0
+
+    def listen(self, engine: Engine):
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        event.listen(engine, 'handle_error', self._on_error)
+
+    @contextmanager
+    def track(self, max_queries: int = 50) -> QueryStats:
+        stats = QueryStats(max_queries)
+        token = self._current.set(stats)
+        try:
+            yield stats
+        finally:
+            self._current.reset(token)
+
+    def current(self) -> Optional[QueryStats]:
+        return self._current.get()
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_TIMES, []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info[_START_TIMES].pop()
+        with self._lock:
+            self.statements += 1
+            self.seconds += seconds
+        stats = self._current.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+
+    def _on_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_TIMES):
+            conn.info[_START_TIMES].pop()
+        with self._lock:
+            self.errors += 1
+
+    def to_json(self) -> dict:
+        with self._lock:
+            return {
+                'statements': self.statements,
+                'statement_seconds': self.seconds,
+                'statement_errors': self.errors,
+            }
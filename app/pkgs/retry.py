@@ -0,0 +1,25 @@
+"""Module contain the retry policy of background jobs"""
+
+
+class RetryPolicy(object):
+    """Exponential backoff: the n-th retry waits backoff * 2 ** (n - 1) seconds, up to max_backoff"""
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 5.0, max_backoff: float = 3600.0):
+        """Init retry policy
+
+        Args:
+            max_attempts (int, optional): attempts before giving up, the first one included. Defaults to 5.
+            backoff (float, optional): seconds before the first retry. Defaults to 5.0.
+            max_backoff (float, optional): upper bound of the wait in seconds. Defaults to 3600.0.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, attempts: int) -> bool:
+        """attempts: number of attempts made so far"""
+        return attempts < self.max_attempts
+
+    def delay(self, attempts: int) -> float:
+        """Seconds to wait after the given number of failed attempts"""
+        return min(self.backoff * 2 ** max(attempts - 1, 0), self.max_backoff)
@@ -0,0 +1,52 @@
+"""Module contain the jinja rendering of html templates (emails), independent of any web framework"""
+import os
+from typing import Iterable, List, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+
+class TemplateRenderer(object):
+    """Render templates of a folder with one jinja environment.
+
+    A template is compiled once per process and kept by the environment. With cache_folder, the
+    compiled bytecode is also written to disk, so other workers and restarts skip the compilation.
+    """
+
+    def __init__(self, template_folder: str = TEMPLATE_FOLDER, cache_folder: Optional[str] = None,
+                 auto_reload: bool = False, cache_size: int = 400):
+        """Init template renderer
+
+        Args:
+            template_folder (str, optional): root of the template names. Defaults to app/templates.
+            cache_folder (Optional[str], optional): folder of the bytecode cache. Defaults to None (no disk cache).
+            auto_reload (bool, optional): check the source of a template for changes on every use. Defaults to False.
+            cache_size (int, optional): compiled templates kept in memory. Defaults to 400.
+        """
+        bytecode_cache = None
+        if cache_folder:
+            os.makedirs(cache_folder, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_folder)
+        self.env = Environment(loader=FileSystemLoader(template_folder),
+                               autoescape=select_autoescape(['html', 'htm', 'xml']),
+                               bytecode_cache=bytecode_cache, auto_reload=auto_reload, cache_size=cache_size)
+
+    def get_template(self, name: str) -> Template:
+        return self.env.get_template(name)
+
+    def precompile(self) -> int:
+        """Compile all templates of the folder ahead of the first render, return their number"""
+        names = self.env.list_templates()
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    # template names are positional only, any keyword is a context variable (e.g. name)
+    def render(self, template_name: str, /, **context) -> str:
+        return self.env.get_template(template_name).render(**context)
+
+    def render_many(self, template_name: str, contexts: Iterable[dict], /, **shared) -> List[str]:
+        """Render the template once per context, on top of the shared context"""
+        template = self.env.get_template(template_name)
+        return [template.render(shared, **context) for context in contexts]
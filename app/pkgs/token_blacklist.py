@@ -0,0 +1,106 @@
+"""Module contain in-process index of blacklisted auth tokens"""
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.pkgs.bloom_filter import BloomFilter
+
+
+class TokenBlacklist(object):
+    """Bloom filter plus exact set of blacklisted token digests.
+
+    A token missing from the Bloom filter is not blacklisted, without any lookup. The exact set
+    answers the positives, so the database is only asked about the rare false positives of the
+    filter.
+
+    The index is per process: the repository syncs the rows added by other workers every
+    `sync_interval` seconds, which bounds how long a logout done elsewhere stays unseen here.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, sync_interval: float = 5):
+        """Init token blacklist
+
+        Args:
+            capacity (int, optional): expected number of live blacklisted tokens, the filter
+                grows when it is exceeded. Defaults to 100000.
+            error_rate (float, optional): false positive rate of the filter. Defaults to 0.001.
+            sync_interval (float, optional): seconds between two syncs with the database.
+                Defaults to 5.
+        """
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._expires_at: Dict[bytes, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self.last_id = 0  # id of the last blacklist row loaded
+        self.synced_at: Optional[float] = None
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(str(token).encode('utf-8')).digest()
+
+    def needs_sync(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at >= self.sync_interval
+
+    def add(self, token: str, expires_at: Optional[float] = None):
+        """Add a token, expires_at is the 'exp' timestamp of the token or None if unknown"""
+        self.add_many([(token, expires_at)])
+
+    def add_many(self, tokens: Iterable[Tuple[str, Optional[float]]], last_id: int = None):
+        with self._lock:
+            for token, expires_at in tokens:
+                key = self.digest(token)
+                if key not in self._expires_at:
+                    if len(self._expires_at) >= self._bloom.capacity:
+                        self._rebuild(self._bloom.capacity * 2)
+                    self._bloom.add(key)
+                self._expires_at[key] = expires_at
+            if last_id is not None:
+                self.last_id = max(self.last_id, last_id)
+                self.synced_at = time.monotonic()
+
+    def lookup(self, token: str) -> Optional[bool]:
+        """True if token is blacklisted, False if it is not, None on a false positive of the
+        filter, then ask the database"""
+        key = self.digest(token)
+        with self._lock:
+            if key not in self._bloom:
+                return False
+            if key in self._expires_at:
+                return True
+        return None
+
+    def purge(self, now: float = None) -> int:
+        """Drop expired tokens and rebuild the filter, return number of dropped tokens"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [k for k, expires_at in self._expires_at.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._expires_at[key]
+            if expired:
+                self._rebuild(self._bloom.capacity)
+        return len(expired)
+
+    def _rebuild(self, capacity: int):
+        # must be called with self._lock held
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for key in self._expires_at:
+            self._bloom.add(key)
+
+    def clear(self):
+        with self._lock:
+            self._bloom.clear()
+            self._expires_at.clear()
+            self.last_id = 0
+            self.synced_at = None
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._expires_at),
+            'capacity': self._bloom.capacity,
+            'last_id': self.last_id,
+        }
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
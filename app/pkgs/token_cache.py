@@ -0,0 +1,112 @@
+"""Module contain in-process cache for verified auth token payloads"""
+import hashlib
+import time
+from typing import Any, Dict, Optional, Set
+
+from app.pkgs.cache_tools import LRUCache
+
+
+class TokenCache(LRUCache):
+    """Bounded, TTL-aware cache of verified token payloads, keyed by token digest.
+
+    The cache is per process: a change made in another worker is only seen here after the
+    entry expires, so ``ttl`` is the upper bound of that delay.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: int = 60):
+        """Init token cache
+
+        Args:
+            max_size (int, optional): max number of cached tokens. Defaults to 10000.
+            ttl (int, optional): max seconds a verified payload is trusted. Defaults to 60.
+        """
+        super().__init__(max_size=max_size, expire_time=ttl)
+        self.ttl = ttl
+        self._user_index: Dict[int, Set[str]] = {}
+        self._role_index: Dict[int, Set[str]] = {}
+        self._generation = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(str(token).encode('utf-8')).hexdigest()
+
+    def get(self, token: str, default: Any = None) -> Optional[dict]:
+        """Return the cached payload of token or None if it is missing or expired"""
+        if not self.max_size:
+            return default
+        return super().get(self.digest(token), default)
+
+    @property
+    def generation(self) -> int:
+        """Counter of invalidations, read it before verifying a token and pass it to set()"""
+        return self._generation
+
+    def set(self, token: str, payload: dict, generation: int = None):
+        """Cache a verified payload. The entry never outlives the token 'exp' claim.
+
+        If generation is given and any invalidation happened since it was read, the payload may
+        be verified against stale data, so it is not cached.
+        """
+        if not self.max_size:
+            return
+        expire_time = self.ttl
+        if 'exp' in payload:
+            expire_time = min(expire_time, float(payload['exp']) - time.time())
+        if expire_time <= 0:
+            return
+        key = self.digest(token)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._store(key, payload, expire_time)
+            self._user_index.setdefault(payload.get('sub'), set()).add(key)
+            for role_id in payload.get('role_ids', []):
+                self._role_index.setdefault(role_id, set()).add(key)
+
+    def invalidate(self, token: str) -> bool:
+        with self._lock:
+            self._generation += 1
+        return super().invalidate(self.digest(token))
+
+    def invalidate_user(self, user_id: int):
+        """Drop all cached tokens of a user, used when a new denial is written for the user"""
+        self._invalidate_index(self._user_index, user_id)
+
+    def invalidate_role(self, role_id: int):
+        """Drop all cached tokens which carry the role"""
+        self._invalidate_index(self._role_index, role_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._user_index.clear()
+            self._role_index.clear()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['ttl'] = self.ttl
+        return stats
+
+    def _invalidate_index(self, index: Dict[int, Set[str]], index_key: int):
+        with self._lock:
+            self._generation += 1
+            for key in list(index.get(index_key, ())):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._discard(key, entry[1])
+
+    def _discard(self, key: str, payload: dict):
+        # called with self._lock held
+        self._discard_index(self._user_index, payload.get('sub'), key)
+        for role_id in payload.get('role_ids', []):
+            self._discard_index(self._role_index, role_id, key)
+
+    @staticmethod
+    def _discard_index(index: Dict[int, Set[str]], index_key, key: str):
+        keys = index.get(index_key)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del index[index_key]
@@ -6,20 +6,12 @@ class TokenFactory(object):
     def __init__(self, secret_key: str, security_salt: str):
         self.secret_key = secret_key
         self.security_salt = security_salt
+        # stateless and thread-safe, shared by all calls
+        self.serializer = URLSafeTimedSerializer(self.secret_key, salt=self.security_salt)
 
     def generate_confirmation_token(self, email: str):
-        serializer = URLSafeTimedSerializer(self.secret_key)
-        return str(serializer.dumps(email, salt=self.security_salt))
+        return str(self.serializer.dumps(email))
 
     def confirm_token(self, token, expiration=3600):
-        serializer = URLSafeTimedSerializer(self.secret_key)
-        try:
-            email: str = serializer.loads(
-                token,
-                salt=self.security_salt,
-                max_age=expiration
-            )
-        except Exception as e:
-            raise e
+        email: str = self.serializer.loads(token, max_age=expiration)
         return email
-
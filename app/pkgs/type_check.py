@@ -1,62 +1,88 @@
+import inspect
+import os
+import types
 from functools import wraps
 from inspect import getfullargspec
-from typing import get_type_hints, Any
-
-
-def check_origin_type(result, requirement):
-    if str(requirement).startswith('typing.List'):
-        return isinstance(result, list)
-    if str(requirement).startswith('typing.Dict'):
-        return isinstance(result, dict)
-    return isinstance(result, requirement)
-
-
-def match_return(all_required, all_results):
-    if len(all_required) != len(all_results):
-        # raise error if number of requirements and return is not match
-        raise TypeError(
-            f'Number of return Argument and required is not match: require {len(all_required)} value, received {len(all_results)} value')
-    for requirements, result in zip(all_required, all_results):
-        if requirements is None:
-            if result is not None:
-                raise TypeError(
-                    'Return value %r is not of type %s' % (
-                        result, requirements)
-                )
-        elif requirements != Any and not check_origin_type(result, requirements):
-            raise TypeError(
-                'Return value %r is not of type %s' % (
-                    result, requirements)
-            )
-
-
-def validate_input(func, **kwargs):
-    hints = get_type_hints(func)
-    # get all type of result function
-    all_results = func(**kwargs)
-    all_results = (all_results,)
-
-    # iterate all type hints
-    for attr_name, attr_type in hints.items():
-        if attr_name == 'return':
-            # get all type of requirement
-            all_required = hints['return']
-            all_required = (all_required,)
-            match_return(all_required, all_results)
-        elif attr_type != Any and not check_origin_type(kwargs[attr_name], attr_type):
-            raise TypeError(
-                'Argument %r = %r is not of type %s' % (
-                    attr_name, kwargs[attr_name], attr_type)
-            )
-    if len(all_results) == 1:
-        return all_results[0]
-    else:
-        return all_results
+from typing import get_type_hints, get_origin, get_args, Any, Union, Optional, Tuple
+
+# Read on every call, so the switch also applies to functions decorated before the config is loaded
+# (see Config.TYPE_CHECK). Production mode disables the checks unless env TYPE_CHECK=1.
+_enabled = os.environ.get('TYPE_CHECK', '0' if os.environ.get('MODE', '').lower() == 'production' else '1') == '1'
+
+
+def set_enabled(enabled: bool):
+    """Enable or disable the checks of all decorated functions"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def instance_check(requirement) -> Optional[Union[type, Tuple[type, ...]]]:
+    """Class or tuple of classes for isinstance() of a type hint, None if any value matches.
+
+    Generics are checked by their origin only (List[int] -> list), unions by all their members.
+    """
+    if requirement is Any or requirement is None:
+        return None if requirement is Any else type(None)
+    origin = get_origin(requirement)
+    if origin is Union or origin is getattr(types, 'UnionType', None):
+        classes = []
+        for arg in get_args(requirement):
+            cls = instance_check(arg)
+            if cls is None:
+                return None
+            classes.extend(cls if isinstance(cls, tuple) else (cls,))
+        return tuple(classes)
+    if origin is not None:
+        requirement = origin
+    return requirement if inspect.isclass(requirement) else None
+
+
+class SignatureChecker(object):
+    """Type checks of one function, compiled from its hints once"""
+
+    def __init__(self, func):
+        spec = getfullargspec(func)
+        hints = get_type_hints(func)
+        positions = {name: i for i, name in enumerate(spec.args)}
+        defaults = spec.defaults or ()
+        self.defaults = dict(zip(spec.args[len(spec.args) - len(defaults):], defaults))
+        self.defaults.update(spec.kwonlydefaults or {})
+        # (name, position in *args or None, requirement, class for isinstance)
+        self.arguments = tuple((name, positions.get(name), hint, cls)
+                               for name, hint, cls in ((n, h, instance_check(h)) for n, h in hints.items())
+                               if name != 'return' and cls is not None)
+        self.return_hint = hints.get('return')
+        self.return_check = instance_check(self.return_hint) if 'return' in hints else None
+
+    def check_arguments(self, args: tuple, kwargs: dict):
+        for name, position, hint, cls in self.arguments:
+            if position is not None and position < len(args):
+                value = args[position]
+            elif name in kwargs:
+                value = kwargs[name]
+            elif name in self.defaults:
+                value = self.defaults[name]
+            else:
+                continue  # missing argument, the call has failed already
+            if not isinstance(value, cls):
+                raise TypeError('Argument %r = %r is not of type %s' % (name, value, hint))
+
+    def check_return(self, result):
+        if self.return_check is not None and not isinstance(result, self.return_check):
+            raise TypeError('Return value %r is not of type %s' % (result, self.return_hint))
 
 
 def type_check(decorator):
     """Function check all type of input argument and return value of 'def' as specified in typing module (from python 3.3).
-    It will raise Type Error if any wrong type. Cannot work correctly with List[object], Dict[object], Tuple, ...
+    It will raise Type Error if any wrong type. Generics are checked by their origin only:
+    List[int] accepts any list, Optional[int] accepts int or None.
+
+    The hints are resolved once, on the first call if they refer to names defined after the function.
+    When checks are disabled (see set_enabled) the function is called without any check.
 
     Arguments:
         decorator {[type]} -- [description]
@@ -64,16 +90,21 @@ def type_check(decorator):
     Returns:
         [type] -- [description]
     """
+    try:
+        checkers = [SignatureChecker(decorator)]
+    except NameError:
+        checkers = []  # forward reference, resolved on the first call
 
     @wraps(decorator)
     def wrapped_decorator(*args, **kwargs):
-        # translate *args into **kwargs
-        func_args = getfullargspec(decorator)[0]
-        default_kwargs = getfullargspec(decorator).defaults or []
-        kwargs.update(dict(zip(func_args, args)))
-        # update default value
-        func_defaults = [arg for arg in func_args if arg not in kwargs]
-        kwargs.update(dict(zip(func_defaults, default_kwargs)))
-        return validate_input(decorator, **kwargs)
+        if not _enabled:
+            return decorator(*args, **kwargs)
+        if not checkers:
+            checkers.append(SignatureChecker(decorator))
+        checker = checkers[0]
+        result = decorator(*args, **kwargs)
+        checker.check_arguments(args, kwargs)
+        checker.check_return(result)
+        return result
 
     return wrapped_decorator
@@ -0,0 +1,47 @@
+"""add activity outbox
+
+Revision ID: 3f6a9c1e8b24
+Revises: e4b9a2d7c5f1
+Create Date: 2023-07-24 14:05:37.681042
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6a9c1e8b24'
+down_revision = 'e4b9a2d7c5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_outbox',
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=True),
+    sa.Column('activity_id', sa.Integer(), nullable=True),
+    sa.Column('activity_type', sa.String(length=128), nullable=True),
+    sa.Column('payload', sa.String(length=4000), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['request_id'], ['request.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for column in ('created_at', 'updated_at', 'deleted_at', 'request_id', 'status', 'next_attempt_at',
+                   'claim_token'):
+        op.create_index(op.f(f'ix_activity_outbox_{column}'), 'activity_outbox', [column], unique=False)
+
+
+def downgrade():
+    for column in ('created_at', 'updated_at', 'deleted_at', 'request_id', 'status', 'next_attempt_at',
+                   'claim_token'):
+        op.drop_index(op.f(f'ix_activity_outbox_{column}'), table_name='activity_outbox')
+    op.drop_table('activity_outbox')
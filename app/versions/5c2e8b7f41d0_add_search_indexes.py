@@ -0,0 +1,50 @@
+"""add search indexes
+
+Revision ID: 5c2e8b7f41d0
+Revises: d64d9fa3a2ef
+Create Date: 2023-07-10 09:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8b7f41d0'
+down_revision = 'd64d9fa3a2ef'
+branch_labels = None
+depends_on = None
+
+# searched columns, btree indexes serve SEARCH_BACKEND = 'prefix'
+searched_columns = [
+    ('action', 'name'),
+    ('activity', 'name'),
+    ('group', 'name'),
+    ('process', 'name'),
+    ('request', 'title'),
+    ('state', 'name'),
+    ('target', 'name'),
+]
+# users.email and roles.name are unique, so they already have an index
+fulltext_columns = searched_columns + [('users', 'email'), ('roles', 'name')]
+
+
+def is_mysql() -> bool:
+    return op.get_bind().dialect.name == 'mysql'
+
+
+def upgrade():
+    for table, column in searched_columns:
+        op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+    if is_mysql():
+        # FULLTEXT indexes serve SEARCH_BACKEND = 'fulltext'
+        for table, column in fulltext_columns:
+            op.create_index(f'ft_{table}_{column}', table, [column], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if is_mysql():
+        for table, column in fulltext_columns:
+            op.drop_index(f'ft_{table}_{column}', table_name=table)
+    for table, column in searched_columns:
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
@@ -0,0 +1,47 @@
+"""updated_at not null
+
+Revision ID: 7b3e5d9a1c46
+Revises: 3f6a9c1e8b24
+Create Date: 2023-07-26 16:20:48.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e5d9a1c46'
+down_revision = '3f6a9c1e8b24'
+branch_labels = None
+depends_on = None
+
+# tables of the models with Serializable columns
+serializable_tables = [
+    'action', 'action_target', 'activity', 'activity_outbox', 'activity_target', 'group', 'process', 'request',
+    'request_action', 'request_data', 'request_note', 'request_stakeholder', 'roles', 'route', 'route_action',
+    'route_activity', 'state', 'state_activity', 'target', 'users',
+]
+# tables listed by db_helper.paginate, ordered by (updated_at desc, id desc)
+paginated_tables = ['action', 'activity', 'group', 'process', 'request', 'state', 'target', 'users']
+
+
+def upgrade():
+    for table_name in serializable_tables:
+        table = sa.table(table_name, sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime))
+        op.execute(table.update()
+                   .where(table.c.updated_at == None)
+                   .values(updated_at=sa.func.coalesce(table.c.created_at, sa.func.current_timestamp())))
+        # sqlite cannot alter a column, batch mode copies the table there
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False,
+                                  server_default=sa.text('CURRENT_TIMESTAMP'))
+    for table_name in paginated_tables:
+        op.create_index(f'ix_{table_name}_updated_at_id', table_name, ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    for table_name in paginated_tables:
+        op.drop_index(f'ix_{table_name}_updated_at_id', table_name=table_name)
+    for table_name in serializable_tables:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=True, server_default=None)
@@ -0,0 +1,42 @@
+"""add blacklist token expires_at
+
+Revision ID: 8d1f3a6c27b9
+Revises: 5c2e8b7f41d0
+Create Date: 2023-07-14 15:03:27.802614
+
+"""
+from datetime import datetime
+
+from alembic import op
+import jwt
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d1f3a6c27b9'
+down_revision = '5c2e8b7f41d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('blacklist_tokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_blacklist_tokens_expires_at'), 'blacklist_tokens', ['expires_at'], unique=False)
+
+    # backfill expires_at from the 'exp' claim of the stored tokens
+    blacklist_tokens = sa.table('blacklist_tokens', sa.column('id', sa.Integer), sa.column('token', sa.String),
+                                sa.column('expires_at', sa.DateTime))
+    bind = op.get_bind()
+    for row in bind.execute(sa.select([blacklist_tokens.c.id, blacklist_tokens.c.token])).fetchall():
+        try:
+            exp = jwt.decode(row.token, options={'verify_signature': False}).get('exp')
+        except jwt.InvalidTokenError:
+            continue
+        if exp is not None:
+            bind.execute(blacklist_tokens.update().where(blacklist_tokens.c.id == row.id)
+                         .values(expires_at=datetime.utcfromtimestamp(exp)))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_blacklist_tokens_expires_at'), table_name='blacklist_tokens')
+    op.drop_column('blacklist_tokens', 'expires_at')
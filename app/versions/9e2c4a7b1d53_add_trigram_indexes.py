@@ -0,0 +1,71 @@
+"""add trigram indexes
+
+Revision ID: 9e2c4a7b1d53
+Revises: 7b3e5d9a1c46
+Create Date: 2023-07-28 10:41:07.623914
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2c4a7b1d53'
+down_revision = '7b3e5d9a1c46'
+branch_labels = None
+depends_on = None
+
+# searched columns, trigram indexes serve SEARCH_BACKEND = 'trigram' (see app/domain/model/trigram_index.py)
+searched_columns = [
+    ('action', 'name'),
+    ('activity', 'name'),
+    ('group', 'name'),
+    ('process', 'name'),
+    ('request', 'title'),
+    ('roles', 'name'),
+    ('state', 'name'),
+    ('target', 'name'),
+    ('users', 'email'),
+]
+
+
+def sqlite_upgrade(table: str, column: str):
+    # FTS5 table with the trigram tokenizer, kept in sync with the column by triggers
+    fts = f'fts_{table}_{column}'
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id', "
+               f"tokenize='trigram')")
+    op.execute(f'CREATE TRIGGER {fts}_ai AFTER INSERT ON "{table}" BEGIN '
+               f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END')
+    op.execute(f'CREATE TRIGGER {fts}_ad AFTER DELETE ON "{table}" BEGIN '
+               f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END")
+    op.execute(f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON "{table}" BEGIN '
+               f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+               f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END')
+    # index the existing rows
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in searched_columns:
+        if dialect == 'sqlite':
+            sqlite_upgrade(table, column)
+        elif dialect == 'mysql':
+            op.execute(f'CREATE FULLTEXT INDEX ngram_{table}_{column} ON `{table}` ({column}) WITH PARSER ngram')
+        elif dialect == 'postgresql':
+            op.execute(f'CREATE INDEX trgm_{table}_{column} ON "{table}" USING gin ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column in searched_columns:
+        if dialect == 'sqlite':
+            fts = f'fts_{table}_{column}'
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
+        elif dialect == 'mysql':
+            op.drop_index(f'ngram_{table}_{column}', table_name=table)
+        elif dialect == 'postgresql':
+            op.drop_index(f'trgm_{table}_{column}', table_name=table)
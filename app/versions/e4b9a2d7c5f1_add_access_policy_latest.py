@@ -0,0 +1,47 @@
+"""add access policy latest
+
+Revision ID: e4b9a2d7c5f1
+Revises: 8d1f3a6c27b9
+Create Date: 2023-07-18 10:41:09.227316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9a2d7c5f1'
+down_revision = '8d1f3a6c27b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    access_policy_latest = op.create_table('access_policy_latest',
+    sa.Column('subject_type', sa.String(length=16), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('note', sa.String(length=250), nullable=True),
+    sa.Column('denied_before', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('subject_type', 'subject_id')
+    )
+
+    # backfill the latest denial of every user and role from the history
+    access_policy = sa.table('access_policy', sa.column('user_id', sa.Integer), sa.column('role_id', sa.Integer),
+                             sa.column('note', sa.String), sa.column('denied_before', sa.DateTime))
+    latest = {}
+    rows = op.get_bind().execute(sa.select([access_policy]).order_by(access_policy.c.denied_before)).fetchall()
+    for row in rows:
+        if row.user_id is not None:
+            latest[('user', row.user_id)] = row
+        if row.role_id is not None:
+            latest[('role', row.role_id)] = row
+    if latest:
+        op.bulk_insert(access_policy_latest, [
+            {'subject_type': subject_type, 'subject_id': subject_id, 'note': row.note,
+             'denied_before': row.denied_before}
+            for (subject_type, subject_id), row in latest.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('access_policy_latest')
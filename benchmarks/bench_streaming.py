@@ -0,0 +1,64 @@
+"""Peak memory and time to first chunk of listing all requests as one json body and streamed.
+
+    python -m benchmarks.bench_streaming [number of requests]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# the database must be chosen before app.config is imported
+_workdir = tempfile.mkdtemp(prefix='bench_stream_')
+os.environ.update({'MODE': 'production', 'sqlalchemy.url': f'sqlite:///{_workdir}/bench.db',
+                   'log-folder': _workdir})
+
+from app.cmd.center_store import connection_pool, container  # noqa: E402
+from app.domain.model import Base, Request  # noqa: E402
+from app.domain.service.process_maker.request_service import RequestService  # noqa: E402
+from app.pkgs.json_stream import dumps, iter_json_array  # noqa: E402
+
+
+def setup(count: int):
+    Base.metadata.create_all(connection_pool.engine)
+    with connection_pool.unit_of_work() as session:
+        session.bulk_save_objects([Request(title=f'bench request {i}', process_id=1, user_id=1, status='active')
+                                   for i in range(count)])
+
+
+def full_body(request_service: RequestService, count: int):
+    requests = request_service.search('', 1, count)
+    yield dumps([req.to_json() for req in requests]).encode('utf-8')
+
+
+def streamed_body(request_service: RequestService, count: int):
+    batches = request_service.iter_search('', 1, count, batch_size=500)
+    yield from iter_json_array([req.to_json() for req in batch] for batch in batches)
+
+
+def measure(body, request_service: RequestService, count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_chunk = None
+    size = 0
+    for chunk in body(request_service, count):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_chunk, total, peak, size
+
+
+def main(count: int = 20000):
+    setup(count)
+    request_service = container.get_singleton(RequestService)
+    print(f'{"body":<10} {"first chunk [ms]":>17} {"total [ms]":>11} {"peak memory [MB]":>17} {"size [MB]":>10}')
+    for name, body in (('full', full_body), ('streamed', streamed_body)):
+        first_chunk, total, peak, size = measure(body, request_service, count)
+        print(f'{name:<10} {first_chunk * 1000:>17.1f} {total * 1000:>11.1f} {peak / 2 ** 20:>17.1f} {size / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,73 @@
+"""Throughput of process-maker endpoints with one transaction per http call (unit of work) and with
+one commit per repository call. It uses a fresh sqlite file, so every commit pays a sync to disk.
+
+    python -m benchmarks.bench_unit_of_work [calls per endpoint]
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+# the database must be chosen before app.config is imported
+_workdir = tempfile.mkdtemp(prefix='bench_uow_')
+os.environ.update({'MODE': 'production', 'sqlalchemy.url': f'sqlite:///{_workdir}/bench.db',
+                   'log-folder': _workdir})
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.cmd.center_store import connection_pool, container, user_service  # noqa: E402
+from app.cmd.http import create_fastapi_app  # noqa: E402
+from app.domain.model import Base  # noqa: E402
+from app.domain.service.process_maker.process_service import ProcessService  # noqa: E402
+
+EMAIL, PASSWORD = 'bench@example.com', '1Pass@word'
+names = itertools.count()
+
+
+def setup():
+    Base.metadata.create_all(connection_pool.engine)
+    user = user_service.create_new_user(EMAIL, PASSWORD)
+    process_service = container.get_singleton(ProcessService)
+    process = process_service.create('bench process')
+    process_service.add_state_to_process(process.id, 'start point', state_type='start')
+    stakeholders = [user_service.create_new_user(f'stakeholder{i}@example.com', PASSWORD).id for i in range(3)]
+    return user_service.login(EMAIL, PASSWORD), process.id, [user.id] + stakeholders
+
+
+def endpoints(process_id: int, stakeholders: list):
+    # name, method, url, body factory
+    return [
+        ('POST /request', 'post', '/api/request', lambda: {
+            'process_id': process_id, 'title': f'bench request {next(names)}', 'content': {'n': 1},
+            'note': 'benchmark', 'stakeholders': stakeholders}),
+        ('POST /process/{id}/state', 'post', f'/api/process/{process_id}/state', lambda: {
+            'name': f'bench state {next(names)}', 'state_type': 'normal'}),
+        ('POST /action', 'post', '/api/action', lambda: {
+            'name': f'bench action {next(names)}', 'action_type': 'approve'}),
+    ]
+
+
+def calls_per_second(client: TestClient, method: str, url: str, body, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        response = getattr(client, method)(url, json=body())
+        assert response.status_code == 200, response.text
+    return calls / (time.perf_counter() - start)
+
+
+def main(calls: int = 200):
+    token, process_id, stakeholders = setup()
+    client = TestClient(create_fastapi_app(), headers={'Authorization': f'Bearer {token}'})
+    print(f'{"endpoint":<28} {"commit per call [1/s]":>22} {"unit of work [1/s]":>20}')
+    for name, method, url, body in endpoints(process_id, stakeholders):
+        results = []
+        for unit_of_work in (False, True):
+            connection_pool.http_unit_of_work = unit_of_work
+            calls_per_second(client, method, url, body, max(1, calls // 10))  # warm up
+            results.append(calls_per_second(client, method, url, body, calls))
+        print(f'{name:<28} {results[0]:>22.1f} {results[1]:>20.1f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,80 @@
+"""Per-call cost of the validators, before (re.match with string patterns, one pass per password
+rule) and after (precompiled patterns, single-pass password classification).
+
+    python -m benchmarks.bench_validation
+"""
+import re
+import timeit
+
+from app.domain.utils import validation
+from app.pkgs import errors
+
+special_symbol = validation.special_symbol
+EMAIL = 'john.doe-1990@mail.example.com'
+PASSWORD = 'aB3$efghijklmnop'
+NAME = 'process_maker.request-v2'
+
+
+def validate_email_before(email: str) -> str:
+    if len(email) > 128:
+        raise errors.Error('email should not be longer than 128 characters')
+    if re.match(
+            r"^((([!#$%&'*+\-/=?^_`{|}~\w])|([!#$%&'*+\-/=?^_`{|}~\w][!#$%&'*+\-/=?^_`{|}~\.\w]{0,}[!#$%&'*+\-/=?^_`{|}~\w]))[@]\w+([-.]\w+)*\.\w+([-.]\w+)*)$",
+            email) is None:
+        raise errors.Error('Email validation type failed')
+    return email
+
+
+def validate_name_without_space_before(name: str) -> str:
+    if len(name) > 128:
+        raise errors.Error('Name should not be longer than 128 characters')
+    if re.match("^[a-zA-Z0-9_.-]+$", name) is None:
+        raise errors.Error(f'It should contain a-z, A-Z, 0-9, _, -, . without any space, receive {name}')
+    return name
+
+
+def validate_password_before(passwd: str) -> str:
+    if len(passwd) < 6:
+        raise errors.Error('length should be at least 6')
+    if len(passwd) > 20:
+        raise errors.Error('length should be not be greater than 20')
+    if not any(char.isdigit() for char in passwd):
+        raise errors.Error('Password should have at least one numeral')
+    if not any(char.isupper() for char in passwd):
+        raise errors.Error('Password should have at least one uppercase letter')
+    if not any(char.islower() for char in passwd):
+        raise errors.Error('Password should have at least one lowercase letter')
+    if not any(char in special_symbol for char in passwd):
+        raise errors.Error(f'Password should have at least one of the symbols {special_symbol}')
+    return passwd
+
+
+def undecorated(func):
+    # compare the validator bodies, without the type_check wrapper
+    return getattr(func, '__wrapped__', func)
+
+
+CASES = [
+    ('validate_email', validate_email_before, undecorated(validation.validate_email), EMAIL),
+    ('validate_name_without_space', validate_name_without_space_before,
+     undecorated(validation.validate_name_without_space), NAME),
+    ('validate_password', validate_password_before, undecorated(validation.validate_password), PASSWORD),
+]
+
+
+def per_call_us(func, value, number: int) -> float:
+    return min(timeit.repeat(lambda: func(value), number=number, repeat=5)) / number * 1e6
+
+
+def main(number: int = 20000):
+    print(f'{"validator":<30} {"before [us]":>12} {"after [us]":>12}')
+    for name, before, after, value in CASES:
+        print(f'{name:<30} {per_call_us(before, value, number):>12.3f} {per_call_us(after, value, number):>12.3f}')
+    batch = [EMAIL] * 1000
+    batch_us = min(timeit.repeat(lambda: validation.validate_many(validation.validate_email, batch),
+                                 number=20, repeat=5)) / 20 / len(batch) * 1e6
+    print(f'{"validate_many(validate_email)":<30} {"":>12} {batch_us:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
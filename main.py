@@ -1,6 +1,14 @@
-from app.cmd.http import app
 from app.cmd import cli
 # pylint ./app -r y --errors-only > error.log
 
+
+def __getattr__(name: str):
+    # the http app is only created for servers (`uvicorn main:app`), not for cli commands
+    if name == 'app':
+        from app.cmd.http import app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 if __name__ == "__main__":
     cli(obj={})
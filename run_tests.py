@@ -2,25 +2,52 @@ import pytest
 
 from app.infrastructure.factory_bot.setup_test import setup_before_tests
 from tests.domain.model.test_action import TestActionModel
+from tests.domain.model.test_connection_pool import TestConnectionPool
 from tests.domain.model.test_activity import TestActivityModel
 from tests.domain.model.test_group import TestGroupModel
 from tests.domain.model.test_process import TestProcessModel
 from tests.domain.model.test_request_models import TestRequestModel, TestRequestNoteModel, \
     TestRequestActionModel, TestRequestStakeholderModel, TestRequestDataModel
 from tests.domain.model.test_route import TestRouteModel
+from tests.domain.model.test_serializer import TestSerializer
 from tests.domain.model.test_state import TestStateModel
 from tests.domain.model.test_target import TestTargetModel
+from tests.domain.model.test_workflow import TestWorkflowGraph
+from tests.domain.service.test_activity_outbox import TestActivityOutbox
 from tests.domain.service.test_process_maker import TestProcessMakerService
 from tests.domain.service.test_user import TestUserService
 from tests.domain.service.test_user_role import TestUserRoleService
+from tests.domain.utils.test_db_helper import TestDBHelper
+from tests.domain.utils.test_validation import TestValidation
+from tests.infrastructure.persistence.test_search_backend import TestSearchBackend
+from tests.infrastructure.smtp.test_mail import TestMail
+from tests.pkgs.test_cache_tools import TestCache, TestLRUCache
+from tests.pkgs.test_import_profile import TestImportProfile
 from tests.pkgs.test_injector import TestContainer
+from tests.pkgs.test_json_stream import TestJsonStream
+from tests.pkgs.test_metrics import TestMetrics
+from tests.pkgs.test_password_hasher import TestPasswordHasher
+from tests.pkgs.test_template_renderer import TestTemplateRenderer
+from tests.pkgs.test_token_blacklist import TestBloomFilter, TestTokenBlacklist
+from tests.pkgs.test_token_cache import TestTokenCache
+from tests.pkgs.test_type_check import TestTypeCheck
 
 test_cases = [
     setup_before_tests,
     TestContainer,
+    TestImportProfile,
+    TestCache, TestLRUCache,
+    TestTokenCache,
+    TestMetrics,
+    TestJsonStream,
+    TestTypeCheck,
+    TestPasswordHasher,
+    TestTemplateRenderer,
+    TestBloomFilter, TestTokenBlacklist,
     TestUserRoleService,
     TestUserService,
     TestProcessMakerService,
+    TestActivityOutbox,
     TestActivityModel,
     TestActionModel,
     TestProcessModel,
@@ -30,6 +57,13 @@ test_cases = [
     TestGroupModel,
     TestRequestModel, TestRequestNoteModel, TestRequestActionModel, TestRequestStakeholderModel,
     TestRequestDataModel,
+    TestConnectionPool,
+    TestWorkflowGraph,
+    TestDBHelper,
+    TestValidation,
+    TestSearchBackend,
+    TestMail,
+    TestSerializer,
 ]
 
 # test by orders. Do not change the order of import
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from app.domain.model import Group, User
+from app.domain.model.role import Role
+from app.domain.model.serializer import NotLoadedError, Serializer
+
+
+class TestSerializer:
+
+    @pytest.fixture
+    def group(self):
+        member = User(id=2, email='member@gmail.com', password='secret', is_confirmed=True,
+                      created_at=datetime(2023, 5, 1, 8, 30))
+        return Group(id=1, name='Test Group', description='Test Description',
+                     created_at=datetime(2023, 5, 1, 8, 0), member=[member])
+
+    def test_columns_only(self, group):
+        data = Serializer(Group).serialize(group)
+        assert data == {'id': 1, 'name': 'Test Group', 'description': 'Test Description',
+                        'created_at': '2023-05-01T08:00:00', 'updated_at': None, 'deleted_at': None}
+
+    def test_include_and_exclude_nested(self, group):
+        data = Serializer(Group, exclude=['member.password'], include=['member']).serialize(group)
+        assert data['member'] == [{'id': 2, 'email': 'member@gmail.com', 'is_confirmed': True,
+                                   'created_at': '2023-05-01T08:30:00', 'updated_at': None, 'deleted_at': None}]
+
+    def test_strict_relationship_is_not_lazy_loaded(self):
+        serializer = Serializer(Group, include=['member'], strict=True)
+        with pytest.raises(NotLoadedError):
+            serializer.serialize(Group(id=1, name='Test Group'))
+
+    def test_relationship_is_lazy_loaded_with_warning(self, caplog):
+        serializer = Serializer(Group, include=['member'])
+        with caplog.at_level('WARNING', logger='app.domain.model.serializer'):
+            data = serializer.serialize(Group(id=1, name='Test Group'))
+        assert data['member'] == []
+        assert 'Group.member is not loaded' in caplog.text
+
+    def test_relationship_from_source(self):
+        user = User(id=2, email='member@gmail.com')
+        user.loaded_roles = [Role(id=3, name='admin')]
+        serializer = Serializer(User, exclude=['password'], include=['roles'], sources={'roles': 'loaded_roles'})
+        data = serializer.serialize(user)
+        assert 'password' not in data
+        assert [r['name'] for r in data['roles']] == ['admin']
+        assert serializer.serialize_many([user, None])[1] is None
+
+    def test_unknown_relationship(self):
+        with pytest.raises(ValueError):
+            Serializer(Group, include=['owner'])
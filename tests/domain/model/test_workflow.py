@@ -0,0 +1,57 @@
+import dataclasses
+
+import pytest
+
+from app.domain.model.process_maker.state_type import StateType
+from app.domain.model.process_maker.workflow import ActionNode, ActivityNode, RouteNode, StateNode, \
+    WorkflowGraph
+
+
+class TestWorkflowGraph:
+
+    @pytest.fixture
+    def workflow(self):
+        note = ActivityNode(id=1, name='add note', activity_type='add_note')
+        states = [
+            StateNode(id=1, name='start', description='', state_type=StateType.start, activities=()),
+            StateNode(id=2, name='approve', description='', state_type=StateType.normal, activities=(note,)),
+            StateNode(id=3, name='done', description='', state_type=StateType.complete, activities=()),
+        ]
+        actions = [
+            ActionNode(id=10, name='raise', action_type='approve', group_ids=frozenset({100})),
+            ActionNode(id=11, name='edit', action_type='edit', group_ids=frozenset({100})),
+            ActionNode(id=12, name='approve', action_type='approve', group_ids=frozenset({200})),
+        ]
+        routes = [
+            RouteNode(id=1, current_state_id=1, next_state_id=2, action_ids=(10,), activities=(note,)),
+            RouteNode(id=2, current_state_id=1, next_state_id=None, action_ids=(11,), activities=()),
+            RouteNode(id=3, current_state_id=2, next_state_id=3, action_ids=(12,), activities=()),
+        ]
+        return WorkflowGraph(1, states, routes, actions)
+
+    def test_find_state(self, workflow):
+        assert workflow.find_state_by_type(StateType.start).id == 1
+        assert workflow.find_state(2).activities[0].name == 'add note'
+        assert workflow.find_state(4) is None
+
+    def test_find_route(self, workflow):
+        assert workflow.find_route(1, 10).next_state_id == 2
+        assert workflow.find_route(1, 11).next_state_id is None
+        # approve can not be committed from the start state
+        assert workflow.find_route(1, 12) is None
+
+    def test_find_actions(self, workflow):
+        assert [a.name for a in workflow.find_actions(1)] == ['raise', 'edit']
+        assert workflow.find_actions(3) == ()
+
+    def test_immutable(self, workflow):
+        with pytest.raises(TypeError):
+            workflow.states[5] = None
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            workflow.find_state(1).name = 'changed'
+
+    def test_to_json(self, workflow):
+        data = workflow.find_route(1, 10).to_json()
+        assert data['next_state_id'] == 2
+        assert data['activities'] == [{'id': 1, 'name': 'add note', 'activity_type': 'add_note'}]
+        assert workflow.actions[10].to_json()['group_ids'] == [100]
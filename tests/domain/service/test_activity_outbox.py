@@ -0,0 +1,159 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.domain.model import ActivityOutbox, Base, ConnectionPool, RequestNote, User
+from app.domain.model.process_maker.activity_outbox import OutboxStatus
+from app.domain.model.process_maker.activity_type import ActivityType
+from app.domain.model.process_maker.request import NoteType
+from app.domain.service.email import EmailService
+from app.domain.service.process_maker.activity_outbox_service import ActivityOutboxService
+from app.infrastructure.persistence.process_maker.activity_outbox import ActivityOutboxRepository
+from app.infrastructure.persistence.process_maker.request_note import RequestNoteRepository
+from app.infrastructure.persistence.search_backend import SearchBackend
+from app.infrastructure.persistence.user import UserRepository
+from app.infrastructure.smtp import Mail
+from app.pkgs.retry import RetryPolicy
+
+
+class TestActivityOutbox:
+
+    @pytest.fixture
+    def pool(self):
+        pool = ConnectionPool('sqlite:///:memory:')
+        Base.metadata.create_all(pool.engine)
+        yield pool
+        pool.shutdown()
+
+    @pytest.fixture
+    def outbox_repo(self, pool):
+        return ActivityOutboxRepository(pool)
+
+    @pytest.fixture
+    def user_repo(self, pool):
+        return UserRepository(pool, SearchBackend(pool))
+
+    @pytest.fixture
+    def mail(self):
+        return MagicMock(spec=Mail)
+
+    @pytest.fixture
+    def service(self, pool, outbox_repo, user_repo, mail):
+        return ActivityOutboxService(outbox_repo, RequestNoteRepository(pool), user_repo,
+                                     RetryPolicy(max_attempts=2, backoff=10), logging.getLogger('test'),
+                                     EmailService(mail, 'from@example.com', token=None))
+
+    @staticmethod
+    def entry(activity_type: str, **payload) -> ActivityOutbox:
+        return ActivityOutbox(request_id=1, activity_id=1, activity_type=activity_type, payload=json.dumps(payload))
+
+    @staticmethod
+    def find(pool, entry_id: int) -> ActivityOutbox:
+        with pool.new_session() as db:
+            return db.session.query(ActivityOutbox).get(entry_id)
+
+    def test_retry_policy(self):
+        policy = RetryPolicy(max_attempts=3, backoff=5, max_backoff=15)
+        assert [policy.delay(n) for n in (1, 2, 3)] == [5, 10, 15]
+        assert policy.should_retry(2) and not policy.should_retry(3)
+
+    def test_run_activities(self, pool, outbox_repo, user_repo, service, mail):
+        stakeholder = user_repo.create(User(email='stakeholder@example.com', password='x'))
+        note, email = outbox_repo.add_many([
+            self.entry(ActivityType.add_note, note='approve request', user_id=stakeholder.id),
+            self.entry(ActivityType.send_email, stakeholder_ids=[stakeholder.id], actor='leader',
+                       action='approve request'),
+        ])
+        assert service.run_once(batch_size=10) == 2
+        assert service.run_once(batch_size=10) == 0
+        assert self.find(pool, note.id).status == OutboxStatus.done
+        assert self.find(pool, email.id).status == OutboxStatus.done
+        with pool.new_session() as db:
+            notes = db.session.query(RequestNote).filter_by(request_id=1).all()
+        assert [(n.note, n.note_type) for n in notes] == [('approve request', NoteType.system_note)]
+        message, = mail.send_many.call_args[0][0]
+        assert message['To'] == 'stakeholder@example.com'
+        assert 'leader has committed the action "approve request"' in message.get_payload()
+
+    def test_database_error_fails_one_activity_only(self, pool, outbox_repo, service):
+        failing, ok = outbox_repo.add_many([self.entry(ActivityType.add_note, note='failing', user_id=1),
+                                            self.entry(ActivityType.add_note, note='ok', user_id=1)])
+        create = service.request_note_repo.create
+
+        def create_or_fail(note):
+            create(note)
+            if note.note == 'failing':
+                with pool.new_session() as db:
+                    db.session.execute('select * from missing_table')
+
+        service.request_note_repo.create = create_or_fail
+        assert service.run_once() == 2
+        assert self.find(pool, failing.id).status == OutboxStatus.pending
+        assert self.find(pool, ok.id).status == OutboxStatus.done
+        with pool.new_session() as db:
+            assert [n.note for n in db.session.query(RequestNote).all()] == ['ok']
+
+    def test_uncommitted_activity_is_retried(self, pool, outbox_repo, service):
+        failing, ok = outbox_repo.add_many([self.entry(ActivityType.add_note, note=note, user_id=1)
+                                            for note in ('failing', 'ok')])
+        mark_done = service.outbox_repo.mark_done
+
+        def mark_done_or_fail(entries):
+            if entries[0].id == failing.id:
+                raise RuntimeError('database is gone')
+            mark_done(entries)
+
+        service.outbox_repo.mark_done = mark_done_or_fail
+        assert service.run_once() == 2
+        retried = self.find(pool, failing.id)
+        assert retried.status == OutboxStatus.pending and retried.attempts == 1
+        assert 'database is gone' in retried.last_error
+        assert self.find(pool, ok.id).status == OutboxStatus.done
+        with pool.new_session() as db:
+            assert [n.note for n in db.session.query(RequestNote).all()] == ['ok']
+
+    def test_failed_activity_is_retried_then_failed(self, pool, outbox_repo, service):
+        entry, = outbox_repo.add_many([self.entry('unknown')])
+        assert service.run_once() == 1
+        retried = self.find(pool, entry.id)
+        assert retried.status == OutboxStatus.pending and retried.attempts == 1
+        assert 'unsupported activity' in retried.last_error
+        assert retried.next_attempt_at > datetime.now() + timedelta(seconds=5)
+        assert service.run_once() == 0  # waits for its backoff
+
+        with pool.new_session() as db:  # the backoff has passed
+            db.session.query(ActivityOutbox).update({ActivityOutbox.next_attempt_at: datetime.now()})
+        assert service.run_once() == 1
+        failed = self.find(pool, entry.id)
+        assert failed.status == OutboxStatus.failed and failed.attempts == 2
+        assert service.status() == {OutboxStatus.failed: 1}
+
+    def test_unsupported_activity_is_failed(self, pool, outbox_repo, service):
+        entry, = outbox_repo.add_many([self.entry(ActivityType.add_stakeholder, stakeholder_ids=[1])])
+        assert service.run_once() == 1
+        failed = self.find(pool, entry.id)
+        assert failed.status == OutboxStatus.failed and failed.attempts == 1
+        assert 'not supported' in failed.last_error
+
+    def test_email_without_mail_is_retried(self, pool, outbox_repo, user_repo, service):
+        service.email_service = None
+        stakeholder = user_repo.create(User(email='stakeholder@example.com', password='x'))
+        entry, = outbox_repo.add_many([self.entry(ActivityType.send_email, stakeholder_ids=[stakeholder.id],
+                                                  actor='leader', action='approve request')])
+        assert service.run_once() == 1
+        retried = self.find(pool, entry.id)
+        assert retried.status == OutboxStatus.pending and retried.attempts == 1
+        assert 'mail is not enabled' in retried.last_error
+
+    def test_claim(self, outbox_repo):
+        outbox_repo.add_many([self.entry(ActivityType.add_stakeholder, action='a') for _ in range(3)])
+        first = outbox_repo.claim(2, lease_seconds=60)
+        second = outbox_repo.claim(2, lease_seconds=60)
+        assert len(first) == 2 and len(second) == 1
+        assert {e.id for e in first}.isdisjoint(e.id for e in second)
+        assert outbox_repo.claim(10) == []
+        # the claim of a crashed worker expires
+        assert len(outbox_repo.claim(10, now=datetime.now() + timedelta(seconds=120))) == 3
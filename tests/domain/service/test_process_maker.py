@@ -5,6 +5,7 @@ import pytest
 from app.cmd.center_store import connection_pool
 from app.domain.model import Process
 from app.domain.model.process_maker.state_type import StateType
+from app.domain.utils import error_collection
 from app.infrastructure.factory_bot.process_maker import create_work_flow
 from app.infrastructure.http.fastapi_adapter.process_maker.process import process_service
 
@@ -80,5 +81,43 @@ class TestProcessMakerService:
         assert states[1]['route'][1]['next_state_id'] == route_approve_to_denied.next_state_id
         assert states[1]['route'][2]['next_state_id'] == route_approve_to_start.next_state_id
 
-
-
+    def test_workflow_graph_is_cached_and_rebuilt(self):
+        process = create_work_flow('workflow test 2')
+        start = process_service.add_state_to_process(process.id, 'start', 'start', StateType.start)
+        done = process_service.add_state_to_process(process.id, 'done', 'done', StateType.complete)
+
+        workflow = process_service.find_workflow(process.id)
+        assert process_service.find_workflow(process.id) is workflow
+        assert process_service.find_start_point(process.id).id == start.id
+        assert workflow.routes_by_state == {}
+
+        route = process_service.add_route_to_process(process.id, start.id, done.id)
+        rebuilt = process_service.find_workflow(process.id)
+        assert rebuilt is not workflow
+        assert rebuilt.routes_by_state[start.id][0].id == route.id
+        assert rebuilt.find_state(done.id).state_type == StateType.complete
+
+    def test_find_workflow_state_rebuilds_stale_graph(self):
+        process = create_work_flow('workflow test 3')
+        start = process_service.add_state_to_process(process.id, 'start', 'start', StateType.start)
+        stale = process_service.find_workflow(process.id)
+        done = process_service.add_state_to_process(process.id, 'done', 'done', StateType.complete)
+        # another worker added the state, this one still caches the graph without it
+        process_service.workflow_cache._cache.set(process.id, stale)
+
+        assert process_service.find_workflow_state(process.id, start.id).name == 'start'
+        assert process_service.find_workflow_state(process.id, done.id).name == 'done'
+        assert process_service.find_workflow(process.id) is not stale
+        with pytest.raises(error_collection.RecordNotFound):
+            process_service.find_workflow_state(process.id, done.id + 1000)
+
+    def test_workflow_graph_dropped_after_commit(self):
+        process = create_work_flow('workflow test 4')
+        start = process_service.add_state_to_process(process.id, 'start', 'start', StateType.start)
+        done = process_service.add_state_to_process(process.id, 'done', 'done', StateType.complete)
+        workflow = process_service.find_workflow(process.id)
+        with connection_pool.unit_of_work():
+            process_service.add_route_to_process(process.id, start.id, done.id)
+            # another call may rebuild it from the committed rows meanwhile, it must not be kept
+            assert process_service.find_workflow(process.id) is workflow
+        assert process_service.find_workflow(process.id).routes_by_state[start.id]
@@ -1,12 +1,17 @@
+import asyncio
+import binascii
 import datetime
+import hashlib
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy import event
 
 from app.domain.utils import error_collection
-from app.cmd.center_store import container
-from app.domain.model import AccessPolicy
+from app.cmd.center_store import connection_pool, container
+from app.domain.model import AccessPolicy, AccessPolicyLatest, Role
 from app.domain.service.user import UserService
+from app.infrastructure.persistence.access_policy import AccessPolicyRepository
 from app.domain.utils.generator import generate_email
 from app.pkgs import errors
 from app.pkgs.time_utils import time_to_int
@@ -87,6 +92,55 @@ class TestUserService:
         with pytest.raises(error_collection.RecordNotFound):
             user_service.update_password(10000, old_password, new_password, retype_password)
 
+    def test_login_rehash_legacy_password(self, user_service, user):
+        # hash stored by the former User.hash_password format
+        salt = hashlib.sha256(b'salt').hexdigest()
+        legacy_hash = hashlib.pbkdf2_hmac('sha512', b'1Pass@word', salt.encode('ascii'), 100000)
+        user.password = salt + binascii.hexlify(legacy_hash).decode('ascii')
+        user_service.user_repo.update(user)
+
+        assert user_service.login(user.email, '1Pass@word')
+        password = user_service.find_by_id(user.id).password
+        assert password.startswith(user_service.password_hasher.algorithm + '$')
+        assert not user_service.password_hasher.needs_rehash(password)
+        with pytest.raises(error_collection.PasswordVerifyingFailed):
+            user_service.login(user.email, 'Wrong_password_1@')
+
+    def test_login_async(self, user_service, user):
+        token = asyncio.run(user_service.login_async(user.email, '1Pass@word'))
+        assert token
+
+    def test_logout_blacklist_token(self, user_service, user):
+        token = user_service.login(user.email, '1Pass@word')
+        other_token = user_service.login(user.email, '1Pass@word') + 'x'
+        user_service.logout(token)
+        repo = user_service.blacklist_token_repo
+        with pytest.raises(error_collection.TokenBlacklisted):
+            user_service.validate_auth_token(token)
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        repo.sync_index()
+        event.listen(connection_pool.engine, 'before_cursor_execute', count_statement)
+        try:
+            assert repo.is_blacklist(token)
+            assert not repo.is_blacklist(other_token)
+        finally:
+            event.remove(connection_pool.engine, 'before_cursor_execute', count_statement)
+        # answered by the in-process index
+        assert statements == []
+
+    def test_purge_expired_tokens(self, user_service, user):
+        token = user_service.login(user.email, '1Pass@word')
+        user_service.logout(token)
+        repo = user_service.blacklist_token_repo
+        assert repo.purge_expired() == 0
+        assert repo.purge_expired(now=datetime.datetime.utcnow() + datetime.timedelta(days=4)) >= 1
+        assert not repo.is_blacklist(token)
+
     def test_update_is_confirmed(self, user_service):
         user_id = 1
         is_confirmed = True
@@ -97,6 +151,29 @@ class TestUserService:
         with pytest.raises(error_collection.RecordNotFound):
             user_service.update_is_confirmed(100, is_confirmed)
 
+    def test_find_latest_denial(self, user):
+        # a new repository, test_validate_access_policy mocks the one of the service
+        repo = AccessPolicyRepository(connection_pool)
+        role = Role(id=12345)
+        assert repo.find_for_token_validation(user.id, [role.id]) is None
+        repo.change_user(user, note='first change')
+        repo.change_role(role, note='change in role')
+        assert repo.find_for_token_validation(user.id, []).note == 'first change'
+        assert repo.find_for_token_validation(user.id, [role.id]).note == 'change in role'
+        repo.change_user(user, note='second change')
+        assert repo.find_for_token_validation(user.id, [role.id]).note == 'second change'
+        assert repo.find_for_token_validation(0, [role.id]).note == 'change in role'
+
+    def test_older_denial_does_not_move_latest_back(self, user):
+        repo = AccessPolicyRepository(connection_pool)
+        repo.change_user(user, note='newer change')
+        # a concurrent call which took its time before writing
+        older = AccessPolicy(user_id=user.id, note='older change',
+                             denied_before=datetime.datetime.utcnow() - datetime.timedelta(minutes=1))
+        with connection_pool.new_session() as db:
+            repo._deny(db.session, AccessPolicyLatest.USER, user.id, older)
+        assert repo.find_for_token_validation(user.id, []).note == 'newer change'
+
     def test_validate_access_policy(self, user_service):
         now = datetime.datetime.utcnow()
         user_service.access_policy_repo.find_for_token_validation = MagicMock(
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.domain.model import Base, ConnectionPool, Group
+from app.domain.utils import error_collection
+from app.domain.utils.db_helper import decode_cursor, encode_cursor, next_cursor, paginate
+
+
+class _Record(object):
+    def __init__(self, record_id: int, updated_at: datetime):
+        self.id = record_id
+        self.updated_at = updated_at
+
+
+class TestDBHelper:
+
+    def test_cursor_round_trip(self):
+        updated_at = datetime(2023, 5, 1, 10, 30, 15, 123456)
+        assert decode_cursor(encode_cursor(updated_at, 42)) == (updated_at, 42)
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', 'W10=', 'WyJub3QtYS1kYXRlIiwgMV0='])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(error_collection.InvalidCursor):
+            decode_cursor(cursor)
+
+    def test_next_cursor(self):
+        records = [_Record(i, datetime(2023, 5, 1)) for i in (3, 2)]
+        assert next_cursor(records, page_size=3) == ''
+        assert decode_cursor(next_cursor(records, page_size=2)) == (datetime(2023, 5, 1), 2)
+
+    @pytest.fixture
+    def pool(self) -> ConnectionPool:
+        pool = ConnectionPool('sqlite:///:memory:')
+        Base.metadata.create_all(pool.engine)
+        with pool.new_session() as db:
+            db.session.add_all([Group(id=i, name=f'group {i}', updated_at=datetime(2023, 5, 1 + i // 2))
+                                for i in range(1, 6)])
+        return pool
+
+    def test_paginate_by_cursor(self, pool):
+        seen, cursor = [], ''
+        while True:
+            with pool.new_session() as db:
+                page = paginate(db.session.query(Group), Group, page_size=2, cursor=cursor).all()
+            seen.extend(group.id for group in page)
+            cursor = next_cursor(page, page_size=2)
+            if not cursor:
+                break
+        assert seen == [5, 4, 3, 2, 1]
+
+    def test_updated_at_is_not_null(self, pool):
+        with pytest.raises(IntegrityError):
+            with pool.new_session() as db:
+                db.session.query(Group).filter(Group.id == 1).update({Group.updated_at: None},
+                                                                    synchronize_session=False)
+
+    def test_paginate_uses_keyset_index(self, pool):
+        cursor = encode_cursor(datetime(2023, 5, 2), 3)
+        with pool.new_session() as db:
+            query = paginate(db.session.query(Group), Group, page_size=2, cursor=cursor)
+            statement = query.statement.compile(dialect=pool.engine.dialect)
+            params = [str(statement.params[name]) for name in statement.positiontup]
+            plan = db.session.connection().connection.execute(f'EXPLAIN QUERY PLAN {statement}', params).fetchall()
+        details = ' '.join(row[-1] for row in plan)
+        assert 'USING INDEX ix_group_updated_at' in details  # a range of the index, not a scan
+        assert 'TEMP B-TREE' not in details  # no sort
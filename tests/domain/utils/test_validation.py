@@ -0,0 +1,37 @@
+import pytest
+
+from app.domain.utils import validation
+from app.pkgs import errors
+
+
+class TestValidation:
+
+    @pytest.mark.parametrize('password, message', [
+        ('aB3$', 'length should be at least 6'),
+        ('abcdEF$$', 'Password should have at least one numeral'),
+        ('abcd12$$', 'Password should have at least one uppercase letter'),
+        ('ABCD12$$', 'Password should have at least one lowercase letter'),
+        ('abCD1234', 'Password should have at least one of the symbols'),
+    ])
+    def test_validate_password_errors(self, password, message):
+        with pytest.raises(errors.Error) as e:
+            validation.validate_password(password)
+        assert e.value.message.startswith(message)
+
+    def test_validate_password(self):
+        assert validation.validate_password('aB3$efgh') == 'aB3$efgh'
+
+    def test_validate_patterns(self):
+        assert validation.validate_email('john.doe@mail.example.com') == 'john.doe@mail.example.com'
+        assert validation.validate_name('Request v2.0') == 'Request v2.0'
+        assert validation.validate_name_without_space('request_v2.0') == 'request_v2.0'
+        with pytest.raises(errors.Error):
+            validation.validate_email('john.doe@')
+        with pytest.raises(errors.Error):
+            validation.validate_name_without_space('request v2')
+
+    def test_validate_many(self):
+        assert validation.validate_many(validation.validate_short_paragraph, [' a ', 'b']) == ['a', 'b']
+        with pytest.raises(errors.Error) as e:
+            validation.validate_many(validation.validate_name, ['good name', 'bad name!'])
+        assert e.value.message.startswith('item 1: ')
@@ -76,6 +76,23 @@ class TestGroupAPI:
         assert len(data["data"]) == 2
         assert data["page"] == 1
         assert data["page_size"] == 10
+        assert data["next_cursor"] == ''
+
+        # walk the same search one group per page with the cursor
+        response = client.get("/api/group", params={"name": "Test Group", "page_size": 1})
+        first_page = response.json()
+        assert len(first_page["data"]) == 1
+        assert first_page["next_cursor"]
+        response = client.get("/api/group", params={"name": "Test Group", "page_size": 1,
+                                                    "cursor": first_page["next_cursor"]})
+        assert response.status_code == 200
+        second_page = response.json()
+        assert len(second_page["data"]) == 1
+        assert second_page["data"][0]["id"] != first_page["data"][0]["id"]
+        assert {g["name"] for g in first_page["data"] + second_page["data"]} == {"Test Group", "Test Group 2"}
+
+        response = client.get("/api/group", params={"name": "Test Group", "cursor": "not-a-cursor"})
+        assert response.status_code == 400
 
     @pytest.mark.run(order=4)
     def test_update_group(self):
@@ -182,6 +199,10 @@ class TestGroupAPI:
         updated_group = group_service.find_one(staff_group.id)
         assert len(updated_group.member) == 3
 
+        # all groups of a user are found in one query
+        assert group_service.find_group_ids_of_user(staff_1.id) == {staff_group.id}
+        assert group_service.find_group_ids_of_user(leader_1.id) == {leader_group.id}
+
     @pytest.mark.run(order=7)
     def test_remove_user_from_group(self):
         removal_member = create_or_get_normal_user('removal_member@test_mail.com')
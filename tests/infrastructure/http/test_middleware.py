@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+from app.cmd.center_store import fastapi_middleware as middleware
+
+
+class Model(object):
+    def __init__(self, id: int):
+        self.id = id
+        self.thread = None
+
+    def to_json(self) -> dict:
+        # stands for a to_json loading relationships
+        self.thread = threading.current_thread()
+        return {'id': self.id}
+
+
+class TestRunSyncJson:
+
+    def test_to_json_runs_in_worker(self):
+        models = [Model(1), Model(2)]
+        data = asyncio.run(middleware.run_sync_json(lambda: models))
+        assert data == [{'id': 1}, {'id': 2}]
+        assert all(m.thread not in (None, threading.current_thread()) for m in models)
+
+    def test_page_size_is_passed_to_search(self):
+        def search(name: str, page_size: int = 10):
+            return [Model(i) for i in range(page_size - 1)]
+
+        data, next_page = asyncio.run(middleware.run_sync_page(3, search, 'name', page_size=3))
+        assert data == [{'id': 0}, {'id': 1}]
+        assert next_page == ''  # a short page is the last one
@@ -1,6 +1,13 @@
+import json
+import time
+
 import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
 
-from app.cmd.center_store import connection_pool
+from app.cmd.center_store import connection_pool, user_role_service, user_service
+from app.cmd.http import app
+from app.config import cli_config
 from app.domain.model.process_maker.state_type import StateType
 from app.domain.utils import error_collection
 from app.infrastructure.factory_bot.user import create_or_get_normal_user
@@ -112,6 +119,25 @@ class TestRequestAPI:
         actions_name.sort()
         assert actions_name == ['edit request', 'raise request']
 
+    @pytest.mark.run(order=403)
+    def test_find_request_allow_action_query_count(self, test_new_request):
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(connection_pool.engine, 'before_cursor_execute', count_statement)
+        try:
+            actions = request_service.find_request_allowed_action(test_new_request.id, 0)
+            targets = [target.group_id for action in actions for target in action.target]
+        finally:
+            event.remove(connection_pool.engine, 'before_cursor_execute', count_statement)
+        assert len(actions) == 2
+        assert targets
+        # request (+ current state), 4 children, routes, route actions, action targets,
+        # route activities, state activities. It does not grow with the number of actions
+        assert len(statements) <= 10
+
     @pytest.mark.run(order=404)
     def test_find_request_allow_action_for_specific_user(self, test_new_request, staff_1, leader_1):
         # Make a GET request to the endpoint
@@ -130,6 +156,26 @@ class TestRequestAPI:
         data = response.json()
         assert len(data['data']) == 0
 
+    @pytest.mark.run(order=404)
+    def test_revoked_target_is_seen_with_stale_workflow(self, test_new_request, staff_1):
+        edit_act = action_service.find_one_by_name('edit request')
+        stale = process_service.find_workflow(test_new_request.process_id)
+        targets = list(edit_act.target)
+        assert targets
+        for target in targets:
+            action_service.remove_target_from_action(edit_act.id, target.id)
+        # another worker revoked the action, this one still caches the graph with its targets
+        process_service.workflow_cache._cache.set(test_new_request.process_id, stale)
+        try:
+            actions = request_service.find_request_allowed_action_for_specific_user(test_new_request.id, 0,
+                                                                                    staff_1.id)
+            assert [action.name for action in actions] == ['raise request']
+            with pytest.raises(error_collection.DontHaveRight):
+                request_service.user_commit_action(test_new_request.id, staff_1.id, edit_act.id)
+        finally:
+            for target in targets:
+                action_service.add_target_to_action(edit_act.id, target.id)
+
     @pytest.mark.run(order=405)
     def test_staff_commit_approve_action_failed(self, staff_1, test_new_request):
         # find the action
@@ -282,3 +328,102 @@ class TestRequestAPI:
         assert data['request_action'][0]['action']['name'] == 'raise request'
         assert data['request_action'][1]['status'] == 'done'
         assert data['request_action'][1]['action']['name'] == 'reject request'
+
+    @pytest.mark.run(order=413)
+    def test_create_requests_bulk(self, staff_1, staff_2, completed_process):
+        client.token = staff_1.token
+        items = [{
+            "process_id": completed_process.id,
+            "title": f"bulk imported request {i}",
+            "content": {"id": i},
+            "note": "imported from upstream",
+            "stakeholders": [staff_1.id, staff_2.id],
+        } for i in range(3)]
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT'):
+                statements.append(statement)
+
+        event.listen(connection_pool.engine, 'before_cursor_execute', count_statement)
+        try:
+            response = client.post("/api/request/bulk", json={"requests": items})
+        finally:
+            event.remove(connection_pool.engine, 'before_cursor_execute', count_statement)
+        if response.status_code != 200:
+            raise ValueError(str(response.json()))
+        data = response.json()['data']
+        assert [req['title'] for req in data] == [item['title'] for item in items]
+        # one insert per request for its id, one executemany per child table
+        assert len(statements) == len(items) + 3
+
+        response = client.get(f"/api/request/{data[2]['id']}")
+        assert response.status_code == 200
+        detail = response.json()
+        assert detail['current_state']['state_type'] == StateType.start
+        assert detail['request_data'][0]['value'] == '{"id": 2}'
+        assert detail['request_note'][0]['note'] == 'imported from upstream'
+        assert len(detail['request_stakeholder']) == 2
+
+    @pytest.mark.run(order=414)
+    def test_create_requests_bulk_validates_all_first(self, staff_1, completed_process):
+        items = [{"process_id": completed_process.id, "title": "bulk valid request", "content": {},
+                  "note": "ok", "stakeholders": []},
+                 {"process_id": completed_process.id, "title": "bulk invalid request", "content": {},
+                  "note": "ok", "stakeholders": [0]}]
+        with pytest.raises(error_collection.ValidationError) as e:
+            request_service.create_requests_bulk(staff_1.id, items)
+        assert e.value.message == 'item 1: missing stakeholder id'
+        assert isinstance(e.value.__cause__, error_collection.ValidationError)
+        assert request_service.search('bulk valid request') == []
+
+    @pytest.fixture
+    def admin_token(self):
+        admin = create_or_get_normal_user("metrics_admin@test_mail.com")
+        role = user_role_service.role_repo.find_by_name('metricsadmin') \
+            or user_role_service.create_new_role('metricsadmin', 'reads the metrics')
+        user_role_service.append_permission_to_role(role.id, 'admin')
+        user_role_service.append_role_to_user(admin.id, role.id)
+        time.sleep(1.1)  # tokens issued in the second of a role change are rejected
+        return user_service.login("metrics_admin@test_mail.com", '1Pass@word')
+
+    @pytest.mark.run(order=415)
+    def test_metrics(self, test_new_request, admin_token):
+        response = client.get(f"/api/request/{test_new_request.id}")
+        assert response.status_code == 200
+        response = TestClient(app).get("/metrics", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain')
+        lines = response.text.splitlines()
+        route = 'method="GET",route="/api/request/{request_id}"'
+        assert any(line.startswith(f'http_request_duration_seconds_count{{{route}}}') for line in lines)
+        assert any(line.startswith(f'http_requests_total{{{route},status="200"}}') for line in lines)
+        statements = next(line for line in lines if line.startswith(f'http_request_sql_statements_sum{{{route}}}'))
+        assert float(statements.split()[-1]) > 0
+        assert '# TYPE db_pool_statements gauge' in lines
+
+    @pytest.mark.run(order=415)
+    def test_metrics_gate(self, staff_1, monkeypatch):
+        assert TestClient(app).get("/metrics").status_code == 401  # no token
+        assert client.get("/metrics").status_code == 403  # not an admin
+        monkeypatch.setattr(cli_config, 'METRICS_PUBLIC', True)
+        response = TestClient(app).get("/metrics")
+        assert response.status_code == 200
+        assert '# TYPE db_pool_statements gauge' in response.text.splitlines()
+
+    @pytest.mark.run(order=416)
+    def test_search_requests_streamed(self, test_new_request):
+        listed = client.get("/api/request", params={"page_size": 1000}).json()['data']
+        assert listed
+
+        response = client.get("/api/request", params={"page_size": 1000, "stream": "json"})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/json'
+        assert response.json() == listed
+
+        response = client.get("/api/request", params={"page_size": 1000, "stream": "ndjson"})
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        assert [json.loads(line) for line in response.text.splitlines()] == listed
+
+        response = client.get("/api/request", params={"stream": "xml"})
+        assert response.status_code == 400
@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+
+from app.domain.model import Base, ConnectionPool, Group
+from app.infrastructure.persistence.search_backend import SearchBackend
+from app.pkgs import errors
+
+
+class TestSearchBackend:
+
+    @pytest.fixture
+    def pool(self):
+        pool = ConnectionPool('sqlite:///:memory:')
+        Base.metadata.create_all(pool.engine)
+        pool.engine.execute(Group.__table__.insert(), [
+            {'name': 'Test Group'}, {'name': 'Group 100%'}, {'name': 'Group 1000'}, {'name': 'group_a'},
+        ])
+        return pool
+
+    @staticmethod
+    def search(backend: SearchBackend, term: str) -> set:
+        query = select([Group.name]).where(backend.match(Group.name, term))
+        return {row.name for row in backend.db.engine.execute(query)}
+
+    def test_trigram(self, pool):
+        backend = SearchBackend(pool, SearchBackend.TRIGRAM)
+        assert self.search(backend, 'roup') == {'Test Group', 'Group 100%', 'Group 1000', 'group_a'}
+        assert self.search(backend, '0%') == {'Group 100%'}  # shorter than a trigram, falls back to contains
+        assert self.search(backend, 'p 100%') == {'Group 100%'}
+        assert self.search(backend, 'oup_') == {'group_a'}
+        assert self.search(backend, '"x"') == set()
+
+    def test_trigram_index_follows_the_rows(self, pool):
+        backend = SearchBackend(pool, SearchBackend.TRIGRAM)
+        table = Group.__table__
+        pool.engine.execute(table.update().where(table.c.name == 'Test Group').values(name='Test Team'))
+        pool.engine.execute(table.delete().where(table.c.name == 'group_a'))
+        assert self.search(backend, 'roup') == {'Group 100%', 'Group 1000'}
+        assert self.search(backend, 'Team') == {'Test Team'}
+
+    def test_trigram_uses_fts_table(self, pool):
+        backend = SearchBackend(pool, SearchBackend.TRIGRAM)
+        sql = str(select([Group.id]).where(backend.match(Group.name, 'roup')))
+        assert 'fts_group_name MATCH' in sql and 'LIKE' not in sql
+
+    def test_trigram_on_mysql(self, pool):
+        backend = SearchBackend(pool, SearchBackend.TRIGRAM)
+        with mock.patch.object(SearchBackend, 'dialect', new_callable=mock.PropertyMock, return_value='mysql'):
+            clause = backend.match(Group.name, 'roup')
+        sql = str(clause.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+        assert sql == "MATCH (`group`.name) AGAINST ('\"roup\"' IN BOOLEAN MODE) AND `group`.name LIKE '%%roup%%' ESCAPE '\\\\'"
+
+    def test_contains(self, pool):
+        backend = SearchBackend(pool, SearchBackend.CONTAINS)
+        assert self.search(backend, 'Group') == {'Test Group', 'Group 100%', 'Group 1000', 'group_a'}
+        # wildcards of the term are matched literally
+        assert self.search(backend, '0%') == {'Group 100%'}
+        assert self.search(backend, 'p_') == {'group_a'}
+
+    def test_prefix(self, pool):
+        backend = SearchBackend(pool, SearchBackend.PREFIX)
+        assert self.search(backend, 'Group') == {'Group 100%', 'Group 1000', 'group_a'}
+        assert self.search(backend, 'Group 100%') == {'Group 100%'}
+
+    def test_fulltext_fallback_to_prefix(self, pool):
+        backend = SearchBackend(pool, SearchBackend.FULLTEXT)
+        assert self.search(backend, 'Test') == {'Test Group'}
+
+    def test_fulltext_on_mysql(self, pool):
+        backend = SearchBackend(pool, SearchBackend.FULLTEXT)
+        with mock.patch.object(SearchBackend, 'dialect', new_callable=mock.PropertyMock, return_value='mysql'):
+            clause = backend.match(Group.name, 'test gro')
+        sql = str(clause.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+        assert sql == "MATCH (`group`.name) AGAINST ('+test* +gro*' IN BOOLEAN MODE)"
+
+    def test_empty_term_does_not_filter(self, pool):
+        backend = SearchBackend(pool, SearchBackend.PREFIX)
+        query = object()
+        assert backend.filter(query, Group.name, '') is query
+
+    def test_unknown_mode(self, pool):
+        with pytest.raises(errors.Error):
+            SearchBackend(pool, 'regex')
@@ -0,0 +1,107 @@
+import socket
+
+import pytest
+
+from app.domain.service.email import EmailService
+from app.infrastructure.smtp import Mail
+from app.pkgs.token_factory import TokenFactory
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class Inbox(object):
+    """aiosmtpd handler keeping the received messages"""
+
+    def __init__(self):
+        self.messages = []
+        self.contents = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos, session.peer))
+        self.contents.append(envelope.content.decode())
+        return '250 OK'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class SmtpServer(object):
+    """Local stand-in smtp server which can be restarted on its port"""
+
+    def __init__(self, inbox: Inbox):
+        self.inbox = inbox
+        self.port = free_port()
+        self.controller = None
+
+    def start(self):
+        self.controller = aiosmtpd_controller.Controller(self.inbox, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def restart(self):
+        # drops the open connections
+        self.stop()
+        self.start()
+
+
+class TestMail:
+
+    @pytest.fixture
+    def inbox(self):
+        return Inbox()
+
+    @pytest.fixture
+    def smtp_server(self, inbox):
+        server = SmtpServer(inbox)
+        server.start()
+        yield server
+        server.stop()
+
+    @pytest.fixture
+    def mail(self, smtp_server):
+        mail = Mail('from@example.com', '', port=smtp_server.port, smtp_server='127.0.0.1', use_ssl=False)
+        yield mail
+        mail.close()
+
+    def messages(self, mail: Mail, count: int):
+        return [mail.create_message(f'to{i}@example.com', 'hello', '<b>hi</b>') for i in range(count)]
+
+    def test_send_many_uses_one_connection(self, mail, inbox):
+        assert mail.send_many(self.messages(mail, 20)) == [{}] * 20
+        assert mail.send(self.messages(mail, 1)[0]) == {}
+        assert mail.connects == 1
+        assert len(inbox.messages) == 21
+        assert inbox.messages[0][:2] == ('from@example.com', ['to0@example.com'])
+        assert len({peer for _, _, peer in inbox.messages}) == 1
+
+    def test_reconnect_when_server_drops_connection(self, mail, inbox, smtp_server):
+        mail.send_many(self.messages(mail, 2))
+        # the server restarts, the pooled connection is dead
+        smtp_server.restart()
+        mail.send_many(self.messages(mail, 2))
+        assert mail.connects == 2
+        assert len(inbox.messages) == 4
+
+    def test_idle_connection_is_checked(self, mail, inbox, smtp_server):
+        mail.keepalive = 0
+        mail.send_many(self.messages(mail, 1))
+        mail.send_many(self.messages(mail, 1))
+        assert mail.connects == 1  # NOOP succeeded
+        smtp_server.restart()
+        mail.send_many(self.messages(mail, 1))
+        assert mail.connects == 2  # NOOP failed, replaced before sending
+        assert len(inbox.messages) == 3
+
+    def test_send_bulk_email(self, mail, inbox):
+        email_service = EmailService(mail, 'from@example.com', TokenFactory('secret', 'salt'))
+        recipients = ['a@example.com', 'b@example.com']
+        email_service.send_bulk_email(recipients, 'Please confirm your email', 'user/activate.html',
+                                      [{'confirm_url': f'http://host/confirm/{to}'} for to in recipients])
+        assert [rcpt for _, rcpt, _ in inbox.messages] == [['a@example.com'], ['b@example.com']]
+        assert 'http://host/confirm/b@example.com' in inbox.contents[1]
+        assert mail.connects == 1
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from app.pkgs.cache_tools import Cache, LRUCache
+
+
+class TestCache:
+
+    @pytest.fixture
+    def calls(self):
+        return []
+
+    @pytest.fixture
+    def cached_function(self, calls):
+        # Create an instance of the Cache decorator with a max size of 5 and expire time of 1 second
+        cache_decorator = Cache(max_size=5, expire_time=1)
+
+        @cache_decorator
+        def expensive_function(n):
+            calls.append(n)
+            return n
+
+        return expensive_function
+
+    def test_cache_decorator(self, cached_function, calls):
+        # Call the cached function multiple times with the same argument
+        result1 = cached_function(5)
+        result2 = cached_function(5)
+        result3 = cached_function(5)
+
+        # Ensure that the function is only called once and the results are equal
+        assert len(calls) == 1
+        assert result1 == result2 == result3
+
+        # Ensure that the function is called again for the new argument
+        result4 = cached_function(10)
+        assert len(calls) == 2
+        assert result4 != result1
+
+        # Wait for the cache to expire, then the function is called again
+        time.sleep(1.1)
+        result5 = cached_function(5)
+        assert len(calls) == 3
+        assert result5 == result1
+
+    def test_invalidate_one_call(self, cached_function, calls):
+        cached_function(5)
+        assert cached_function.invalidate(5)
+        cached_function(5)
+        assert len(calls) == 2
+
+    def test_functions_do_not_share_keys(self):
+        cache_decorator = Cache(max_size=5)
+
+        @cache_decorator
+        def add_one(n):
+            return n + 1
+
+        @cache_decorator
+        def add_two(n):
+            return n + 2
+
+        assert add_one(1) == 2
+        assert add_two(1) == 3
+
+
+class TestLRUCache:
+
+    def test_evict_least_recently_used(self):
+        lru = LRUCache(max_size=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        assert lru.get('a') == 1
+        lru.set('c', 3)
+        assert 'b' not in lru
+        assert lru.get('a') == 1
+        assert lru.get('c') == 3
+        assert lru.stats()['evictions'] == 1
+
+    def test_per_entry_expire_time(self):
+        lru = LRUCache(expire_time=60)
+        lru.set('a', 1, expire_time=0)
+        lru.set('b', 2)
+        assert lru.get('a') is None
+        assert lru.get('b') == 2
+
+    def test_invalidate_and_clear(self):
+        lru = LRUCache()
+        lru.set('a', 1)
+        lru.set('b', 2)
+        assert lru.invalidate('a')
+        assert not lru.invalidate('a')
+        lru.clear()
+        assert len(lru) == 0
+
+    def test_single_flight(self):
+        lru = LRUCache()
+        calls = []
+        started = threading.Event()
+
+        def slow_compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lru.get_or_set('key', slow_compute)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for t in threads[1:]:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == ['value'] * 5
+
+    def test_single_flight_share_error(self):
+        lru = LRUCache()
+
+        def failed_compute():
+            raise ValueError('failed')
+
+        with pytest.raises(ValueError):
+            lru.get_or_set('key', failed_compute)
+        # error is not cached
+        assert lru.get_or_set('key', lambda: 'value') == 'value'
@@ -0,0 +1,37 @@
+import pytest
+
+from app.pkgs.import_profile import parse_importtime, profile_imports, top_imports, total_us
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     app.pkgs.errors
+import time:       300 |        420 |   app.pkgs.injector
+import time:        80 |        500 | app.pkgs
+import time:        50 |         50 | json
+"""
+
+
+class TestImportProfile:
+
+    @pytest.fixture
+    def costs(self):
+        return parse_importtime(IMPORTTIME_OUTPUT)
+
+    def test_parse_importtime(self, costs):
+        assert [c.module for c in costs] == ['app.pkgs.errors', 'app.pkgs.injector', 'app.pkgs', 'json']
+        assert [c.depth for c in costs] == [2, 1, 0, 0]
+        assert costs[1].self_us == 300
+        assert costs[1].cumulative_us == 420
+        assert total_us(costs) == 550
+
+    def test_top_imports(self, costs):
+        assert [c.module for c in top_imports(costs, 2)] == ['app.pkgs', 'app.pkgs.injector']
+        assert [c.module for c in top_imports(costs, 1, by='self')] == ['app.pkgs.injector']
+
+    def test_cli_does_not_import_http_frameworks(self):
+        modules = {c.module for c in profile_imports('import app.cmd')}
+        assert 'app.cmd' in modules
+        assert not modules & {'fastapi', 'flask', 'sanic', 'app.cmd.center_store'}
+
+    def test_profile_failure(self):
+        with pytest.raises(RuntimeError):
+            profile_imports('import module_which_does_not_exist')
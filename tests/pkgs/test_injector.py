@@ -42,6 +42,16 @@ class UseCaseAB:
         self.product = product
 
 
+class ChickenService:
+    def __init__(self, egg: 'EggService'):
+        self.egg = egg
+
+
+class EggService:
+    def __init__(self, chicken: ChickenService):
+        self.chicken = chicken
+
+
 class TestContainer:
 
     @pytest.fixture
@@ -118,3 +128,53 @@ class TestContainer:
         with pytest.raises(ValueError):
             # Max rounds is reached without resolving all dependencies, which should raise an exception
             container.build(max_round=0)
+
+    def test_build_in_dependency_order(self, container):
+        container.add_singleton(UseCaseAB)
+        container.add_singleton(ServiceAB)
+        container.add_singleton(ServiceA)
+        container.add_singleton(RepoB)
+        container.add_singleton(RepoA)
+        container.add_config('config', 'test.db')
+        # repositories, then services, then the use case
+        assert container.build() == 3
+        assert container.get_singleton(UseCaseAB).service_a is container.get_singleton(ServiceA)
+        # each class is inspected once
+        assert set(container._plans) == {UseCaseAB, ServiceAB, ServiceA, RepoA, RepoB}
+
+    def test_dependency_cycle(self, container):
+        container.add_singleton(ChickenService)
+        container.add_singleton(EggService)
+        with pytest.raises(ValueError, match='cycle'):
+            container.build()
+
+    def test_lazy_provider(self, container):
+        calls = []
+
+        def make_repo_b():
+            calls.append(1)
+            return RepoB('lazy')
+
+        container.add_lazy(RepoB, factory=make_repo_b)
+        container.add_lazy(ServiceA)
+        container.add_singleton(RepoA)
+        container.add_singleton(ServiceAB)
+        container.add_config('config', 'test.db')
+        container.build()
+        service_ab = container.get_singleton(ServiceAB)
+        assert isinstance(service_ab.repo_b, RepoB)
+        assert calls == []
+        assert service_ab.product_type() == 'lazy'
+        assert service_ab.product_type() == 'lazy'
+        assert calls == [1]
+        # created with its dependencies injected on first use
+        assert container.get_singleton(ServiceA).config() == 'test.db'
+
+    def test_factory_provider(self, container):
+        container.add_factory(RepoB)
+        container.add_singleton(RepoA)
+        container.add_singleton(ServiceAB)
+        container.add_config('config', 'test.db')
+        container.build()
+        assert container.get(RepoB) is not container.get(RepoB)
+        assert isinstance(container.get(ServiceAB).repo_b, RepoB)
@@ -0,0 +1,18 @@
+import json
+
+from app.pkgs.json_stream import iter_encoded, iter_json_array, iter_ndjson
+
+
+class TestJsonStream:
+    batches = [[{'id': 1, 'name': 'một'}, {'id': 2}], [], [{'id': 3, 'tags': [1, 2]}]]
+
+    def test_json_array(self):
+        chunks = list(iter_json_array(self.batches))
+        assert len(chunks) == 4  # brackets and one chunk per non empty batch
+        assert json.loads(b''.join(chunks)) == [item for batch in self.batches for item in batch]
+        assert b''.join(iter_json_array([])) == b'[]'
+
+    def test_ndjson(self):
+        lines = b''.join(iter_ndjson(self.batches)).decode('utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == [item for batch in self.batches for item in batch]
+        assert list(iter_encoded([], 'ndjson')) == []
@@ -0,0 +1,41 @@
+from app.pkgs.metrics import Histogram, RequestMetrics, format_labels, render_gauges
+
+
+class TestMetrics:
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        assert histogram.samples('latency', (('route', '/a'),)) == [
+            'latency_bucket{route="/a",le="0.1"} 2',
+            'latency_bucket{route="/a",le="1.0"} 3',
+            'latency_bucket{route="/a",le="+Inf"} 4',
+            'latency_sum{route="/a"} 3.65',
+            'latency_count{route="/a"} 4',
+        ]
+
+    def test_format_labels_escapes_values(self):
+        assert format_labels((('route', 'a"b\\c'),)) == '{route="a\\"b\\\\c"}'
+        assert format_labels(()) == ''
+
+    def test_request_metrics(self):
+        metrics = RequestMetrics(slow_request_seconds=1)
+        metrics.observe('GET', '/api/request/{request_id}', 200, 0.02, statements=4, db_seconds=0.01)
+        metrics.observe('GET', '/api/request/{request_id}', 404, 1.5, statements=2, db_seconds=0.5)
+        summary = metrics.to_json()['GET /api/request/{request_id}']
+        assert summary['count'] == 2 and summary['slow'] == 1
+        assert summary['statements_avg'] == 3
+        lines = metrics.to_prometheus()
+        route = 'method="GET",route="/api/request/{request_id}"'
+        assert f'http_requests_total{{{route},status="404"}} 1' in lines
+        assert f'http_request_sql_statements_sum{{{route}}} 6.0' in lines
+        assert f'http_slow_requests_total{{{route}}} 1' in lines
+        assert '# TYPE http_request_duration_seconds histogram' in lines
+
+    def test_slow_requests_can_be_disabled(self):
+        assert not RequestMetrics(slow_request_seconds=0).is_slow(100)
+
+    def test_render_gauges_skips_non_numeric(self):
+        assert render_gauges('db_pool', {'pool_class': 'QueuePool', 'size': 5, 'ok': True}) == [
+            '# HELP db_pool_size size', '# TYPE db_pool_size gauge', 'db_pool_size 5']
@@ -0,0 +1,54 @@
+import asyncio
+import binascii
+import hashlib
+
+import pytest
+
+from app.pkgs.password_hasher import PasswordHasher
+
+
+def legacy_hash(password: str) -> str:
+    # format of User.hash_password before the encoded format
+    salt = hashlib.sha256(b'salt').hexdigest()
+    password_hash = hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'), salt.encode('ascii'), 100000)
+    return salt + binascii.hexlify(password_hash).decode('ascii')
+
+
+class TestPasswordHasher:
+
+    @pytest.fixture
+    def hasher(self):
+        hasher = PasswordHasher(iterations=1000, workers=2)
+        yield hasher
+        hasher.shutdown()
+
+    def test_hash_and_verify(self, hasher):
+        encoded = hasher.hash('1Pass@word')
+        assert encoded.startswith('pbkdf2_sha512$1000$')
+        assert hasher.verify('1Pass@word', encoded)
+        assert not hasher.verify('wrong', encoded)
+        assert not hasher.needs_rehash(encoded)
+
+    def test_async_api(self, hasher):
+        async def login():
+            encoded = await hasher.hash_async('1Pass@word')
+            return await hasher.verify_async('1Pass@word', encoded)
+
+        assert asyncio.run(login())
+
+    def test_legacy_hash(self, hasher):
+        encoded = legacy_hash('1Pass@word')
+        assert hasher.verify('1Pass@word', encoded)
+        assert not hasher.verify('wrong', encoded)
+        assert hasher.needs_rehash(encoded)
+
+    def test_needs_rehash_when_cost_changes(self, hasher):
+        encoded = hasher.hash('1Pass@word')
+        stronger = PasswordHasher(iterations=2000, workers=0)
+        assert stronger.needs_rehash(encoded)
+        # old hashes stay valid until they are upgraded
+        assert stronger.verify('1Pass@word', encoded)
+
+    def test_malformed_hash(self, hasher):
+        assert not hasher.verify('1Pass@word', '')
+        assert not hasher.verify('1Pass@word', 'pbkdf2_sha512$abc$salt$hash')
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from app.pkgs.template_renderer import TemplateRenderer
+from app.pkgs.token_factory import TokenFactory
+
+
+class TestTemplateRenderer:
+
+    @pytest.fixture
+    def template_folder(self, tmp_path):
+        folder = tmp_path / 'templates'
+        (folder / 'user').mkdir(parents=True)
+        (folder / 'user' / 'hello.html').write_text('<p>{{ greeting }} {{ name }}</p>')
+        return str(folder)
+
+    def test_render_app_templates(self):
+        renderer = TemplateRenderer()
+        assert renderer.precompile() >= 3
+        html = renderer.render('user/activate.html', confirm_url='http://host/confirm/abc')
+        assert '<a href="http://host/confirm/abc">' in html
+
+    def test_render_many_with_shared_context(self, template_folder):
+        renderer = TemplateRenderer(template_folder)
+        htmls = renderer.render_many('user/hello.html', [{'name': 'an'}, {'name': '<b>binh</b>'}], greeting='hi')
+        assert htmls == ['<p>hi an</p>', '<p>hi &lt;b&gt;binh&lt;/b&gt;</p>']
+
+    def test_template_is_compiled_once(self, template_folder):
+        renderer = TemplateRenderer(template_folder)
+        assert renderer.get_template('user/hello.html') is renderer.get_template('user/hello.html')
+
+    def test_bytecode_cache(self, template_folder, tmp_path):
+        cache_folder = str(tmp_path / 'cache')
+        TemplateRenderer(template_folder, cache_folder).render('user/hello.html', name='an')
+        assert len(os.listdir(cache_folder)) == 1
+        # a new process (renderer) loads the bytecode instead of compiling the source
+        renderer = TemplateRenderer(template_folder, cache_folder)
+        assert renderer.render('user/hello.html', greeting='hi', name='an') == '<p>hi an</p>'
+
+    def test_token_factory(self):
+        factory = TokenFactory('secret', 'salt')
+        token = factory.generate_confirmation_token('user@example.com')
+        assert factory.confirm_token(token) == 'user@example.com'
+        assert TokenFactory('secret', 'salt').confirm_token(token) == 'user@example.com'
+        with pytest.raises(Exception):
+            TokenFactory('secret', 'other salt').confirm_token(token)
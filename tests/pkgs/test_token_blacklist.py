@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from app.pkgs.bloom_filter import BloomFilter
+from app.pkgs.token_blacklist import TokenBlacklist
+
+
+class TestBloomFilter:
+
+    def test_no_false_negative(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f'token-{i}'.encode() for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+        assert len(bloom) == 1000
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'token-{i}'.encode())
+        false_positives = sum(f'other-{i}'.encode() in bloom for i in range(10000))
+        # sized for 1%, leave room for randomness
+        assert false_positives < 300
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity=0)
+
+
+class TestTokenBlacklist:
+
+    @pytest.fixture
+    def blacklist(self):
+        return TokenBlacklist(capacity=2, sync_interval=60)
+
+    def test_lookup(self, blacklist):
+        blacklist.add('token-a', time.time() + 60)
+        assert blacklist.lookup('token-a') is True
+        assert blacklist.lookup('token-b') is False
+
+    def test_grow_over_capacity(self, blacklist):
+        for i in range(10):
+            blacklist.add(f'token-{i}')
+        assert blacklist.stats()['capacity'] >= 10
+        assert all(blacklist.lookup(f'token-{i}') for i in range(10))
+
+    def test_purge_expired(self, blacklist):
+        blacklist.add('expired', time.time() - 1)
+        blacklist.add('live', time.time() + 60)
+        blacklist.add('no-exp')
+        assert blacklist.purge() == 1
+        assert blacklist.lookup('expired') is not True
+        assert blacklist.lookup('live') is True
+        assert blacklist.lookup('no-exp') is True
+
+    def test_needs_sync(self, blacklist):
+        assert blacklist.needs_sync()
+        blacklist.add_many([('token-a', None)], last_id=7)
+        assert blacklist.last_id == 7
+        assert not blacklist.needs_sync()
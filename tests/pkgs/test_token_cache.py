@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.pkgs.token_cache import TokenCache
+
+
+def make_payload(user_id: int = 1, role_ids=None, exp_in: int = 3600) -> dict:
+    return {
+        'sub': user_id,
+        'role_ids': role_ids or [],
+        'exp': int(time.time()) + exp_in,
+    }
+
+
+class TestTokenCache:
+
+    @pytest.fixture
+    def token_cache(self):
+        return TokenCache(max_size=3, ttl=60)
+
+    def test_hit_and_miss(self, token_cache):
+        assert token_cache.get('token-a') is None
+        token_cache.set('token-a', make_payload())
+        assert token_cache.get('token-a')['sub'] == 1
+        stats = token_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_evict_least_recently_used(self, token_cache):
+        for i in range(3):
+            token_cache.set(f'token-{i}', make_payload(user_id=i))
+        # touch token-0 so token-1 becomes the oldest one
+        token_cache.get('token-0')
+        token_cache.set('token-3', make_payload(user_id=3))
+        assert len(token_cache) == 3
+        assert token_cache.get('token-1') is None
+        assert token_cache.get('token-0') is not None
+
+    def test_entry_does_not_outlive_token_exp(self, token_cache):
+        token_cache.set('token-a', make_payload(exp_in=-1))
+        assert token_cache.get('token-a') is None
+
+    def test_invalidate_token(self, token_cache):
+        token_cache.set('token-a', make_payload())
+        token_cache.invalidate('token-a')
+        assert token_cache.get('token-a') is None
+
+    def test_invalidate_user_and_role(self, token_cache):
+        token_cache.set('token-a', make_payload(user_id=1, role_ids=[10]))
+        token_cache.set('token-b', make_payload(user_id=2, role_ids=[10, 20]))
+        token_cache.set('token-c', make_payload(user_id=3, role_ids=[20]))
+        token_cache.invalidate_user(1)
+        assert token_cache.get('token-a') is None
+        assert token_cache.get('token-b') is not None
+        token_cache.invalidate_role(20)
+        assert token_cache.get('token-b') is None
+        assert token_cache.get('token-c') is None
+
+    def test_skip_set_after_invalidation(self, token_cache):
+        generation = token_cache.generation
+        token_cache.invalidate_user(1)
+        token_cache.set('token-a', make_payload(user_id=1), generation=generation)
+        assert token_cache.get('token-a') is None
+
+    def test_disabled_cache(self):
+        token_cache = TokenCache(max_size=0)
+        token_cache.set('token-a', make_payload())
+        assert token_cache.get('token-a') is None
+
+    def test_evicted_token_leaves_indexes(self, token_cache):
+        for i in range(4):
+            token_cache.set(f'token-{i}', make_payload(user_id=i, role_ids=[10]))
+        assert 0 not in token_cache._user_index
+        assert len(token_cache._role_index[10]) == 3
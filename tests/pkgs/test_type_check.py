@@ -0,0 +1,67 @@
+from typing import Any, List, Optional
+from unittest import mock
+
+import pytest
+
+from app.pkgs import type_check as type_check_module
+from app.pkgs.type_check import type_check, instance_check, set_enabled, is_enabled
+
+
+@type_check
+def add(a: int, b: int = 1, scale: Optional[float] = None) -> int:
+    return a + b
+
+
+@type_check
+def first(items: List[int], default: Any = None) -> 'Item':
+    return Item(items[0]) if items else default
+
+
+class Item(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class TestTypeCheck:
+
+    def test_instance_check(self):
+        assert instance_check(int) is int
+        assert instance_check(List[int]) is list
+        assert instance_check(Optional[int]) == (int, type(None))
+        assert instance_check(Any) is None
+        assert instance_check(Optional[Any]) is None
+
+    def test_check_arguments(self):
+        assert add(1) == 2
+        assert add(1, b=2, scale=0.5) == 3
+        with pytest.raises(TypeError):
+            add('1', '2')
+        with pytest.raises(TypeError):
+            add(1, b=2, scale='0.5')
+
+    def test_check_return_with_forward_reference(self):
+        assert first([3]).value == 3
+        with pytest.raises(TypeError):
+            first([], default=3)
+        with pytest.raises(TypeError):
+            first((3,))
+
+    def test_hints_are_resolved_once(self):
+        with mock.patch.object(type_check_module, 'get_type_hints') as get_type_hints:
+            for i in range(5):
+                add(i)
+        get_type_hints.assert_not_called()
+
+    def test_disabled(self):
+        assert is_enabled()
+        # decorated while enabled, like the modules imported before the config is loaded
+        @type_check
+        def raw(a: int) -> int:
+            return a
+        set_enabled(False)
+        try:
+            assert raw('not checked') == 'not checked'
+        finally:
+            set_enabled(True)
+        with pytest.raises(TypeError):
+            raw('checked')